@@ -1,7 +1,8 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
 from .models.base import Base
+from .models.search_index import install_search_index, install_trigram_index
 
 # Database URL from environment or default to SQLite
 DATABASE_URL = os.getenv(
@@ -11,7 +12,8 @@ DATABASE_URL = os.getenv(
 
 engine = create_engine(
         DATABASE_URL,
-        connect_args={"check_same_thread": False},  # Only needed for SQLite
+        # Only needed (and only accepted) by SQLite
+        connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {},
         echo=False  # Set to True for SQL logging in development
     )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -31,6 +33,42 @@ def get_db():
 
 def create_tables():
     Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+
+
+def upgrade_schema(bind):
+    """
+    Add columns and indexes introduced after a table was first created.
+    create_all() only creates missing tables, so existing databases would
+    otherwise lack new model columns. New columns must be nullable or
+    declare a scalar default.
+    """
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=bind.dialect)}"
+                if column.default is not None and column.default.is_scalar:
+                    ddl += f" DEFAULT {column.default.arg!r}"
+                    if not column.nullable:
+                        ddl += " NOT NULL"
+                conn.execute(text(ddl))
+
+            existing_indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(conn)
+
+        # Backfills the full-text and trigram indexes of databases created without them
+        install_search_index(conn)
+        install_trigram_index(conn)
 
 
 def drop_tables():
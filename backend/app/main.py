@@ -2,6 +2,10 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from app.database import create_tables, seed_demo_user
+from app.repositories.chunk_search import close_chunk_search
+from app.repositories.semantic_search import close_semantic_search
+from app.services.ingestion_queue import ingestion_queue
+from app.services.parallel_extraction import shutdown_process_pool
 from app.routers.pdf_router import router as pdf_router
 from app.routers.user_router import router as auth_router
 
@@ -10,7 +14,12 @@ from app.routers.user_router import router as auth_router
 async def lifespan(app: FastAPI):
     create_tables()
     seed_demo_user()
+    ingestion_queue.start()
     yield
+    ingestion_queue.stop()
+    shutdown_process_pool()
+    close_chunk_search()
+    close_semantic_search()
 
 
 app = FastAPI(
@@ -1,6 +1,7 @@
-
 from .pdf import PDF
 from .pdf_chunk import PDFChunk
+from .ingestion_job import IngestionJob
 from .user import User
+from . import search_index  # registers the full-text index DDL on pdf_chunks
 
-__all__ = ["PDF", "PDFChunk", "User"]
\ No newline at end of file
+__all__ = ["PDF", "PDFChunk", "IngestionJob", "User"]
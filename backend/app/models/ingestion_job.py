@@ -0,0 +1,29 @@
+from sqlalchemy import Column, String, Integer, ForeignKey, Text, DateTime
+from sqlalchemy.orm import relationship
+from app.models.base import BaseModel
+
+
+class IngestionJob(BaseModel):
+    __tablename__ = "ingestion_jobs"
+
+    pdf_id = Column(Integer, ForeignKey("pdfs.id"), nullable=False, index=True)
+    status = Column(
+        String(50), default="queued", nullable=False, index=True
+    )  # queued, running, completed, failed; duplicate marks a batch member that needed no work
+    batch_id = Column(String(32), nullable=True, index=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    # The process running the job, and when it last proved it is alive
+    owner = Column(String(64), nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    pdf = relationship("PDF", back_populates="ingestion_jobs")
+
+    def __repr__(self):
+        return f"<IngestionJob(pdf_id={self.pdf_id}, status='{self.status}', attempts={self.attempts})>"
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ("completed", "failed", "duplicate")
@@ -11,6 +11,7 @@ class PDF(BaseModel):
     file_path = Column(String(500), nullable=False)
     content_type = Column(String(100), default="application/pdf")
     file_size = Column(Integer, nullable=False)
+    content_hash = Column(String(64), nullable=True, unique=True, index=True)  # SHA-256
     total_pages = Column(Integer, nullable=False)
     author = Column(String(255), nullable=True)
     subject = Column(String(500), nullable=True)
@@ -20,10 +21,16 @@ class PDF(BaseModel):
         String(50), default="pending"
     )  # pending, processing, completed, failed
     processing_error = Column(Text, nullable=True)
+    last_completed_page = Column(Integer, default=0, nullable=False)  # ingestion checkpoint
+    requested_engine = Column(String(20), nullable=True)  # pdfplumber, pypdf, auto; None = global default
+    extraction_engine = Column(String(20), nullable=True)  # engine actually used
 
     chunks = relationship(
         "PDFChunk", back_populates="pdf", cascade="all, delete-orphan"
     )
+    ingestion_jobs = relationship(
+        "IngestionJob", back_populates="pdf", cascade="all, delete-orphan"
+    )
 
     def __repr__(self):
         return f"<PDF(title='{self.title}', pages={self.total_pages}, status='{self.processing_status}')>"
@@ -1,10 +1,12 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Text, JSON
+from sqlalchemy import Column, String, Integer, ForeignKey, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 
 
 class PDFChunk(BaseModel):
     __tablename__ = "pdf_chunks"
+    # Serves chunk listing in order and its keyset pagination
+    __table_args__ = (Index("ix_pdf_chunks_pdf_id_chunk_number", "pdf_id", "chunk_number"),)
 
     pdf_id = Column(Integer, ForeignKey("pdfs.id"), nullable=False, index=True)
     chunk_number = Column(Integer, nullable=False)  # Sequential chunk number
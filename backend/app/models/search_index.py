@@ -0,0 +1,225 @@
+"""
+Database-side full-text index over pdf_chunks.content.
+
+On SQLite with FTS5 compiled in, `pdf_chunks_fts` is an external-content
+FTS5 table: it stores only the inverted index and reads text back from
+pdf_chunks by rowid. Triggers keep it in sync with every insert, update and
+delete, including Core bulk inserts that bypass the ORM.
+
+On PostgreSQL, `pdf_chunks.content_tsv` is a generated tsvector column
+with a GIN index; the database maintains it on every write. It is not
+mapped on the model, so other dialects never see it.
+
+The index is created with the pdf_chunks table and dropped with it.
+`install_search_index()` adds it to existing databases and backfills it
+from the current rows; `rebuild_search_index()` re-derives it at any time.
+
+Substring search has a trigram index of its own, since word tokenizers
+cannot find "4711" inside "AB-4711X". On SQLite it is a second FTS5 table,
+`pdf_chunks_trigram`, using the trigram tokenizer (SQLite 3.34+); on
+PostgreSQL a pg_trgm GIN index over content, which ILIKE uses directly.
+`install_trigram_index()` adds it to existing databases.
+"""
+
+import logging
+import os
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+from app.models.pdf_chunk import PDFChunk
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "pdf_chunks_fts"
+TSV_COLUMN = "content_tsv"
+TSV_INDEX = "ix_pdf_chunks_content_tsv"
+SEARCH_TEXT_CONFIG = os.getenv("SEARCH_TEXT_CONFIG", "english")
+TRIGRAM_TABLE = "pdf_chunks_trigram"
+TRGM_INDEX = "ix_pdf_chunks_content_trgm"
+
+# The trigram tokenizer arrived in SQLite 3.34
+_MIN_TRIGRAM_SQLITE = (3, 34, 0)
+
+
+def _fts_ddl(name: str, options: str):
+    return [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5(
+            content,
+            content='pdf_chunks',
+            content_rowid='id',
+            {options}
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {name}_ai AFTER INSERT ON pdf_chunks BEGIN
+            INSERT INTO {name}(rowid, content) VALUES (new.id, new.content);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {name}_ad AFTER DELETE ON pdf_chunks BEGIN
+            INSERT INTO {name}({name}, rowid, content)
+            VALUES ('delete', old.id, old.content);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {name}_au AFTER UPDATE OF content ON pdf_chunks BEGIN
+            INSERT INTO {name}({name}, rowid, content)
+            VALUES ('delete', old.id, old.content);
+            INSERT INTO {name}(rowid, content) VALUES (new.id, new.content);
+        END
+        """,
+    ]
+
+
+_FTS_DDL = _fts_ddl(FTS_TABLE, "tokenize='unicode61 remove_diacritics 2'")
+# Without positions the index is about a quarter the size; queries AND
+# single trigrams and are verified against the text anyway
+_TRIGRAM_DDL = _fts_ddl(TRIGRAM_TABLE, "tokenize='trigram', detail=none")
+
+
+def _tsvector_ddl():
+    return [
+        f"""
+        ALTER TABLE pdf_chunks ADD COLUMN IF NOT EXISTS {TSV_COLUMN} tsvector
+        GENERATED ALWAYS AS (to_tsvector('{SEARCH_TEXT_CONFIG}'::regconfig, content)) STORED
+        """,
+        f"CREATE INDEX IF NOT EXISTS {TSV_INDEX} ON pdf_chunks USING GIN ({TSV_COLUMN})",
+    ]
+
+
+def _trgm_ddl():
+    return [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        f"CREATE INDEX IF NOT EXISTS {TRGM_INDEX} ON pdf_chunks USING GIN (content gin_trgm_ops)",
+    ]
+
+
+_fts5_support = {}
+
+
+def supports_fts5(connection: Connection) -> bool:
+    if connection.dialect.name != "sqlite":
+        return False
+
+    key = id(connection.engine)
+    if key not in _fts5_support:
+        options = {row[0] for row in connection.exec_driver_sql("PRAGMA compile_options")}
+        _fts5_support[key] = "ENABLE_FTS5" in options
+    return _fts5_support[key]
+
+
+def supports_trigram(connection: Connection) -> bool:
+    return (
+        supports_fts5(connection)
+        and connection.dialect.dbapi.sqlite_version_info >= _MIN_TRIGRAM_SQLITE
+    )
+
+
+def has_search_index(connection: Connection) -> bool:
+    inspector = inspect(connection)
+    if connection.dialect.name == "postgresql":
+        return inspector.has_table(PDFChunk.__tablename__) and TSV_COLUMN in {
+            c["name"] for c in inspector.get_columns(PDFChunk.__tablename__)
+        }
+    return supports_fts5(connection) and inspector.has_table(FTS_TABLE)
+
+
+def install_search_index(connection: Connection) -> bool:
+    """
+    Create the dialect's index if missing and backfill it.
+    Returns True when an index was created.
+    """
+    if connection.dialect.name == "postgresql":
+        if has_search_index(connection) or not inspect(connection).has_table(PDFChunk.__tablename__):
+            return False
+        # Adding a stored generated column computes it for existing rows
+        for statement in _tsvector_ddl():
+            connection.exec_driver_sql(statement)
+        logger.info("Created %s with GIN index", TSV_COLUMN)
+        return True
+
+    if not supports_fts5(connection) or has_search_index(connection):
+        return False
+    if not inspect(connection).has_table(PDFChunk.__tablename__):
+        return False
+
+    for statement in _FTS_DDL:
+        connection.exec_driver_sql(statement)
+    rebuild_search_index(connection)
+    logger.info("Created and backfilled %s", FTS_TABLE)
+    return True
+
+
+def has_trigram_index(connection: Connection) -> bool:
+    inspector = inspect(connection)
+    if connection.dialect.name == "postgresql":
+        return inspector.has_table(PDFChunk.__tablename__) and TRGM_INDEX in {
+            i["name"] for i in inspector.get_indexes(PDFChunk.__tablename__)
+        }
+    return supports_trigram(connection) and inspector.has_table(TRIGRAM_TABLE)
+
+
+def install_trigram_index(connection: Connection) -> bool:
+    """
+    Create the dialect's trigram index if missing and backfill it.
+    Returns True when an index was created.
+    """
+    if has_trigram_index(connection) or not inspect(connection).has_table(PDFChunk.__tablename__):
+        return False
+
+    if connection.dialect.name == "postgresql":
+        try:
+            # Creating the extension can need privileges this role lacks
+            with connection.begin_nested():
+                for statement in _trgm_ddl():
+                    connection.exec_driver_sql(statement)
+        except DBAPIError as e:
+            logger.warning("Substring search stays unindexed, pg_trgm is unavailable: %s", e)
+            return False
+        logger.info("Created %s", TRGM_INDEX)
+        return True
+
+    if not supports_trigram(connection):
+        return False
+    for statement in _TRIGRAM_DDL:
+        connection.exec_driver_sql(statement)
+    connection.exec_driver_sql(f"INSERT INTO {TRIGRAM_TABLE}({TRIGRAM_TABLE}) VALUES ('rebuild')")
+    logger.info("Created and backfilled %s", TRIGRAM_TABLE)
+    return True
+
+
+def rebuild_search_index(connection: Connection) -> None:
+    """Re-derive the whole index, and the trigram index if present, from pdf_chunks."""
+    trigrams = has_trigram_index(connection)
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"REINDEX INDEX {TSV_INDEX}")
+        if trigrams:
+            connection.exec_driver_sql(f"REINDEX INDEX {TRGM_INDEX}")
+        return
+    connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    if trigrams:
+        connection.exec_driver_sql(
+            f"INSERT INTO {TRIGRAM_TABLE}({TRIGRAM_TABLE}) VALUES ('rebuild')"
+        )
+
+
+def drop_search_index(connection: Connection) -> None:
+    if connection.dialect.name != "sqlite":
+        return
+    # The triggers belong to pdf_chunks and go away with it
+    connection.exec_driver_sql(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    connection.exec_driver_sql(f"DROP TABLE IF EXISTS {TRIGRAM_TABLE}")
+
+
+@event.listens_for(PDFChunk.__table__, "after_create")
+def _create_search_index(target, connection, **kw):
+    # A leftover SQLite index from a dropped pdf_chunks would point at stale rowids
+    drop_search_index(connection)
+    install_search_index(connection)
+    install_trigram_index(connection)
+
+
+@event.listens_for(PDFChunk.__table__, "before_drop")
+def _drop_search_index(target, connection, **kw):
+    drop_search_index(connection)
@@ -0,0 +1,248 @@
+"""
+Bulk re-extraction of stored documents after chunking or extraction changes.
+
+    python -m app.reindex --status completed --since 2024-01-01 \
+        --workers 4 --rate 2 --state-file reindex.json
+
+Each selected document is re-extracted from its stored original and its
+chunks are swapped in one transaction (see PDFService.reindex_pdf). Progress
+is written to the state file after every document, so an interrupted run
+picks up where it stopped when started again with the same file. Documents
+waiting for or held by the ingestion queue are never touched.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, TextIO
+from sqlalchemy.orm import Session
+from app.database import SessionLocal, create_tables
+from app.repositories.ingestion_job import IngestionJobRepository
+from app.repositories.pdf import PDFRepository
+
+REINDEXABLE_STATUSES = ("completed", "failed")
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads."""
+
+    def __init__(self, rate: Optional[float]):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class ReindexState:
+    """Completed and failed document ids, persisted atomically after each update."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.done: set = set()
+        self.failed: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            self.done = set(data.get("done", []))
+            self.failed = {int(k): v for k, v in data.get("failed", {}).items()}
+
+    def record(self, pdf_id: int, error: Optional[str] = None) -> None:
+        with self._lock:
+            if error:
+                self.failed[pdf_id] = error
+            else:
+                self.done.add(pdf_id)
+                self.failed.pop(pdf_id, None)
+            self._save()
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(
+                {"done": sorted(self.done), "failed": {str(k): v for k, v in self.failed.items()}},
+                f,
+            )
+        os.replace(temp_path, self.path)
+
+
+class BulkReindexer:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        workers: int = 2,
+        engine: Optional[str] = None,
+        state: Optional[ReindexState] = None,
+        rate: Optional[float] = None,
+        yield_to_ingest: bool = True,
+        poll_interval: float = 5.0,
+        output: TextIO = sys.stderr,
+    ):
+        self.session_factory = session_factory
+        self.workers = max(1, workers)
+        self.engine = engine
+        self.state = state or ReindexState(None)
+        self.limiter = RateLimiter(rate)
+        self.yield_to_ingest = yield_to_ingest
+        self.poll_interval = poll_interval
+        self.output = output
+        self._lock = threading.Lock()
+        self._processed = 0
+        self._pages = 0
+        self._started = 0.0
+        self._total = 0
+
+    def select(self, **filters: Any) -> List[int]:
+        """Ids matching `filters` (see PDFRepository.select_ids) not yet done."""
+        filters["statuses"] = [
+            status for status in filters.get("statuses") or REINDEXABLE_STATUSES
+            if status in REINDEXABLE_STATUSES
+        ]
+        db = self.session_factory()
+        try:
+            ids = PDFRepository(db).select_ids(**filters)
+        finally:
+            db.close()
+        return [pdf_id for pdf_id in ids if pdf_id not in self.state.done]
+
+    def run(self, pdf_ids: List[int]) -> Dict[str, Any]:
+        self._total = len(pdf_ids)
+        self._processed = self._pages = 0
+        self._started = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            list(executor.map(self._reindex_one, pdf_ids))
+
+        elapsed = time.monotonic() - self._started
+        return {
+            "selected": self._total,
+            "succeeded": self._total - sum(1 for i in pdf_ids if i in self.state.failed),
+            "failed": {i: self.state.failed[i] for i in pdf_ids if i in self.state.failed},
+            "seconds": round(elapsed, 3),
+        }
+
+    def _reindex_one(self, pdf_id: int) -> None:
+        from app.services.pdf_service import PDFService
+
+        self.limiter.wait()
+        db = self.session_factory()
+        try:
+            self._wait_for_idle_ingest(db)
+
+            pdf = PDFRepository(db).get(pdf_id)
+            if not pdf or pdf.processing_status not in REINDEXABLE_STATUSES:
+                # Deleted, or picked up by the ingestion queue since selection
+                self._report(pdf_id, 0, 0, "skipped")
+                return
+
+            chunks = PDFService(db).reindex_pdf(pdf_id, self.engine)
+            pages = PDFRepository(db).get(pdf_id).total_pages
+            self.state.record(pdf_id)
+            self._report(pdf_id, pages, chunks, "ok")
+        except Exception as e:
+            db.rollback()
+            self.state.record(pdf_id, str(e))
+            self._report(pdf_id, 0, 0, f"failed: {e}")
+        finally:
+            db.close()
+
+    def _wait_for_idle_ingest(self, db: Session) -> None:
+        """Let live uploads go first: pause while ingestion jobs are queued."""
+        if not self.yield_to_ingest:
+            return
+        jobs = IngestionJobRepository(db)
+        while jobs.count_by_status("queued"):
+            time.sleep(self.poll_interval)
+
+    def _report(self, pdf_id: int, pages: int, chunks: int, outcome: str) -> None:
+        with self._lock:
+            self._processed += 1
+            self._pages += pages
+            elapsed = max(time.monotonic() - self._started, 1e-9)
+            rate = self._processed / elapsed
+            eta = (self._total - self._processed) / rate if rate else 0
+            self.output.write(
+                f"[{self._processed}/{self._total}] pdf {pdf_id}: {outcome}"
+                f" ({pages} pages, {chunks} chunks) | {rate:.2f} docs/s,"
+                f" {self._pages / elapsed:.1f} pages/s | ETA {_format_duration(eta)}\n"
+            )
+            self.output.flush()
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def _parse_date(value: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid date: {value}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.reindex",
+        description="Re-extract stored PDFs and atomically replace their chunks.",
+    )
+    parser.add_argument("--status", action="append", choices=REINDEXABLE_STATUSES,
+                        help="Repeatable; default: completed and failed")
+    parser.add_argument("--since", type=_parse_date, help="Created at or after (ISO date)")
+    parser.add_argument("--until", type=_parse_date, help="Created before (ISO date)")
+    parser.add_argument("--min-id", type=int)
+    parser.add_argument("--max-id", type=int)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--engine", choices=("pdfplumber", "pypdf", "auto"),
+                        help="Override each document's requested engine")
+    parser.add_argument("--rate", type=float, help="At most this many documents per second")
+    parser.add_argument("--state-file", help="Resume file; completed ids are skipped")
+    parser.add_argument("--yield-to-ingest", action=argparse.BooleanOptionalAction, default=True,
+                        help="Pause while the ingestion queue has work (default: on)")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the selection")
+    args = parser.parse_args(argv)
+
+    create_tables()
+    reindexer = BulkReindexer(
+        workers=args.workers,
+        engine=args.engine,
+        state=ReindexState(args.state_file),
+        rate=args.rate,
+        yield_to_ingest=args.yield_to_ingest,
+    )
+    pdf_ids = reindexer.select(
+        statuses=args.status,
+        created_after=args.since,
+        created_before=args.until,
+        min_id=args.min_id,
+        max_id=args.max_id,
+    )
+
+    if args.dry_run:
+        print(json.dumps({"selected": len(pdf_ids), "ids": pdf_ids}))
+        return 0
+
+    summary = reindexer.run(pdf_ids)
+    print(json.dumps(summary))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
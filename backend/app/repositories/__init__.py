@@ -1,5 +1,11 @@
 from .base import BaseRepository
 from .pdf import PDFRepository
 from .pdf_chunk import PDFChunkRepository
+from .ingestion_job import IngestionJobRepository
 
-__all__ = ["BaseRepository", "PDFRepository", "PDFChunkRepository"]
+__all__ = [
+    "BaseRepository",
+    "PDFRepository",
+    "PDFChunkRepository",
+    "IngestionJobRepository",
+]
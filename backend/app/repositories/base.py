@@ -2,6 +2,7 @@ from typing import Generic, TypeVar, Type, Optional, List, Dict, Any
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, desc, asc
 from app.models.base import BaseModel
+from app.repositories.cursor import KeysetPage, keyset_page
 
 ModelType = TypeVar("ModelType", bound=BaseModel)
 
@@ -42,6 +43,20 @@ class BaseRepository(Generic[ModelType]):
 
         return query.offset(skip).limit(limit).all()
 
+    def get_multi_after(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        order_by: Optional[str] = None,
+        order_desc: bool = False,
+    ) -> KeysetPage:
+        """Like get_multi, but continues after `cursor` instead of skipping rows."""
+        sort = [(self.model.id, order_desc)]
+        order_column = getattr(self.model, order_by, None) if order_by else None
+        if order_column is not None and order_by != "id":
+            sort.insert(0, (order_column, order_desc))
+        return keyset_page(self.db.query(self.model), sort, cursor, limit)
+
     def update(self, id: int, obj_in: Dict[str, Any]) -> Optional[ModelType]:
         db_obj = self.get(id)
         if not db_obj:
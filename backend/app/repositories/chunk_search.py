@@ -0,0 +1,601 @@
+"""
+Search strategies behind PDFChunkRepository's search methods.
+
+`LikeSearch` is the portable substring scan. `SQLiteFTSSearch` answers
+through the FTS5 index from app.models.search_index and ranks by bm25;
+`PostgresFullTextSearch` uses the GIN-indexed tsvector column and ranks by
+ts_rank_cd. The backend is picked per database from its dialect and what
+the schema provides; SEARCH_BACKEND=like forces the scan.
+
+Where the schema has the trigram index, `TrigramSearch` stands in for the
+scan. By default chunks are then matched as substrings through it, so
+"4711" finds "AB-4711X", and `RankedSubstringSearch` orders them by the
+token backend's relevance. SEARCH_BACKEND=fts matches whole words and
+prefixes through the token index instead, with the trigram index as the
+fallback for input without words; SEARCH_BACKEND=trigram drops the ranking.
+
+SEARCH_BACKEND=inverted answers from the embedded index in
+app.repositories.inverted_index instead. The repository reports chunk writes
+to it, and they are applied when the session commits.
+"""
+
+import logging
+import os
+import re
+import string
+import threading
+import unicodedata
+from abc import ABC, abstractmethod
+from functools import partial
+from typing import Dict, Hashable, Iterable, List, NamedTuple, Optional, Tuple
+from sqlalchemy import Float, cast, column, event, func, literal_column, select, table
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query, Session
+from app.models.pdf_chunk import PDFChunk
+from app.repositories.cursor import (
+    KeysetPage,
+    Sort,
+    decode_cursor,
+    encode_cursor,
+    keyset_page,
+    order_clauses,
+)
+from app.models.search_index import (
+    FTS_TABLE,
+    SEARCH_TEXT_CONFIG,
+    TRIGRAM_TABLE,
+    TSV_COLUMN,
+    has_search_index,
+    has_trigram_index,
+)
+from app.repositories.inverted_index import INVERTED_INDEX_PATH, InvertedIndex, parse_query
+
+logger = logging.getLogger(__name__)
+
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto")
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+# LIKE wildcards; SQLAlchemy's ilike() leaves them unescaped
+_WILDCARDS = re.compile(r"[%_]")
+# SQLite's LIKE ignores the case of ASCII letters only
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def unicode61_fold(text: str) -> str:
+    """
+    Lowercase and strip the diacritics of Latin letters, as FTS5's unicode61
+    tokenizer does with remove_diacritics. Unlike casefolding, "ß" stays "ß".
+    """
+    text = text.lower()
+    if text.isascii():
+        return text
+    kept: List[str] = []
+    for char in unicodedata.normalize("NFD", text):
+        if unicodedata.combining(char) and kept and kept[-1] < "\u0250":
+            continue
+        kept.append(char)
+    return unicodedata.normalize("NFC", "".join(kept))
+
+
+def normalize_term(search_term: str) -> str:
+    """Trim and collapse whitespace; what the backends are asked to match."""
+    return " ".join(search_term.split()) or search_term
+
+
+class SearchPage(NamedTuple):
+    items: List[PDFChunk]
+    total: int
+    # False when counting stopped at max_count; total is then max_count
+    total_is_exact: bool = True
+
+
+class ChunkSearch(ABC):
+    """What PDFChunkRepository asks of a search backend."""
+
+    name: str
+    # Whether the repository must report chunk inserts and deletes
+    tracks_writes = False
+
+    def cache_key(self, search_term: str) -> Hashable:
+        """
+        `search_term` reduced to what this backend distinguishes, for the
+        search cache: terms with equal keys must match the same chunks.
+        """
+        return normalize_term(search_term)
+
+    @abstractmethod
+    def page(
+        self, db: Session, search_term: str, pdf_id: Optional[int], skip: int, limit: int
+    ) -> List[PDFChunk]:
+        """Matching chunks, best first, from offset `skip`."""
+
+    @abstractmethod
+    def search_page(
+        self,
+        db: Session,
+        search_term: str,
+        pdf_id: Optional[int],
+        skip: int,
+        limit: int,
+        max_count: Optional[int] = None,
+    ) -> SearchPage:
+        """One page of results and the total match count, capped at `max_count` if given."""
+
+    @abstractmethod
+    def search_after(
+        self,
+        db: Session,
+        search_term: str,
+        pdf_id: Optional[int],
+        cursor: Optional[str],
+        limit: int,
+    ) -> KeysetPage:
+        """The page of results following `cursor`."""
+
+    @abstractmethod
+    def count(self, db: Session, search_term: str, pdf_id: Optional[int] = None) -> int:
+        """The number of matching chunks."""
+
+    @abstractmethod
+    def count_upto(
+        self, db: Session, search_term: str, pdf_id: Optional[int], max_count: Optional[int]
+    ) -> Tuple[int, bool]:
+        """The match count and whether it is exact; counting may stop past `max_count`."""
+
+
+class SQLChunkSearch(ChunkSearch):
+    """
+    A backend that answers with SQL: subclasses build the matching query
+    and its ranking, and paging and counting are derived from them.
+    """
+
+    def search(self, db: Session, search_term: str, pdf_id: Optional[int] = None) -> Query:
+        """Matching chunks, best first, ready for offset/limit."""
+        query, sort = self._ranked(db, search_term, pdf_id)
+        return query.order_by(*order_clauses(sort))
+
+    def search_after(
+        self,
+        db: Session,
+        search_term: str,
+        pdf_id: Optional[int],
+        cursor: Optional[str],
+        limit: int,
+    ) -> KeysetPage:
+        """The page of results following `cursor`, found by index seek rather than OFFSET."""
+        query, sort = self._ranked(db, search_term, pdf_id)
+        return keyset_page(query, sort, cursor, limit)
+
+    def page(
+        self, db: Session, search_term: str, pdf_id: Optional[int], skip: int, limit: int
+    ) -> List[PDFChunk]:
+        return self.search(db, search_term, pdf_id).offset(skip).limit(limit).all()
+
+    def search_page(
+        self,
+        db: Session,
+        search_term: str,
+        pdf_id: Optional[int],
+        skip: int,
+        limit: int,
+        max_count: Optional[int] = None,
+    ) -> SearchPage:
+        """
+        One page of results and the total match count in a single query,
+        via COUNT(*) OVER (). With `max_count`, the page is fetched on its
+        own and counting stops after `max_count` matches.
+        """
+        query = self.search(db, search_term, pdf_id)
+        if max_count is None:
+            rows = query.add_columns(func.count().over()).offset(skip).limit(limit).all()
+            if rows:
+                return SearchPage([row[0] for row in rows], rows[0][1])
+            # A page past the end carries no count
+            return SearchPage([], self.count(db, search_term, pdf_id) if skip else 0)
+
+        items = query.offset(skip).limit(limit).all()
+        if len(items) < limit and (items or not skip):
+            # A short page ends the result set, so its end is the total
+            return SearchPage(items, skip + len(items))
+        return SearchPage(items, *self.count_upto(db, search_term, pdf_id, max_count))
+
+    def count(self, db: Session, search_term: str, pdf_id: Optional[int] = None) -> int:
+        return self._matches(db, search_term, pdf_id).count()
+
+    def count_upto(
+        self, db: Session, search_term: str, pdf_id: Optional[int], max_count: Optional[int]
+    ) -> Tuple[int, bool]:
+        """The match count and whether it is exact; counting stops past `max_count`."""
+        if max_count is None:
+            return self.count(db, search_term, pdf_id), True
+        query, _ = self._ranked(db, search_term, pdf_id)
+        matches = query.with_entities(PDFChunk.id).limit(max_count + 1)
+        total = db.query(func.count()).select_from(matches.subquery()).scalar()
+        return min(total, max_count), total <= max_count
+
+    def rank_by_relevance(self, query: Query, search_term: str) -> Optional[Tuple[Query, Sort]]:
+        """
+        `query`, chunks matched some other way, and a sort putting those
+        most relevant to `search_term` first; None if this backend has no
+        relevance ranking or nothing in the term to rank by.
+        """
+        return None
+
+    @abstractmethod
+    def _ranked(self, db: Session, search_term: str, pdf_id: Optional[int]) -> Tuple[Query, Sort]:
+        """Unordered matches and the sort ranking them; the sort ends in a unique column."""
+
+    @abstractmethod
+    def _matches(self, db: Session, search_term: str, pdf_id: Optional[int]) -> Query:
+        """Matching chunks, unordered, for counting."""
+
+
+class LikeSearch(SQLChunkSearch):
+    """Case-insensitive substring match; scans every chunk."""
+
+    name = "like"
+
+    def cache_key(self, search_term):
+        return normalize_term(search_term).translate(_ASCII_LOWER)
+
+    def _ranked(self, db, search_term, pdf_id):
+        if pdf_id:
+            sort = [(PDFChunk.chunk_number, False), (PDFChunk.id, False)]
+        else:
+            sort = [(PDFChunk.created_at, True), (PDFChunk.id, True)]
+        return self._matches(db, search_term, pdf_id), sort
+
+    def _matches(self, db, search_term, pdf_id):
+        query = db.query(PDFChunk).filter(PDFChunk.content.ilike(f"%{search_term}%"))
+        if pdf_id:
+            query = query.filter(PDFChunk.pdf_id == pdf_id)
+        return query
+
+
+class TrigramSearch(LikeSearch):
+    """
+    LikeSearch narrowed through a trigram index. On SQLite, candidates are
+    the chunks holding every trigram of the pattern's literal runs, per the
+    FTS5 trigram table; the ILIKE then verifies them, so matches are exactly
+    the scan's. Patterns without a run of three characters are scanned. On
+    PostgreSQL the planner answers the ILIKE from the pg_trgm index itself.
+    """
+
+    name = "trigram"
+
+    _trigrams = table(TRIGRAM_TABLE, column("rowid"))
+
+    def _matches(self, db, search_term, pdf_id):
+        query = super()._matches(db, search_term, pdf_id)
+        match = to_trigram_query(search_term)
+        if match is None or db.get_bind().dialect.name != "sqlite":
+            return query
+        candidates = select(self._trigrams.c.rowid).where(
+            literal_column(TRIGRAM_TABLE).op("MATCH")(match)
+        )
+        return query.filter(PDFChunk.id.in_(candidates))
+
+
+class RankedSubstringSearch(SQLChunkSearch):
+    """
+    Substring matches as `substring` finds them, ordered by `ranking`:
+    chunks where the term also matches as words come first, by relevance,
+    the rest after them by id. Input without words is ordered as
+    `substring` orders it.
+    """
+
+    name = "ranked"
+
+    def __init__(self, substring: SQLChunkSearch, ranking: SQLChunkSearch):
+        self.substring = substring
+        self.ranking = ranking
+
+    def cache_key(self, search_term):
+        return self.substring.cache_key(search_term)
+
+    def _ranked(self, db, search_term, pdf_id):
+        matches = self._matches(db, search_term, pdf_id)
+        ranked = self.ranking.rank_by_relevance(matches, search_term)
+        return ranked or self.substring._ranked(db, search_term, pdf_id)
+
+    def _matches(self, db, search_term, pdf_id):
+        return self.substring._matches(db, search_term, pdf_id)
+
+
+class SQLiteFTSSearch(SQLChunkSearch):
+    """
+    FTS5 token search ranked by bm25. The query's words must appear as a
+    phrase, the last one as a prefix, so "invoice tot" finds "invoice total".
+    Input without any word characters falls back to the substring scan.
+    """
+
+    name = "fts5"
+
+    _fts = table(FTS_TABLE, column("rowid"), column("rank"))
+
+    def __init__(self, fallback: SQLChunkSearch):
+        self.fallback = fallback
+
+    def cache_key(self, search_term):
+        match = to_fts_query(search_term)
+        return self.fallback.cache_key(search_term) if match is None else unicode61_fold(match)
+
+    def _ranked(self, db, search_term, pdf_id):
+        match = to_fts_query(search_term)
+        if match is None:
+            return self.fallback._ranked(db, search_term, pdf_id)
+        return self._match(db, match, pdf_id), [(self._fts.c.rank, False), (PDFChunk.id, False)]
+
+    def rank_by_relevance(self, query, search_term):
+        match = to_fts_query(search_term)
+        if match is None:
+            return None
+        ranks = (
+            select(self._fts.c.rowid, self._fts.c.rank)
+            .where(literal_column(FTS_TABLE).op("MATCH")(match))
+            .subquery()
+        )
+        # bm25 ranks are negative, best lowest; chunks without a word match sort after them
+        rank = func.coalesce(ranks.c.rank, 0.0)
+        query = query.outerjoin(ranks, ranks.c.rowid == PDFChunk.id)
+        return query, [(rank, False), (PDFChunk.id, False)]
+
+    def _matches(self, db, search_term, pdf_id):
+        match = to_fts_query(search_term)
+        if match is None:
+            return self.fallback._matches(db, search_term, pdf_id)
+        return self._match(db, match, pdf_id)
+
+    def _match(self, db: Session, match: str, pdf_id: Optional[int]) -> Query:
+        query = (
+            db.query(PDFChunk)
+            .join(self._fts, self._fts.c.rowid == PDFChunk.id)
+            .filter(literal_column(FTS_TABLE).op("MATCH")(match))
+        )
+        if pdf_id:
+            query = query.filter(PDFChunk.pdf_id == pdf_id)
+        return query
+
+
+class PostgresFullTextSearch(SQLChunkSearch):
+    """
+    tsvector search parsed with websearch_to_tsquery, so users can write
+    "quoted phrases", `or` and `-excluded` terms. Ranked by ts_rank_cd.
+    """
+
+    name = "tsvector"
+
+    _tsv = literal_column(f"pdf_chunks.{TSV_COLUMN}")
+
+    def cache_key(self, search_term):
+        # websearch_to_tsquery ignores case and spacing, operators included;
+        # to_tsvector lowercases, it does not casefold ("ß" is not "ss")
+        return normalize_term(search_term).lower()
+
+    def _ranked(self, db, search_term, pdf_id):
+        sort = [(self._rank(search_term), True), (PDFChunk.id, False)]
+        return self._matches(db, search_term, pdf_id), sort
+
+    def rank_by_relevance(self, query, search_term):
+        # Chunks the tsquery does not match rank 0, after those it does
+        return query, [(self._rank(search_term), True), (PDFChunk.id, False)]
+
+    def _rank(self, search_term: str):
+        # ts_rank_cd is float4, whose Python repr in a cursor does not compare
+        # equal to it once widened; as float8 the key round-trips exactly
+        return cast(func.ts_rank_cd(self._tsv, self._tsquery(search_term)), Float(53))
+
+    def _matches(self, db, search_term, pdf_id):
+        query = db.query(PDFChunk).filter(self._tsv.op("@@")(self._tsquery(search_term)))
+        if pdf_id:
+            query = query.filter(PDFChunk.pdf_id == pdf_id)
+        return query
+
+    @staticmethod
+    def _tsquery(search_term: str):
+        return func.websearch_to_tsquery(
+            literal_column(f"'{SEARCH_TEXT_CONFIG}'::regconfig"), search_term
+        )
+
+
+class InvertedIndexSearch(ChunkSearch):
+    """
+    Search through an InvertedIndex kept in step with pdf_chunks. Queries
+    without any word characters fall back to the substring scan.
+    """
+
+    name = "inverted"
+    tracks_writes = True
+
+    def __init__(self, index: InvertedIndex, fallback: ChunkSearch):
+        self.index = index
+        self.fallback = fallback
+
+    @classmethod
+    def open(cls, engine: Engine, path: str, fallback: ChunkSearch) -> "InvertedIndexSearch":
+        """Open the index at `path`, rebuilding it if it is behind the database."""
+        index = InvertedIndex(path)
+        with engine.connect() as connection:
+            row = connection.execute(
+                select(
+                    func.count(PDFChunk.id),
+                    func.coalesce(func.max(PDFChunk.id), 0),
+                    func.coalesce(func.sum(PDFChunk.id), 0),
+                )
+            ).one()
+            if tuple(row) != index.fingerprint():
+                logger.info("Rebuilding inverted index at %s from %d chunks", path, row[0])
+                result = connection.execution_options(stream_results=True).execute(
+                    select(PDFChunk.id, PDFChunk.pdf_id, PDFChunk.content).order_by(PDFChunk.id)
+                )
+                index.rebuild(tuple(r) for r in result)
+        return cls(index, fallback)
+
+    def cache_key(self, search_term):
+        query = parse_query(search_term)
+        return tuple(map(tuple, query)) if query else self.fallback.cache_key(search_term)
+
+    def page(self, db, search_term, pdf_id, skip, limit):
+        if not parse_query(search_term):
+            return self.fallback.page(db, search_term, pdf_id, skip, limit)
+        ids, _ = self.index.search(search_term, pdf_id, skip, limit)
+        return self._load(db, ids)
+
+    @staticmethod
+    def _load(db: Session, ids: List[int]) -> List[PDFChunk]:
+        if not ids:
+            return []
+        chunks = {c.id: c for c in db.query(PDFChunk).filter(PDFChunk.id.in_(ids))}
+        return [chunks[i] for i in ids if i in chunks]
+
+    def search_page(self, db, search_term, pdf_id, skip, limit, max_count=None):
+        if not parse_query(search_term):
+            return self.fallback.search_page(db, search_term, pdf_id, skip, limit, max_count)
+        # The index counts every match while ranking, so the total is free
+        ids, total = self.index.search(search_term, pdf_id, skip, limit)
+        items = self._load(db, ids)
+        if max_count is not None and total > max_count:
+            return SearchPage(items, max_count, False)
+        return SearchPage(items, total)
+
+    def search_after(self, db, search_term, pdf_id, cursor, limit):
+        if not parse_query(search_term):
+            return self.fallback.search_after(db, search_term, pdf_id, cursor, limit)
+        after = tuple(decode_cursor(cursor, self.name, 2)) if cursor else None
+        ranked = self.index.search_after(search_term, pdf_id, after, limit + 1)
+        next_cursor = None
+        if len(ranked) > limit:
+            chunk_id, score = ranked[limit - 1]
+            next_cursor = encode_cursor((score, chunk_id), self.name)
+        return KeysetPage(self._load(db, [chunk_id for chunk_id, _ in ranked[:limit]]), next_cursor)
+
+    def count(self, db, search_term, pdf_id=None):
+        if not parse_query(search_term):
+            return self.fallback.count(db, search_term, pdf_id)
+        return self.index.count(search_term, pdf_id)
+
+    def count_upto(self, db, search_term, pdf_id, max_count):
+        total = self.count(db, search_term, pdf_id)
+        if max_count is not None and total > max_count:
+            return max_count, False
+        return total, True
+
+    def on_insert(self, db: Session, ids: Iterable[int], rows: Iterable[dict]) -> None:
+        for chunk_id, row in zip(ids, rows):
+            defer_until_commit(
+                db, partial(self.index.add, chunk_id, row["pdf_id"], row["content"])
+            )
+
+    def on_delete(self, db: Session, chunk_ids: Iterable[int]) -> None:
+        defer_until_commit(db, partial(self.index.remove, list(chunk_ids)))
+
+    def on_delete_pdf(self, db: Session, pdf_id: int) -> None:
+        defer_until_commit(db, partial(self.index.remove_pdf, pdf_id))
+
+    def close(self) -> None:
+        self.index.close()
+
+
+_PENDING_INDEX_WRITES = "pending_index_writes"
+
+
+def defer_until_commit(db: Session, write) -> None:
+    """Run `write` once `db` commits; drop it if the session rolls back."""
+    db.info.setdefault(_PENDING_INDEX_WRITES, []).append(write)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_index_writes(session):
+    for write in session.info.pop(_PENDING_INDEX_WRITES, ()):
+        write()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_index_writes(session):
+    session.info.pop(_PENDING_INDEX_WRITES, None)
+
+
+def to_fts_query(search_term: str) -> Optional[str]:
+    """Quote the words of free-text input as one FTS5 prefix phrase."""
+    tokens = _TOKEN.findall(search_term)
+    if not tokens:
+        return None
+    return '"' + " ".join(tokens) + '"*'
+
+
+def to_trigram_query(search_term: str) -> Optional[str]:
+    """
+    An FTS5 query every ILIKE match of `search_term` satisfies: the
+    trigrams of its literal runs, each quoted, ANDed.
+    """
+    trigrams = {
+        run[i : i + 3] for run in _WILDCARDS.split(search_term) for i in range(len(run) - 2)
+    }
+    if not trigrams:
+        return None
+    return " AND ".join('"' + gram.replace('"', '""') + '"' for gram in sorted(trigrams))
+
+
+_backends: Dict[int, ChunkSearch] = {}
+# Held while a backend is opened, so concurrent first uses open it once
+_backends_lock = threading.Lock()
+
+
+def _engine_of(db: Session) -> Engine:
+    bind = db.get_bind()
+    return getattr(bind, "engine", bind)
+
+
+def get_chunk_search(db: Session) -> ChunkSearch:
+    """The search backend for the database behind `db`, cached per engine."""
+    engine = _engine_of(db)
+    key = id(engine)
+
+    backend = _backends.get(key)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(key)
+            if backend is None:
+                backend = _backends[key] = _open_backend(engine)
+    return backend
+
+
+def _open_backend(engine: Engine) -> ChunkSearch:
+    substring: ChunkSearch = LikeSearch()
+    token_index = False
+    if SEARCH_BACKEND != "like":
+        with engine.connect() as connection:
+            if has_trigram_index(connection):
+                substring = TrigramSearch()
+            token_index = has_search_index(connection)
+    if SEARCH_BACKEND == "inverted":
+        return InvertedIndexSearch.open(engine, INVERTED_INDEX_PATH, substring)
+    if SEARCH_BACKEND not in ("like", "trigram") and token_index:
+        if engine.dialect.name == "postgresql":
+            backend: ChunkSearch = PostgresFullTextSearch()
+        else:
+            backend = SQLiteFTSSearch(substring)
+        if SEARCH_BACKEND != "fts" and isinstance(substring, TrigramSearch):
+            # Without the trigram index, substring matching would scan every chunk
+            backend = RankedSubstringSearch(substring, backend)
+        return backend
+    return substring
+
+
+def get_write_tracker(db: Session) -> Optional[ChunkSearch]:
+    """The backend to report chunk writes to, if it needs them."""
+    if SEARCH_BACKEND == "inverted":
+        backend: Optional[ChunkSearch] = get_chunk_search(db)
+    else:
+        # Only an explicitly installed backend can track writes
+        backend = _backends.get(id(_engine_of(db)))
+    return backend if backend is not None and backend.tracks_writes else None
+
+
+def close_chunk_search() -> None:
+    """Persist and release backends holding files; called on shutdown."""
+    with _backends_lock:
+        for backend in _backends.values():
+            if isinstance(backend, InvertedIndexSearch):
+                backend.close()
+        _backends.clear()
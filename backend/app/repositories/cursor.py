@@ -0,0 +1,94 @@
+"""
+Keyset (cursor) pagination.
+
+A cursor carries the sort key of the last row a client received, such as
+`(chunk_number, id)` or `(rank, id)`. The next page is the rows sorting
+after that key, which the database finds with an index seek, so every page
+costs the same however deep it is; OFFSET instead reads and discards every
+skipped row.
+
+Cursors are opaque to clients: URL-safe base64 JSON, tagged with the sort
+they were made for so one listing's cursor is rejected by another.
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple
+from sqlalchemy import and_, desc, or_, tuple_
+from sqlalchemy.orm import Query
+from sqlalchemy.sql import ColumnElement
+
+# (expression, descending) pairs, most significant first; the last must be unique
+Sort = Sequence[Tuple[ColumnElement, bool]]
+
+
+class KeysetPage(NamedTuple):
+    items: List[Any]
+    next_cursor: Optional[str]  # None on the last page
+
+
+def sort_signature(sort: Sort) -> str:
+    described = json.dumps([[str(expression), descending] for expression, descending in sort])
+    return hashlib.sha1(described.encode()).hexdigest()[:8]
+
+
+def encode_cursor(key: Sequence[Any], signature: str) -> str:
+    values = [{"dt": v.isoformat()} if isinstance(v, datetime) else v for v in key]
+    payload = json.dumps({"s": signature, "k": values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, signature: str, size: int) -> tuple:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        values = payload["k"]
+        valid = payload["s"] == signature and isinstance(values, list) and len(values) == size
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        valid = False
+    if not valid:
+        raise ValueError("Invalid or expired cursor")
+    return tuple(
+        datetime.fromisoformat(v["dt"]) if isinstance(v, dict) else v for v in values
+    )
+
+
+def order_clauses(sort: Sort) -> list:
+    return [desc(expression) if descending else expression for expression, descending in sort]
+
+
+def after_key(sort: Sort, key: Sequence[Any]) -> ColumnElement:
+    """Condition selecting rows that sort strictly after `key`."""
+    directions = {descending for _, descending in sort}
+    if len(directions) == 1:
+        # A row-value comparison lets the database seek an index on the sort columns
+        columns = tuple_(*[expression for expression, _ in sort])
+        return columns < tuple(key) if directions.pop() else columns > tuple(key)
+
+    conditions = []
+    for i, (expression, descending) in enumerate(sort):
+        equal = [e == v for (e, _), v in zip(sort[:i], key)]
+        beyond = expression < key[i] if descending else expression > key[i]
+        conditions.append(and_(*equal, beyond))
+    return or_(*conditions)
+
+
+def keyset_page(query: Query, sort: Sort, cursor: Optional[str], limit: int) -> KeysetPage:
+    """
+    One page of `query` ordered by `sort`, starting after `cursor` (an empty
+    cursor starts at the beginning). Raises ValueError for a bad cursor.
+    """
+    signature = sort_signature(sort)
+    if cursor:
+        query = query.filter(after_key(sort, decode_cursor(cursor, signature, len(sort))))
+
+    rows = (
+        query.add_columns(*[expression for expression, _ in sort])
+        .order_by(*order_clauses(sort))
+        .limit(limit + 1)
+        .all()
+    )
+    next_cursor = encode_cursor(rows[limit - 1][1:], signature) if len(rows) > limit else None
+    return KeysetPage([row[0] for row in rows[:limit]], next_cursor)
@@ -0,0 +1,142 @@
+from datetime import timedelta
+from typing import Optional, List, Tuple
+from sqlalchemy import or_
+from sqlalchemy.orm import Session, joinedload
+from app.models.base import utc_now
+from app.models.ingestion_job import IngestionJob
+from app.repositories.base import BaseRepository
+
+
+class IngestionJobRepository(BaseRepository[IngestionJob]):
+    def __init__(self, db: Session):
+        super().__init__(IngestionJob, db)
+
+    def enqueue(self, pdf_id: int, batch_id: Optional[str] = None) -> IngestionJob:
+        return self.create({"pdf_id": pdf_id, "status": "queued", "batch_id": batch_id})
+
+    def claim_next(self, owner: Optional[str] = None) -> Optional[IngestionJob]:
+        """
+        Atomically move the oldest queued job to running, leased to `owner`.
+        The conditional UPDATE guarantees a job is claimed by one worker only.
+        """
+        while True:
+            job = (
+                self.db.query(IngestionJob)
+                .filter(IngestionJob.status == "queued")
+                .order_by(IngestionJob.id)
+                .first()
+            )
+            if not job:
+                return None
+
+            claimed = (
+                self.db.query(IngestionJob)
+                .filter(IngestionJob.id == job.id, IngestionJob.status == "queued")
+                .update(
+                    {
+                        "status": "running",
+                        "attempts": IngestionJob.attempts + 1,
+                        "started_at": utc_now(),
+                        "owner": owner,
+                        "heartbeat_at": utc_now(),
+                    },
+                    synchronize_session=False,
+                )
+            )
+            self.db.commit()
+
+            if claimed:
+                self.db.refresh(job)
+                return job
+
+    def mark_finished(
+        self, job_id: int, status: str, error: Optional[str] = None
+    ) -> Optional[IngestionJob]:
+        return self.update(
+            job_id, {"status": status, "error": error, "finished_at": utc_now()}
+        )
+
+    def heartbeat(self, owner: str) -> int:
+        """Renew the lease on every job `owner` is running."""
+        count = (
+            self.db.query(IngestionJob)
+            .filter(IngestionJob.status == "running", IngestionJob.owner == owner)
+            .update({"heartbeat_at": utc_now()}, synchronize_session=False)
+        )
+        self.db.commit()
+        return count
+
+    def requeue_expired(self, lease_seconds: float, max_attempts: int) -> Tuple[int, List[int]]:
+        """
+        Return running jobs whose owner stopped renewing the lease to the
+        queue, or fail them once they have used up `max_attempts`.
+        Returns the number requeued and the PDF ids of the failed jobs.
+        """
+        cutoff = utc_now() - timedelta(seconds=lease_seconds)
+        expired = (
+            self.db.query(IngestionJob)
+            .filter(
+                IngestionJob.status == "running",
+                or_(IngestionJob.heartbeat_at.is_(None), IngestionJob.heartbeat_at < cutoff),
+            )
+            .all()
+        )
+        requeued, failed = 0, []
+        for job in expired:
+            if job.attempts >= max_attempts:
+                values = {
+                    "status": "failed",
+                    "error": f"Abandoned after {job.attempts} interrupted attempts",
+                    "finished_at": utc_now(),
+                }
+            else:
+                values = {"status": "queued"}
+            # Conditional, like claim_next: another process may have recovered it already
+            changed = (
+                self.db.query(IngestionJob)
+                .filter(
+                    IngestionJob.id == job.id,
+                    IngestionJob.status == "running",
+                    or_(IngestionJob.heartbeat_at.is_(None), IngestionJob.heartbeat_at < cutoff),
+                )
+                .update({**values, "owner": None}, synchronize_session=False)
+            )
+            if not changed:
+                continue
+            if values["status"] == "failed":
+                failed.append(job.pdf_id)
+            else:
+                requeued += 1
+        self.db.commit()
+        return requeued, failed
+
+    def has_pending_job(self, pdf_id: int) -> bool:
+        return (
+            self.db.query(IngestionJob.id)
+            .filter(
+                IngestionJob.pdf_id == pdf_id,
+                IngestionJob.status.in_(("queued", "running")),
+            )
+            .first()
+            is not None
+        )
+
+    def count_by_status(self, status: str) -> int:
+        return self.count({"status": status})
+
+    def get_by_batch(self, batch_id: str) -> List[IngestionJob]:
+        return (
+            self.db.query(IngestionJob)
+            .options(joinedload(IngestionJob.pdf))
+            .filter(IngestionJob.batch_id == batch_id)
+            .order_by(IngestionJob.id)
+            .all()
+        )
+
+    def get_by_pdf(self, pdf_id: int) -> List[IngestionJob]:
+        return (
+            self.db.query(IngestionJob)
+            .filter(IngestionJob.pdf_id == pdf_id)
+            .order_by(IngestionJob.id)
+            .all()
+        )
@@ -0,0 +1,629 @@
+"""
+Embedded inverted index over chunk text, for SQLite builds without FTS5.
+
+The index file holds a term dictionary and, per term, three arrays: the
+ids of the chunks containing it (delta-encoded), the term's frequency in
+each, and its positions (delta-encoded within each chunk). Every array uses
+the narrowest unsigned type its values fit. The file is memory-mapped:
+opening it reads the dictionary only, and a term's postings are paged in
+when a query first touches them.
+
+Writes land in an in-memory segment: added chunks are indexed there and
+removed ones tombstoned, and queries read both. Once the segment holds
+INVERTED_INDEX_MERGE_THRESHOLD changes it is frozen and a background thread
+merges it into a new file that atomically replaces the old one; writes go
+to a fresh segment meanwhile, and queries keep reading the old file until
+the swap. Only one process may write an index file: opening one takes an
+exclusive lock on `<path>.lock`, and a second writer gets IndexInUseError.
+
+Queries: words are ANDed, `OR` separates alternatives and "double quotes"
+match a phrase, e.g. `invoice "net total" OR receipt`. Results are ranked
+by BM25.
+"""
+
+import heapq
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import accumulate
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, the single writer is on trust
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+INVERTED_INDEX_PATH = os.getenv("INVERTED_INDEX_PATH", "./search_index/chunks.idx")
+INVERTED_INDEX_MERGE_THRESHOLD = int(os.getenv("INVERTED_INDEX_MERGE_THRESHOLD", "50000"))
+
+MAGIC = b"PDFIDX01"
+# magic, little endian, doc count, total tokens, term count, docs offset,
+# pdf count, pdfs offset, terms offset, max chunk id, chunk id sum
+_HEADER = struct.Struct("<8s?7xQQQQQQQQQ")
+# postings offset, doc count, position count, array typecodes, term length
+_TERM = struct.Struct("<QII3sH")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_QUERY_PART = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def fold(text: str) -> str:
+    """Casefold and remove diacritics; close to FTS5's unicode61, but "ß" folds to "ss"."""
+    text = text.casefold()
+    if not text.isascii():
+        text = "".join(
+            c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c)
+        )
+    return text
+
+
+def tokenize(text: str) -> List[str]:
+    """Folded words of `text`."""
+    return _TOKEN.findall(fold(text))
+
+
+def parse_query(query: str) -> List[List[Tuple[str, ...]]]:
+    """
+    Alternatives of conjunctions of clauses; a clause is a tuple of terms
+    that must appear consecutively (one term, or a phrase).
+    """
+    alternatives: List[List[Tuple[str, ...]]] = []
+    current: List[Tuple[str, ...]] = []
+    for phrase, word in _QUERY_PART.findall(query):
+        if word == "OR":
+            if current:
+                alternatives.append(current)
+            current = []
+            continue
+        terms = tokenize(phrase or word)
+        if terms:
+            # "e-mail" tokenizes to two words and is matched as a phrase
+            current.append(tuple(terms))
+    if current:
+        alternatives.append(current)
+    return alternatives
+
+
+def _pack(values: Iterable[int]) -> array:
+    values = list(values)
+    top = max(values, default=0)
+    for code in "BHIQ":
+        if top < 1 << (8 * array(code).itemsize):
+            return array(code, values)
+    raise OverflowError(f"Value {top} does not fit in 64 bits")
+
+
+def _rank(item: Tuple[int, float]) -> Tuple[float, int]:
+    # Best score first, ties by chunk id
+    return -item[1], item[0]
+
+
+def _deltas(values: List[int]) -> List[int]:
+    return [b - a for a, b in zip([0] + values, values)]
+
+
+class IndexInUseError(RuntimeError):
+    """Another process has the index file open for writing."""
+
+
+def lock_index_file(path: str):
+    """
+    Take the exclusive writer lock on `<path>.lock`, or raise IndexInUseError.
+    Returns the open lock file, to be closed to release it; None where
+    advisory locks are unavailable.
+    """
+    if fcntl is None:
+        return None
+    lock_file = open(f"{path}.lock", "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        raise IndexInUseError(f"{path} is open for writing by another process") from None
+    return lock_file
+
+
+class _Doc(NamedTuple):
+    pdf_id: int
+    length: int
+    terms: Dict[str, List[int]]  # term -> positions
+
+
+class _Segment:
+    """Read-only view of an index file."""
+
+    def __init__(self, path: Optional[str]):
+        self.terms: Dict[str, Tuple[int, int, int, str]] = {}
+        self.doc_count = self.total_length = 0
+        self.max_id = self.id_sum = 0
+        self._file = self._map = None
+
+        if not path or not os.path.exists(path):
+            self.ids = self.pdf_ids = self.lengths = array("I")
+            self.pdf_keys = self.pdf_starts = self.by_pdf = array("I")
+            return
+
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic, little_endian, self.doc_count, self.total_length, term_count,
+            docs_offset, pdf_count, pdfs_offset, terms_offset, self.max_id, self.id_sum,
+        ) = _HEADER.unpack_from(self._map)
+        if magic != MAGIC or little_endian != (sys.byteorder == "little"):
+            self.close()
+            raise ValueError(f"{path} is not an index file for this platform")
+
+        view = memoryview(self._map)
+        n = self.doc_count
+        self.ids = view[docs_offset:docs_offset + 4 * n].cast("I")
+        self.pdf_ids = view[docs_offset + 4 * n:docs_offset + 8 * n].cast("I")
+        self.lengths = view[docs_offset + 8 * n:docs_offset + 12 * n].cast("I")
+        self.pdf_keys = view[pdfs_offset:pdfs_offset + 4 * pdf_count].cast("I")
+        starts_offset = pdfs_offset + 4 * pdf_count
+        self.pdf_starts = view[starts_offset:starts_offset + 4 * (pdf_count + 1)].cast("I")
+        by_pdf_offset = starts_offset + 4 * (pdf_count + 1)
+        self.by_pdf = view[by_pdf_offset:by_pdf_offset + 4 * n].cast("I")
+
+        offset = terms_offset
+        for _ in range(term_count):
+            postings, docs, positions, codes, length = _TERM.unpack_from(self._map, offset)
+            offset += _TERM.size
+            term = self._map[offset:offset + length].decode("utf-8")
+            offset += length
+            self.terms[term] = (postings, docs, positions, codes.decode("ascii"))
+
+    def close(self) -> None:
+        # Views into the map must go before the map can close
+        self.ids = self.pdf_ids = self.lengths = array("I")
+        self.pdf_keys = self.pdf_starts = self.by_pdf = array("I")
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+        self._map = self._file = None
+
+    def position(self, chunk_id: int) -> int:
+        """Index of `chunk_id` in the doc table, or -1."""
+        i = bisect_left(self.ids, chunk_id)
+        return i if i < len(self.ids) and self.ids[i] == chunk_id else -1
+
+    def chunks_of(self, pdf_id: int) -> memoryview:
+        i = bisect_left(self.pdf_keys, pdf_id)
+        if i == len(self.pdf_keys) or self.pdf_keys[i] != pdf_id:
+            return memoryview(b"").cast("I")
+        return self.by_pdf[self.pdf_starts[i]:self.pdf_starts[i + 1]]
+
+    def postings(self, term: str) -> Dict[int, int]:
+        """chunk id -> term frequency."""
+        entry = self.terms.get(term)
+        if entry is None:
+            return {}
+        offset, docs, _, codes = entry
+        ids = self._read(offset, codes[0], docs)
+        offset += docs * ids.itemsize
+        return dict(zip(accumulate(ids), self._read(offset, codes[1], docs)))
+
+    def positions(self, term: str, chunk_ids: Optional[Set[int]] = None) -> Dict[int, List[int]]:
+        """chunk id -> positions of the term, for `chunk_ids` only if given."""
+        entry = self.terms.get(term)
+        if entry is None:
+            return {}
+        offset, docs, count, codes = entry
+        ids = self._read(offset, codes[0], docs)
+        offset += docs * ids.itemsize
+        tfs = self._read(offset, codes[1], docs)
+        offset += docs * tfs.itemsize
+        deltas = self._read(offset, codes[2], count)
+        result, start = {}, 0
+        for chunk_id, tf in zip(accumulate(ids), tfs):
+            if chunk_ids is None or chunk_id in chunk_ids:
+                result[chunk_id] = list(accumulate(deltas[start:start + tf]))
+            start += tf
+        return result
+
+    def _read(self, offset: int, code: str, count: int) -> array:
+        values = array(code)
+        values.frombytes(self._map[offset:offset + count * values.itemsize])
+        return values
+
+
+class _Changes:
+    """Chunks added to and removed from the segments below this one."""
+
+    def __init__(self):
+        self.added: Dict[int, _Doc] = {}
+        self.terms: Dict[str, Set[int]] = defaultdict(set)
+        self.removed: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.added) + len(self.removed)
+
+    def apply(self, term: str, found: Dict[int, object], positions: bool = False) -> None:
+        """Update `found`, the term's postings or positions below, to this segment."""
+        for chunk_id in self.removed.intersection(found) if self.removed else ():
+            del found[chunk_id]
+        for chunk_id in self.terms.get(term, ()):
+            occurrences = self.added[chunk_id].terms[term]
+            found[chunk_id] = occurrences if positions else len(occurrences)
+
+
+class InvertedIndex:
+    """
+    Term, AND/OR and phrase search over chunks, persisted to `path`.
+
+    Thread-safe. Changes are in memory until merged: in the background
+    every `merge_threshold` changes, or synchronously by `merge()` and
+    `close()`. After a crash the file is behind the database, which
+    `fingerprint()` lets callers detect.
+    """
+
+    def __init__(self, path: str, merge_threshold: int = INVERTED_INDEX_MERGE_THRESHOLD):
+        self.path = path
+        self.merge_threshold = merge_threshold
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock_file = lock_index_file(path)
+        # _lock guards the segments and is held briefly; _merge_lock lets one
+        # merge write a file at a time without blocking queries or writes
+        self._lock = threading.RLock()
+        self._merge_lock = threading.Lock()
+        self._merger: Optional[threading.Thread] = None
+        self._closed = False
+        self._base = _Segment(path)
+        self._frozen: List[_Changes] = []
+        self._changes = _Changes()
+        self._total_length = self._base.total_length
+
+    def _layers(self) -> List[_Changes]:
+        return [*self._frozen, self._changes]
+
+    @property
+    def doc_count(self) -> int:
+        with self._lock:
+            return self._base.doc_count + sum(
+                len(layer.added) - len(layer.removed) for layer in self._layers()
+            )
+
+    @property
+    def pending_changes(self) -> int:
+        with self._lock:
+            return sum(map(len, self._layers()))
+
+    def fingerprint(self) -> Tuple[int, int, int]:
+        """(count, max id, id sum) of the indexed chunks, to compare with the database."""
+        with self._lock:
+            if not self.pending_changes:
+                return self._base.doc_count, self._base.max_id, self._base.id_sum
+            ids = self._live_ids()
+            return len(ids), max(ids, default=0), sum(ids)
+
+    # Writes
+
+    def add(self, chunk_id: int, pdf_id: int, text: str) -> None:
+        """Index a chunk, replacing any previous version of it."""
+        terms: Dict[str, List[int]] = defaultdict(list)
+        tokens = tokenize(text)
+        for position, term in enumerate(tokens):
+            terms[term].append(position)
+
+        with self._lock:
+            self._discard(chunk_id)
+            self._changes.added[chunk_id] = _Doc(pdf_id, len(tokens), dict(terms))
+            for term in terms:
+                self._changes.terms[term].add(chunk_id)
+            self._total_length += len(tokens)
+            self._merge_if_due()
+
+    def remove(self, chunk_ids: Iterable[int]) -> None:
+        with self._lock:
+            for chunk_id in chunk_ids:
+                self._discard(chunk_id)
+            self._merge_if_due()
+
+    def remove_pdf(self, pdf_id: int) -> None:
+        with self._lock:
+            self.remove(self._chunks_of(pdf_id))
+
+    def _discard(self, chunk_id: int) -> None:
+        doc = self._changes.added.pop(chunk_id, None)
+        if doc is not None:
+            for term in doc.terms:
+                self._changes.terms[term].discard(chunk_id)
+            self._total_length -= doc.length
+            return
+
+        length = self._length_below(chunk_id)
+        if length is not None and chunk_id not in self._changes.removed:
+            self._changes.removed.add(chunk_id)
+            self._total_length -= length
+
+    def _merge_if_due(self) -> None:
+        if len(self._changes) >= self.merge_threshold and self._merger is None and not self._closed:
+            self._merger = threading.Thread(
+                target=self._merge_in_background, name="inverted-index-merge", daemon=True
+            )
+            self._merger.start()
+
+    def _merge_in_background(self) -> None:
+        try:
+            self.merge()
+        except Exception:
+            # The frozen segments stay in memory and are retried by the next merge
+            logger.exception("Merging inverted index %s failed", self.path)
+        finally:
+            with self._lock:
+                self._merger = None
+                self._merge_if_due()
+
+    def wait_for_merge(self) -> None:
+        """Block until no background merge is running."""
+        while True:
+            with self._lock:
+                merger = self._merger
+            if merger is None:
+                return
+            merger.join()
+
+    def rebuild(self, chunks: Iterable[Tuple[int, int, str]]) -> None:
+        """Replace the whole index with `(chunk_id, pdf_id, content)` rows."""
+        with self._merge_lock:
+            with self._lock:
+                self._base.close()
+                self._base = _Segment(None)
+                self._frozen, self._changes = [], _Changes()
+                self._total_length = 0
+            for chunk_id, pdf_id, content in chunks:
+                self.add(chunk_id, pdf_id, content)
+            self._merge(force=True)
+
+    # Queries
+
+    def search(
+        self, query: str, pdf_id: Optional[int] = None, skip: int = 0, limit: int = 100
+    ) -> Tuple[List[int], int]:
+        """Chunk ids of one page of results, best first, and the total match count."""
+        with self._lock:
+            scores = self._evaluate(query, pdf_id, score=True)
+            page = heapq.nsmallest(skip + limit, scores.items(), key=_rank)
+            return [chunk_id for chunk_id, _ in page[skip:]], len(scores)
+
+    def search_after(
+        self,
+        query: str,
+        pdf_id: Optional[int] = None,
+        after: Optional[Tuple[float, int]] = None,
+        limit: int = 100,
+    ) -> List[Tuple[int, float]]:
+        """
+        `(chunk id, score)` pairs ranked after `after`, the `(score, id)` of
+        the last result already seen. Costs the same at any depth.
+        """
+        with self._lock:
+            matches = self._evaluate(query, pdf_id, score=True).items()
+            if after is not None:
+                boundary = (-after[0], after[1])
+                matches = [item for item in matches if _rank(item) > boundary]
+            return heapq.nsmallest(limit, matches, key=_rank)
+
+    def count(self, query: str, pdf_id: Optional[int] = None) -> int:
+        with self._lock:
+            return len(self._evaluate(query, pdf_id, score=False))
+
+    def _evaluate(self, query: str, pdf_id: Optional[int], score: bool) -> Dict[int, float]:
+        allowed = self._chunks_of(pdf_id) if pdf_id else None
+        docs = max(self.doc_count, 1)
+        average = self._total_length / docs or 1
+        scores: Dict[int, float] = defaultdict(float)
+        for clauses in parse_query(query):
+            matches = [self._clause(clause) for clause in clauses]
+            matches.sort(key=len)
+            candidates = set(matches[0])
+            if allowed is not None:
+                candidates &= allowed
+            for other in matches[1:]:
+                candidates.intersection_update(other)
+                if not candidates:
+                    break
+
+            for chunk_id in candidates:
+                scores[chunk_id] += (
+                    sum(self._bm25(m[chunk_id], len(m), docs, average, chunk_id) for m in matches)
+                    if score else 0
+                )
+        return scores
+
+    def _clause(self, terms: Tuple[str, ...]) -> Dict[int, int]:
+        """chunk id -> occurrences of the term or phrase."""
+        if len(terms) == 1:
+            return self._postings(terms[0])
+
+        # Positions are only decoded for chunks holding every word of the phrase
+        candidates = set(self._postings(terms[0]))
+        for term in terms[1:]:
+            candidates.intersection_update(self._postings(term))
+        if not candidates:
+            return {}
+
+        positions = [self._positions(term, candidates) for term in terms]
+        matches = {}
+        for chunk_id in candidates:
+            following = [set(p[chunk_id]) for p in positions[1:]]
+            hits = sum(
+                1 for start in positions[0][chunk_id]
+                if all(start + i in later for i, later in enumerate(following, 1))
+            )
+            if hits:
+                matches[chunk_id] = hits
+        return matches
+
+    def _postings(self, term: str) -> Dict[int, int]:
+        postings = self._base.postings(term)
+        for layer in self._layers():
+            layer.apply(term, postings)
+        return postings
+
+    def _positions(self, term: str, chunk_ids: Set[int]) -> Dict[int, List[int]]:
+        positions = self._base.positions(term, chunk_ids)
+        for layer in self._layers():
+            layer.apply(term, positions, positions=True)
+        return positions
+
+    def _bm25(self, tf: int, df: int, docs: int, average: float, chunk_id: int) -> float:
+        idf = math.log(1 + (docs - df + 0.5) / (df + 0.5))
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self._length(chunk_id) / average)
+        return idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+    def _length(self, chunk_id: int) -> int:
+        doc = self._changes.added.get(chunk_id)
+        return doc.length if doc is not None else self._length_below(chunk_id)
+
+    def _length_below(self, chunk_id: int) -> Optional[int]:
+        """Length of `chunk_id` below the live segment, or None if it is not there."""
+        for layer in reversed(self._frozen):
+            doc = layer.added.get(chunk_id)
+            if doc is not None:
+                return doc.length
+            if chunk_id in layer.removed:
+                return None
+        i = self._base.position(chunk_id)
+        return self._base.lengths[i] if i >= 0 else None
+
+    def _chunks_of(self, pdf_id: int) -> Set[int]:
+        chunks = set(self._base.chunks_of(pdf_id))
+        for layer in self._layers():
+            chunks -= layer.removed
+            chunks.update(i for i, doc in layer.added.items() if doc.pdf_id == pdf_id)
+        return chunks
+
+    def _live_ids(self) -> Set[int]:
+        ids = set(self._base.ids)
+        for layer in self._layers():
+            ids -= layer.removed
+            ids.update(layer.added)
+        return ids
+
+    # Persistence
+
+    def merge(self, force: bool = False) -> None:
+        """
+        Write base and pending changes to a new file and swap it in. Queries
+        and writes go on meanwhile; the lock is held only to swap.
+        """
+        with self._merge_lock:
+            self._merge(force)
+
+    def _merge(self, force: bool) -> None:
+        with self._lock:
+            if self._changes:
+                self._frozen.append(self._changes)
+                self._changes = _Changes()
+            if not self._frozen and not force:
+                return
+            base, frozen = self._base, list(self._frozen)
+
+        # The base segment and frozen changes are immutable, so no lock is needed
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "wb") as f:
+            self._write(f, base, frozen)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        segment = _Segment(self.path)
+
+        with self._lock:
+            self._base.close()
+            self._base = segment
+            del self._frozen[:len(frozen)]
+        logger.debug("Merged inverted index: %d chunks, %d terms",
+                     segment.doc_count, len(segment.terms))
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+        self.wait_for_merge()
+        self.merge()
+        with self._lock:
+            self._base.close()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    @classmethod
+    def _write(cls, f, base: _Segment, layers: List[_Changes]) -> None:
+        f.write(b"\0" * _HEADER.size)
+        terms = set(base.terms).union(
+            *({term for term, ids in layer.terms.items() if ids} for layer in layers)
+        )
+        dictionary = []
+        for term in sorted(terms):
+            positions = base.positions(term)
+            for layer in layers:
+                layer.apply(term, positions, positions=True)
+            if not positions:
+                continue
+
+            ids = sorted(positions)
+            arrays = (
+                _pack(_deltas(ids)),
+                _pack(len(positions[i]) for i in ids),
+                _pack(delta for i in ids for delta in _deltas(positions[i])),
+            )
+            dictionary.append((term, f.tell(), len(ids), len(arrays[2]),
+                               "".join(a.typecode for a in arrays)))
+            for values in arrays:
+                values.tofile(f)
+
+        live = {
+            chunk_id: (base.pdf_ids[i], base.lengths[i]) for i, chunk_id in enumerate(base.ids)
+        }
+        for layer in layers:
+            for chunk_id in layer.removed:
+                live.pop(chunk_id, None)
+            live.update((chunk_id, (doc.pdf_id, doc.length)) for chunk_id, doc in layer.added.items())
+        docs = sorted((chunk_id, pdf_id, length) for chunk_id, (pdf_id, length) in live.items())
+        docs_offset = cls._align(f)
+        for column in zip(*docs) if docs else ((), (), ()):
+            array("I", column).tofile(f)
+
+        by_pdf = sorted((pdf_id, chunk_id) for chunk_id, pdf_id, _ in docs)
+        pdf_keys, pdf_starts = [], []
+        for index, (pdf_id, _) in enumerate(by_pdf):
+            if not pdf_keys or pdf_keys[-1] != pdf_id:
+                pdf_keys.append(pdf_id)
+                pdf_starts.append(index)
+        pdf_starts.append(len(by_pdf))
+        pdfs_offset = f.tell()
+        array("I", pdf_keys).tofile(f)
+        array("I", pdf_starts).tofile(f)
+        array("I", [chunk_id for _, chunk_id in by_pdf]).tofile(f)
+
+        terms_offset = f.tell()
+        for term, offset, doc_count, position_count, codes in dictionary:
+            encoded = term.encode("utf-8")
+            f.write(_TERM.pack(offset, doc_count, position_count, codes.encode("ascii"), len(encoded)))
+            f.write(encoded)
+
+        f.seek(0)
+        f.write(_HEADER.pack(
+            MAGIC, sys.byteorder == "little", len(docs), sum(d[2] for d in docs),
+            len(dictionary), docs_offset, len(pdf_keys), pdfs_offset, terms_offset,
+            max((d[0] for d in docs), default=0), sum(d[0] for d in docs),
+        ))
+
+    @staticmethod
+    def _align(f) -> int:
+        padding = -f.tell() % 4
+        f.write(b"\0" * padding)
+        return f.tell()
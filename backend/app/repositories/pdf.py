@@ -1,4 +1,5 @@
-from typing import Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
 from sqlalchemy.orm import Session, joinedload
 from app.models.pdf import PDF
 from app.repositories.base import BaseRepository
@@ -16,6 +17,46 @@ class PDFRepository(BaseRepository[PDF]):
             .first()
         )
 
+    def get_by_content_hash(self, content_hash: str) -> Optional[PDF]:
+        return self.db.query(PDF).filter(PDF.content_hash == content_hash).first()
+
+    def update_checkpoint(self, pdf_id: int, last_completed_page: int) -> None:
+        """Record progress; commits together with any pending chunk inserts."""
+        self.db.query(PDF).filter(PDF.id == pdf_id).update(
+            {"last_completed_page": last_completed_page}, synchronize_session=False
+        )
+        self.db.commit()
+
+    def set_fields(self, pdf_id: int, values: Dict[str, Any], commit: bool = True) -> None:
+        """UPDATE columns without loading the row, optionally inside a larger transaction."""
+        self.db.query(PDF).filter(PDF.id == pdf_id).update(values, synchronize_session=False)
+        if commit:
+            self.db.commit()
+
+    def select_ids(
+        self,
+        statuses: Optional[Sequence[str]] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        min_id: Optional[int] = None,
+        max_id: Optional[int] = None,
+    ) -> List[int]:
+        query = self.db.query(PDF.id)
+        if statuses:
+            query = query.filter(PDF.processing_status.in_(statuses))
+        if created_after:
+            query = query.filter(PDF.created_at >= created_after)
+        if created_before:
+            query = query.filter(PDF.created_at < created_before)
+        if min_id is not None:
+            query = query.filter(PDF.id >= min_id)
+        if max_id is not None:
+            query = query.filter(PDF.id <= max_id)
+        return [pdf_id for (pdf_id,) in query.order_by(PDF.id)]
+
+    def get_by_status(self, status: str) -> List[PDF]:
+        return self.db.query(PDF).filter(PDF.processing_status == status).all()
+
     def update_processing_status(
         self, pdf_id: int, status: str, error: Optional[str] = None
     ) -> Optional[PDF]:
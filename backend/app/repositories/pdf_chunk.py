@@ -1,8 +1,21 @@
-from typing import Optional, List
+import os
+from typing import Iterable, Iterator, Optional, List, Tuple, Union
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc
+from sqlalchemy import func, insert, tuple_
 from app.models.pdf_chunk import PDFChunk
 from app.repositories.base import BaseRepository
+from app.repositories.cursor import KeysetPage, keyset_page
+from app.repositories.search_cache import note_chunk_change
+from app.repositories.semantic_search import get_semantic_search
+from app.repositories.chunk_search import (
+    ChunkSearch,
+    SearchPage,
+    get_chunk_search,
+    get_write_tracker,
+    normalize_term,
+)
+
+BULK_INSERT_BATCH_SIZE = int(os.getenv("BULK_INSERT_BATCH_SIZE", "500"))
 
 
 class PDFChunkRepository(BaseRepository[PDFChunk]):
@@ -21,67 +34,178 @@ class PDFChunkRepository(BaseRepository[PDFChunk]):
             .all()
         )
 
+    def get_by_pdf_after(
+        self, pdf_id: int, cursor: Optional[str] = None, limit: int = 100
+    ) -> KeysetPage:
+        """Chunks in order, continuing after `cursor`; an index seek at any depth."""
+        return keyset_page(
+            self.db.query(PDFChunk).filter(PDFChunk.pdf_id == pdf_id),
+            [(PDFChunk.chunk_number, False), (PDFChunk.id, False)],
+            cursor,
+            limit,
+        )
+
+    @property
+    def search_backend(self) -> ChunkSearch:
+        return get_chunk_search(self.db)
+
     def search_content(
         self, pdf_id: int, search_term: str, skip: int = 0, limit: int = 100
     ) -> List[PDFChunk]:
-        return (
-            self.db.query(PDFChunk)
-            .filter(
-                PDFChunk.pdf_id == pdf_id, PDFChunk.content.ilike(f"%{search_term}%")
-            )
-            .order_by(PDFChunk.chunk_number)
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+        return self.search_backend.page(self.db, normalize_term(search_term), pdf_id, skip, limit)
 
     def search_all_content(
         self, search_term: str, skip: int = 0, limit: int = 100
     ) -> List[PDFChunk]:
-        return (
-            self.db.query(PDFChunk)
-            .filter(PDFChunk.content.ilike(f"%{search_term}%"))
-            .order_by(desc(PDFChunk.created_at))
-            .offset(skip)
-            .limit(limit)
-            .all()
+        return self.search_backend.page(self.db, normalize_term(search_term), None, skip, limit)
+
+    def search_page(
+        self,
+        search_term: str,
+        pdf_id: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 100,
+        max_count: Optional[int] = None,
+    ) -> SearchPage:
+        """Results and their total in one round trip (see ChunkSearch.search_page)."""
+        return self.search_backend.search_page(
+            self.db, normalize_term(search_term), pdf_id, skip, limit, max_count
         )
 
-    def count_search_content(
-        self, search_term: str, pdf_id: Optional[int] = None
-    ) -> int:
-        query = self.db.query(PDFChunk).filter(
-            PDFChunk.content.ilike(f"%{search_term}%")
+    def search_after(
+        self,
+        search_term: str,
+        pdf_id: Optional[int] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+    ) -> KeysetPage:
+        return self.search_backend.search_after(
+            self.db, normalize_term(search_term), pdf_id, cursor, limit
         )
 
-        if pdf_id:
-            query = query.filter(PDFChunk.pdf_id == pdf_id)
+    def count_search_upto(
+        self, search_term: str, pdf_id: Optional[int] = None, max_count: Optional[int] = None
+    ) -> Tuple[int, bool]:
+        return self.search_backend.count_upto(
+            self.db, normalize_term(search_term), pdf_id, max_count
+        )
 
-        return query.count()
+    def count_search_content(
+        self, search_term: str, pdf_id: Optional[int] = None
+    ) -> int:
+        return self.search_backend.count(self.db, normalize_term(search_term), pdf_id)
 
     def count_search_all_content(self, search_term: str) -> int:
         """Count search results across all PDFs."""
-        return (
-            self.db.query(PDFChunk)
-            .filter(PDFChunk.content.ilike(f"%{search_term}%"))
-            .count()
-        )
+        return self.search_backend.count(self.db, normalize_term(search_term))
 
     def count_by_pdf(self, pdf_id: int) -> int:
         """Count chunks for a specific PDF."""
         return self.db.query(PDFChunk).filter(PDFChunk.pdf_id == pdf_id).count()
 
-    def bulk_create(self, chunks_data: List[dict]) -> List[PDFChunk]:
-        """Create multiple chunks in bulk."""
-        chunks = []
-        for chunk_data in chunks_data:
-            chunk = PDFChunk(**chunk_data)
-            chunks.append(chunk)
+    def delete_by_pdf(self, pdf_id: int, commit: bool = True) -> int:
+        """Delete all chunks of a PDF without loading them."""
+        note_chunk_change(self.db, [pdf_id])
+        for tracker in self._write_trackers():
+            tracker.on_delete_pdf(self.db, pdf_id)
+        count = (
+            self.db.query(PDFChunk)
+            .filter(PDFChunk.pdf_id == pdf_id)
+            .delete(synchronize_session=False)
+        )
+        if commit:
+            self.db.commit()
+        return count
+
+    def delete_after_page(self, pdf_id: int, page_number: int, commit: bool = True) -> int:
+        query = self.db.query(PDFChunk).filter(
+            PDFChunk.pdf_id == pdf_id, PDFChunk.page_number > page_number
+        )
+        note_chunk_change(self.db, [pdf_id])
+        trackers = self._write_trackers()
+        if trackers:
+            ids = [row.id for row in query.with_entities(PDFChunk.id)]
+            for tracker in trackers:
+                tracker.on_delete(self.db, ids)
+        count = query.delete(synchronize_session=False)
+        if commit:
+            self.db.commit()
+        return count
+
+    def max_chunk_number(self, pdf_id: int) -> int:
+        return (
+            self.db.query(func.max(PDFChunk.chunk_number))
+            .filter(PDFChunk.pdf_id == pdf_id)
+            .scalar()
+            or 0
+        )
+
+    def bulk_create(
+        self,
+        chunks_data: Iterable[dict],
+        batch_size: int = BULK_INSERT_BATCH_SIZE,
+        return_ids: bool = False,
+        commit: bool = True,
+    ) -> Union[int, List[int]]:
+        """
+        Insert chunks with Core executemany in batches of `batch_size`.
+
+        `chunks_data` may be a generator; only one batch is held in memory.
+        No ORM objects are built or refreshed. Returns the number of rows
+        inserted, or their ids in insertion order when `return_ids` is set.
+        Search indexes that track writes are told about the new rows, and
+        the search cache forgets the affected documents on commit.
+        """
+        inserted = 0
+        ids: List[int] = []
+        trackers = self._write_trackers()
+
+        for batch in _batched(chunks_data, batch_size):
+            note_chunk_change(self.db, {row["pdf_id"] for row in batch})
+            if return_ids or trackers:
+                batch_ids = self._insert_returning_ids(batch)
+                if return_ids:
+                    ids.extend(batch_ids)
+                for tracker in trackers:
+                    tracker.on_insert(self.db, batch_ids, batch)
+            else:
+                self.db.execute(insert(PDFChunk), batch)
+            inserted += len(batch)
+
+        if commit:
+            self.db.commit()
 
-        self.db.add_all(chunks)
-        self.db.commit()
+        return ids if return_ids else inserted
+
+    def _write_trackers(self) -> list:
+        """Indexes kept in step with chunk writes: the search backend and the vector index."""
+        return [t for t in (get_write_tracker(self.db), get_semantic_search(self.db)) if t]
+
+    def _insert_returning_ids(self, batch: List[dict]) -> List[int]:
+        if getattr(self.db.bind.dialect, "full_returning", False):
+            result = self.db.execute(
+                insert(PDFChunk).values(batch).returning(PDFChunk.id)
+            )
+            return [row.id for row in result]
+
+        # No RETURNING support: chunks are unique per (pdf_id, chunk_number)
+        self.db.execute(insert(PDFChunk), batch)
+        keys = [(row["pdf_id"], row["chunk_number"]) for row in batch]
+        rows = (
+            self.db.query(PDFChunk.id, PDFChunk.pdf_id, PDFChunk.chunk_number)
+            .filter(tuple_(PDFChunk.pdf_id, PDFChunk.chunk_number).in_(keys))
+            .all()
+        )
+        id_by_key = {(row.pdf_id, row.chunk_number): row.id for row in rows}
+        return [id_by_key[key] for key in keys]
 
-        for chunk in chunks:
-            self.db.refresh(chunk)
 
-        return chunks
+def _batched(items: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,159 @@
+"""
+In-process cache of chunk search results.
+
+Entries are keyed by the search backend's normalized form of the query, the
+`pdf_id` scope and the page requested, and are evicted least recently used
+once their estimated size exceeds SEARCH_CACHE_MAX_BYTES, or after
+SEARCH_CACHE_TTL seconds. SEARCH_CACHE_MAX_BYTES=0 disables the cache.
+
+Invalidation follows chunk writes: PDFChunkRepository reports the documents
+whose chunks it inserts or deletes, and when that session commits, entries
+scoped to those documents and all unscoped (all-document) entries are
+dropped. Writes made by another process, such as the reindex CLI, are only
+picked up when the TTL expires.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+SEARCH_CACHE_MAX_BYTES = int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "300"))
+
+# Rough per-entry bookkeeping cost on top of the cached text
+ENTRY_OVERHEAD_BYTES = 512
+
+_Entry = Tuple[Any, int, float, Optional[int]]  # value, size, expires at, pdf_id scope
+
+
+class SearchCache:
+    """Thread-safe LRU of search results with a byte budget and a TTL."""
+
+    def __init__(
+        self,
+        max_bytes: int = SEARCH_CACHE_MAX_BYTES,
+        ttl: float = SEARCH_CACHE_TTL,
+        clock=time.monotonic,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._by_scope: Dict[Optional[int], Set[Hashable]] = {}
+        self._bytes = 0
+        self._generation = 0
+        self._hits = self._misses = self._evictions = self._expirations = 0
+        self._invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @property
+    def generation(self) -> int:
+        """Changes on every invalidation; pass the value read before a search to `put`."""
+        return self._generation
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            if entry[2] <= self._clock():
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(
+        self, key: Hashable, value: Any, size: int, pdf_id: Optional[int], generation: int
+    ) -> None:
+        """
+        Store `value`, unless an invalidation happened since `generation`
+        was read: the value may then predate the write.
+        """
+        size += ENTRY_OVERHEAD_BYTES
+        with self._lock:
+            if not self.enabled or generation != self._generation or size > self.max_bytes:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, self._clock() + self.ttl, pdf_id)
+            self._by_scope.setdefault(pdf_id, set()).add(key)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def invalidate(self, pdf_ids: Iterable[int]) -> None:
+        """Drop what changes to `pdf_ids` can affect: their own entries and every unscoped one."""
+        with self._lock:
+            self._generation += 1
+            for scope in set(pdf_ids) | {None}:
+                for key in list(self._by_scope.get(scope, ())):
+                    self._remove(key)
+                    self._invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._by_scope.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else None,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _, pdf_id = self._entries.pop(key)
+        self._bytes -= size
+        scope = self._by_scope.get(pdf_id)
+        if scope is not None:
+            scope.discard(key)
+            if not scope:
+                del self._by_scope[pdf_id]
+
+
+search_cache = SearchCache()
+
+
+_CHANGED_PDFS = "search_cache_changed_pdfs"
+
+
+def note_chunk_change(db: Session, pdf_ids: Iterable[int]) -> None:
+    """Record documents whose chunks `db` changed; the cache forgets them on commit."""
+    db.info.setdefault(_CHANGED_PDFS, set()).update(pdf_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed(session):
+    changed = session.info.pop(_CHANGED_PDFS, None)
+    if changed:
+        search_cache.invalidate(changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed(session):
+    session.info.pop(_CHANGED_PDFS, None)
@@ -0,0 +1,121 @@
+"""
+Semantic chunk search over a VectorIndex kept in step with pdf_chunks.
+
+Enabled with SEMANTIC_SEARCH=true. Chunks are vectorized as they are
+inserted, on the ingesting thread, and the vectors enter the index when
+that transaction commits. An index behind the database is rebuilt when
+first opened.
+"""
+
+import logging
+import os
+import threading
+from functools import partial
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app.models.pdf_chunk import PDFChunk
+from app.repositories.chunk_search import _engine_of, defer_until_commit
+from app.repositories.vector_index import HashingVectorizer, VectorIndex
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_SEARCH = os.getenv("SEMANTIC_SEARCH", "false").lower() == "true"
+VECTOR_INDEX_PATH = os.getenv("VECTOR_INDEX_PATH", "./search_index/vectors")
+
+_REBUILD_BATCH_SIZE = 1000
+
+
+class SemanticSearch:
+    def __init__(self, index: VectorIndex, vectorizer: HashingVectorizer):
+        self.index = index
+        self.vectorizer = vectorizer
+
+    @classmethod
+    def open(cls, engine: Engine, path: str) -> "SemanticSearch":
+        """Open the index at `path`, rebuilding it if it is behind the database."""
+        vectorizer = HashingVectorizer()
+        index = VectorIndex(path, vectorizer.dim)
+        with engine.connect() as connection:
+            row = connection.execute(
+                select(
+                    func.count(PDFChunk.id),
+                    func.coalesce(func.max(PDFChunk.id), 0),
+                    func.coalesce(func.sum(PDFChunk.id), 0),
+                )
+            ).one()
+            if tuple(row) != index.fingerprint():
+                logger.info("Rebuilding vector index at %s from %d chunks", path, row[0])
+                result = connection.execution_options(stream_results=True).execute(
+                    select(PDFChunk.id, PDFChunk.pdf_id, PDFChunk.content).order_by(PDFChunk.id)
+                )
+                index.rebuild(
+                    (
+                        [r.id for r in rows],
+                        [r.pdf_id for r in rows],
+                        vectorizer.transform([r.content for r in rows]),
+                    )
+                    for rows in iter(lambda: result.fetchmany(_REBUILD_BATCH_SIZE), [])
+                )
+        return cls(index, vectorizer)
+
+    def search(
+        self, db: Session, query: str, pdf_id: Optional[int] = None, limit: int = 10
+    ) -> List[Tuple[PDFChunk, float]]:
+        """The `limit` chunks closest to `query`, best first, with their scores."""
+        ranked = self.index.search(self.vectorizer.transform([query])[0], limit, pdf_id)
+        if not ranked:
+            return []
+        chunks = {
+            c.id: c
+            for c in db.query(PDFChunk).filter(PDFChunk.id.in_([i for i, _ in ranked]))
+        }
+        return [(chunks[i], score) for i, score in ranked if i in chunks]
+
+    def on_insert(self, db: Session, ids: Iterable[int], rows: Iterable[dict]) -> None:
+        rows = list(rows)
+        vectors = self.vectorizer.transform([row["content"] for row in rows])
+        defer_until_commit(
+            db, partial(self.index.add, list(ids), [row["pdf_id"] for row in rows], vectors)
+        )
+
+    def on_delete(self, db: Session, chunk_ids: Iterable[int]) -> None:
+        defer_until_commit(db, partial(self.index.remove, list(chunk_ids)))
+
+    def on_delete_pdf(self, db: Session, pdf_id: int) -> None:
+        defer_until_commit(db, partial(self.index.remove_pdf, pdf_id))
+
+    def close(self) -> None:
+        self.index.close()
+
+
+_indexes: Dict[int, SemanticSearch] = {}
+# Held while an index is opened, so concurrent first uses open it once
+_indexes_lock = threading.Lock()
+
+
+def get_semantic_search(db: Session) -> Optional[SemanticSearch]:
+    """
+    The semantic index for the database behind `db`, opened on first use,
+    or None when semantic search is off. Chunk writes are reported to it.
+    """
+    if not SEMANTIC_SEARCH:
+        return None
+    engine = _engine_of(db)
+    key = id(engine)
+    search = _indexes.get(key)
+    if search is None:
+        with _indexes_lock:
+            search = _indexes.get(key)
+            if search is None:
+                search = _indexes[key] = SemanticSearch.open(engine, VECTOR_INDEX_PATH)
+    return search
+
+
+def close_semantic_search() -> None:
+    """Persist and release vector indexes; called on shutdown."""
+    with _indexes_lock:
+        for search in _indexes.values():
+            search.close()
+        _indexes.clear()
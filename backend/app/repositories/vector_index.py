@@ -0,0 +1,278 @@
+"""
+Memory-mapped vector index for semantic chunk search.
+
+Chunks are vectorized offline with the hashing trick: each folded word is
+hashed to one of VECTOR_DIM signed buckets, and so is its first STEM_LENGTH
+characters, a crude stem that lets "invoices" and "invoicing" meet. Words
+are weighted by sublinear term frequency and vectors L2-normalized. There
+is no vocabulary to fit or model to ship, so stored vectors never go stale
+as documents come and go. At query time each bucket is weighted by an
+inverse document frequency kept per bucket, which discounts words that
+occur everywhere.
+
+Vectors live in a float32 matrix memory-mapped from disk, column i holding
+the chunk in slot i of the id arrays. The matrix is feature-major,
+(dim, capacity): a query of a few words touches a few buckets, so scoring
+reads only those rows, four bytes per chunk each, however large dim is.
+The best `limit` scores are picked with argpartition.
+
+Removed chunks have their column zeroed, so they never score; their slots
+are reclaimed when the matrix would otherwise have to grow. The id arrays
+and bucket frequencies are written on flush; an index that does not match
+the database is rebuilt when opened (see SemanticSearch.open). Only one
+process may write an index file: opening one takes an exclusive lock on
+`<path>.lock`, and a second writer gets IndexInUseError.
+"""
+
+import logging
+import math
+import os
+import threading
+import zlib
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from app.repositories.inverted_index import lock_index_file, tokenize
+
+logger = logging.getLogger(__name__)
+
+VECTOR_DIM = int(os.getenv("VECTOR_DIM", "1024"))
+
+STEM_LENGTH = 5
+MIN_CAPACITY = 1024
+# Rows copied per step when the matrix is rewritten, bounding the memory used
+_REWRITE_ROWS = 16
+
+
+class HashingVectorizer:
+    """Text to L2-normalized float32 vectors via signed feature hashing."""
+
+    def __init__(self, dim: int = VECTOR_DIM):
+        self.dim = dim
+        self._word_features = lru_cache(maxsize=200_000)(self._hash_word)
+
+    def _hash_word(self, word: str) -> Tuple[Tuple[int, float], ...]:
+        features = [word]
+        if len(word) > STEM_LENGTH:
+            # The suffix keeps a stem apart from the word it happens to spell
+            features.append(word[:STEM_LENGTH] + "~")
+        hashed = []
+        for feature in features:
+            h = zlib.crc32(feature.encode())
+            # Low bits pick the bucket, the top bit the sign
+            hashed.append((h % self.dim, 1.0 if h & 0x80000000 else -1.0))
+        return tuple(hashed)
+
+    def transform(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            values: Dict[int, float] = {}
+            for word, tf in Counter(tokenize(text)).items():
+                scale = 1.0 + math.log(tf)
+                for bucket, sign in self._word_features(word):
+                    values[bucket] = values.get(bucket, 0.0) + sign * scale
+            if values:
+                vectors[row, list(values)] = list(values.values())
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+
+class VectorIndex:
+    def __init__(self, path: str, dim: int = VECTOR_DIM):
+        self.path = path
+        self.dim = dim
+        self._matrix_path = path + ".f32"
+        self._meta_path = path + ".npz"
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Before _open, which may truncate the matrix file under another writer
+        self._lock_file = lock_index_file(path)
+        self._open()
+
+    # Storage
+
+    def _open(self) -> None:
+        ids = pdf_ids = df = None
+        try:
+            with np.load(self._meta_path) as meta:
+                if int(meta["dim"]) == self.dim:
+                    ids, pdf_ids, df = meta["ids"], meta["pdf_ids"], meta["df"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+        size = os.path.getsize(self._matrix_path) if os.path.exists(self._matrix_path) else 0
+        capacity = size // (4 * self.dim)
+        if ids is None or capacity < max(len(ids), MIN_CAPACITY):
+            # Missing or inconsistent: start empty, the caller rebuilds
+            self._reset()
+            return
+
+        self._matrix = np.memmap(
+            self._matrix_path, dtype=np.float32, mode="r+", shape=(self.dim, capacity)
+        )
+        self._count = len(ids)  # slots in use, live or removed
+        self._ids = np.full(capacity, -1, dtype=np.int64)
+        self._pdf_ids = np.full(capacity, -1, dtype=np.int64)
+        self._ids[: self._count] = ids
+        self._pdf_ids[: self._count] = pdf_ids
+        self._df = df.astype(np.int64)
+        self._live = int(np.count_nonzero(self._ids[: self._count] >= 0))
+        self._max_id = int(self._ids.max(initial=0))
+
+    def _reset(self) -> None:
+        self._matrix = np.memmap(
+            self._matrix_path, dtype=np.float32, mode="w+", shape=(self.dim, MIN_CAPACITY)
+        )
+        self._count = self._live = 0
+        self._ids = np.full(MIN_CAPACITY, -1, dtype=np.int64)
+        self._pdf_ids = np.full(MIN_CAPACITY, -1, dtype=np.int64)
+        self._df = np.zeros(self.dim, dtype=np.int64)
+        self._max_id = 0
+
+    def flush(self) -> None:
+        with self._lock:
+            self._matrix.flush()
+            tmp = self._meta_path + ".tmp"
+            with open(tmp, "wb") as f:
+                np.savez(
+                    f,
+                    dim=self.dim,
+                    ids=self._ids[: self._count],
+                    pdf_ids=self._pdf_ids[: self._count],
+                    df=self._df,
+                )
+            os.replace(tmp, self._meta_path)
+
+    def close(self) -> None:
+        self.flush()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def __len__(self) -> int:
+        return self._live
+
+    def fingerprint(self) -> Tuple[int, int, int]:
+        """(chunk count, max chunk id, chunk id sum), to compare with the database."""
+        ids = self._ids[: self._count]
+        ids = ids[ids >= 0]
+        return len(ids), int(ids.max(initial=0)), int(ids.sum())
+
+    # Writes
+
+    def add(self, chunk_ids: Sequence[int], pdf_ids: Sequence[int], vectors: np.ndarray) -> None:
+        """Store one vector (row of `vectors`) per chunk, replacing any it had."""
+        n = len(chunk_ids)
+        if not n:
+            return
+        with self._lock:
+            self._remove_slots(self._slots_of(chunk_ids))
+            if self._count + n > len(self._ids):
+                self._make_room(n)
+            start, end = self._count, self._count + n
+            self._matrix[:, start:end] = vectors.T
+            self._ids[start:end] = chunk_ids
+            self._pdf_ids[start:end] = pdf_ids
+            self._df += np.count_nonzero(vectors, axis=0)
+            self._count = end
+            self._live += n
+            self._max_id = max(self._max_id, int(np.max(chunk_ids)))
+
+    def remove(self, chunk_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._remove_slots(self._slots_of(list(chunk_ids)))
+
+    def remove_pdf(self, pdf_id: int) -> None:
+        with self._lock:
+            self._remove_slots(np.flatnonzero(self._pdf_ids[: self._count] == pdf_id))
+
+    def rebuild(self, batches: Iterable[Tuple[Sequence[int], Sequence[int], np.ndarray]]) -> None:
+        """Replace the contents with `(chunk_ids, pdf_ids, vectors)` batches."""
+        with self._lock:
+            self._reset()
+        for chunk_ids, pdf_ids, vectors in batches:
+            self.add(chunk_ids, pdf_ids, vectors)
+        self.flush()
+
+    def _slots_of(self, chunk_ids: Sequence[int]) -> np.ndarray:
+        # New chunks have ids above every indexed one, so there is nothing to find
+        if not self._live or not len(chunk_ids) or min(chunk_ids) > self._max_id:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(np.isin(self._ids[: self._count], chunk_ids))
+
+    def _remove_slots(self, slots: np.ndarray) -> None:
+        slots = slots[self._ids[slots] >= 0]
+        if not slots.size:
+            return
+        columns = self._matrix[:, slots]
+        self._df -= np.count_nonzero(columns, axis=1)
+        self._matrix[:, slots] = 0
+        self._ids[slots] = -1
+        self._pdf_ids[slots] = -1
+        self._live -= len(slots)
+
+    def _make_room(self, n: int) -> None:
+        """Compact live slots into a new matrix, growing it if they still would not fit."""
+        capacity = len(self._ids)
+        if self._live + n > capacity * 3 // 4:
+            capacity = max(capacity * 2, self._live + n)
+        live = np.flatnonzero(self._ids[: self._count] >= 0)
+
+        tmp = self._matrix_path + ".tmp"
+        matrix = np.memmap(tmp, dtype=np.float32, mode="w+", shape=(self.dim, capacity))
+        for row in range(0, self.dim, _REWRITE_ROWS):
+            block = slice(row, row + _REWRITE_ROWS)
+            matrix[block, : len(live)] = self._matrix[block, : self._count][:, live]
+        matrix.flush()
+        os.replace(tmp, self._matrix_path)
+
+        ids = np.full(capacity, -1, dtype=np.int64)
+        pdf_ids = np.full(capacity, -1, dtype=np.int64)
+        ids[: len(live)] = self._ids[live]
+        pdf_ids[: len(live)] = self._pdf_ids[live]
+        # Searches holding the old arrays finish on them
+        self._matrix, self._ids, self._pdf_ids = matrix, ids, pdf_ids
+        self._count = len(live)
+        logger.info("Vector index %s compacted to %d of %d slots", self.path, self._count, capacity)
+
+    # Queries
+
+    def search(
+        self, query: np.ndarray, limit: int = 10, pdf_id: Optional[int] = None
+    ) -> List[Tuple[int, float]]:
+        """(chunk id, score) of the best matches for a vector from the same vectorizer."""
+        with self._lock:
+            matrix, ids, pdf_ids, count = self._matrix, self._ids, self._pdf_ids, self._count
+            idf = np.log((1 + self._live) / (1 + self._df)) + 1
+
+        weights = query * idf
+        buckets = np.flatnonzero(weights)
+        if not buckets.size or not count:
+            return []
+        weights = (weights[buckets] / np.linalg.norm(weights[buckets])).astype(np.float32)
+
+        if pdf_id is None:
+            slots = None
+            rows = matrix[buckets, :count]
+        else:
+            slots = np.flatnonzero(pdf_ids[:count] == pdf_id)
+            rows = matrix[np.ix_(buckets, slots)]
+        # Faster than `@` for a short weight vector against long rows
+        scores = np.einsum("i,ij->j", weights, rows)
+
+        # Removed and unrelated chunks score zero or less. Dropping them first
+        # also spares argpartition the ties, which slow it down badly.
+        best = np.flatnonzero(scores > 0)
+        if best.size > limit:
+            best = best[np.argpartition(scores[best], -limit)[-limit:]]
+        best = best[np.argsort(-scores[best], kind="stable")]
+
+        found = best if slots is None else slots[best]
+        return [
+            (int(chunk_id), float(score))
+            for chunk_id, score in zip(ids[found], scores[best])
+            if chunk_id >= 0
+        ]
@@ -0,0 +1,51 @@
+"""
+Server-Sent Events (text/event-stream) for ingestion progress.
+
+The stream opens with the document's current state from the database and
+then relays events from the in-process progress broker until the document
+reaches a terminal status or the client goes away. Comment lines are sent
+while idle so proxies keep the connection open.
+"""
+
+import json
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict
+from app.services.progress import TERMINAL_STATUSES, Subscription
+
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    # Stop nginx from buffering the stream
+    "X-Accel-Buffering": "no",
+}
+
+
+def format_event(data: Dict[str, Any], event: str = "progress") -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+async def progress_events(
+    subscription: Subscription,
+    snapshot: Dict[str, Any],
+    is_disconnected: Callable[[], Awaitable[bool]],
+    heartbeat: float = SSE_HEARTBEAT_SECONDS,
+) -> AsyncIterator[str]:
+    try:
+        yield format_event(snapshot)
+        if snapshot["status"] in TERMINAL_STATUSES:
+            return
+
+        while True:
+            event = await subscription.get(heartbeat)
+            if event is None:
+                if await is_disconnected():
+                    return
+                yield ": keep-alive\n\n"
+                continue
+
+            yield format_event(event)
+            if event["status"] in TERMINAL_STATUSES:
+                return
+    finally:
+        subscription.close()
@@ -1,46 +1,171 @@
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from collections import Counter
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, UploadFile, File, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.services.pdf_service import PDFService
-from app.schemas.pdf import PDFResponse, PDFListResponse, PDFDetailResponse
+from app.services.pdf_service import PDFService, SemanticSearchDisabled, UploadTooLargeError
+from app.schemas.pdf import (
+    PDFResponse,
+    PDFListResponse,
+    PDFDetailResponse,
+    BatchUploadItem,
+    BatchUploadResponse,
+    BatchStatusItem,
+    BatchStatusResponse,
+)
+from app.repositories.ingestion_job import IngestionJobRepository
+from app.repositories.search_cache import search_cache
+from app.services.admission import AdmissionRejected, upload_gate
+from app.services.ingestion_queue import ingestion_queue
 from app.schemas.pdf_chunk import (
     PDFChunkResponse,
     PDFChunkListResponse,
     PDFChunkSearchResponse,
+    PDFChunkSnippet,
+    PDFChunkSnippetSearchResponse,
+    SemanticSearchHit,
+    SemanticSearchResponse,
 )
 from app.routers.user_router import get_current_user
+from app.routers.range_response import RangeFileResponse, RangeNotSatisfiable
+from app.routers.event_stream import SSE_HEADERS, progress_events
+from app.services.progress import progress_broker
+from app.services.snippets import make_snippet
 
 router = APIRouter(prefix="/api/pdfs", tags=["pdfs"])
 
 
-@router.post("/upload", response_model=PDFResponse)
+def _admission_error(error: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=error.status_code,
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+
+@router.post("/upload", response_model=PDFResponse, status_code=202)
 async def upload_pdf(
     file: UploadFile = File(...),
     title: Optional[str] = Query(None, description="PDF title"),
+    force: bool = Query(False, description="Re-parse even if this file was already uploaded"),
+    engine: Optional[str] = Query(
+        None, description="Text extraction engine: pdfplumber, pypdf or auto"
+    ),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
     try:
-        pdf_service = PDFService(db)
-        pdf = await pdf_service.upload_and_parse_pdf(file, title)
+        async with upload_gate.admit():
+            pdf_service = PDFService(db)
+            pdf = await pdf_service.upload_and_parse_pdf(
+                file, title, force=force, engine=engine
+            )
         return PDFResponse.model_validate(pdf)
+    except AdmissionRejected as e:
+        raise _admission_error(e)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to process PDF: {str(e)}")
 
 
+@router.post("/upload/batch", response_model=BatchUploadResponse, status_code=202)
+async def upload_pdf_batch(
+    files: List[UploadFile] = File(..., description="PDF files, or a single ZIP of PDFs"),
+    force: bool = Query(False, description="Re-parse files that were already uploaded"),
+    engine: Optional[str] = Query(
+        None, description="Text extraction engine: pdfplumber, pypdf or auto"
+    ),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    try:
+        async with upload_gate.admit():
+            pdf_service = PDFService(db)
+            batch_id, items = await pdf_service.upload_batch(files, force=force, engine=engine)
+        return BatchUploadResponse(
+            batch_id=batch_id,
+            total=len(items),
+            accepted=sum(1 for item in items if item.status != "rejected"),
+            items=[BatchUploadItem(**item._asdict()) for item in items],
+        )
+    except AdmissionRejected as e:
+        raise _admission_error(e)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to process batch: {str(e)}")
+
+
+@router.get("/ingestion/stats")
+def get_ingestion_stats(
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Upload admission and ingestion backlog figures for monitoring."""
+    return {
+        "uploads": upload_gate.stats(),
+        "jobs": ingestion_queue.stats(IngestionJobRepository(db)),
+    }
+
+
+@router.get("/search/cache/stats")
+def get_search_cache_stats(current_user=Depends(get_current_user)):
+    """Search result cache size and hit/miss figures for monitoring."""
+    return search_cache.stats()
+
+
+@router.get("/batches/{batch_id}", response_model=BatchStatusResponse)
+def get_batch_status(
+    batch_id: str,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    jobs = IngestionJobRepository(db).get_by_batch(batch_id)
+    if not jobs:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    items = [
+        BatchStatusItem(
+            pdf_id=job.pdf_id,
+            filename=job.pdf.filename,
+            job_status=job.status,
+            processing_status=job.pdf.processing_status,
+            error=job.error or job.pdf.processing_error,
+        )
+        for job in jobs
+    ]
+    return BatchStatusResponse(
+        batch_id=batch_id,
+        total=len(items),
+        counts=dict(Counter(item.job_status for item in items)),
+        items=items,
+    )
+
+
 @router.get("/", response_model=PDFListResponse)
 def get_pdfs(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=100, description="Number of records to return"),
+    cursor: Optional[str] = Query(
+        None, description="Keyset cursor from next_cursor; pass it empty to start. Overrides skip"
+    ),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
     try:
         pdf_service = PDFService(db)
-        pdfs = pdf_service.get_pdf_list(skip=skip, limit=limit)
+        next_cursor = None
+        if cursor is not None:
+            pdfs, next_cursor = pdf_service.get_pdf_list_after(cursor, limit=limit)
+        else:
+            pdfs = pdf_service.get_pdf_list(skip=skip, limit=limit)
 
         # Get total count for pagination
         total = pdf_service.pdf_repo.count()
@@ -48,10 +173,13 @@ def get_pdfs(
         return PDFListResponse(
             items=[PDFResponse.model_validate(pdf) for pdf in pdfs],
             total=total,
-            page=skip // limit + 1,
+            page=None if cursor is not None else skip // limit + 1,
             size=limit,
             pages=(total + limit - 1) // limit,
+            next_cursor=next_cursor,
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to retrieve PDFs: {str(e)}"
@@ -82,11 +210,103 @@ def get_pdf_detail(
         raise HTTPException(status_code=500, detail=f"Failed to retrieve PDF: {str(e)}")
 
 
+@router.get("/{pdf_id}/file")
+def download_pdf_file(
+    pdf_id: int,
+    range: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Serve the original PDF, honouring single byte-range requests."""
+    pdf_service = PDFService(db)
+    pdf = pdf_service.get_pdf_file(pdf_id)
+
+    if not pdf:
+        raise HTTPException(status_code=404, detail="PDF file not found")
+
+    try:
+        return RangeFileResponse(
+            pdf.file_path, range_header=range, filename=pdf.filename
+        )
+    except RangeNotSatisfiable:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{pdf.file_size}"},
+        )
+
+
+@router.get("/{pdf_id}/progress")
+async def stream_pdf_progress(
+    pdf_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    Server-Sent Events stream of parsing progress: pages parsed, chunks
+    written and the final status. Cheaper than polling the detail endpoint.
+    """
+    # Subscribe (on the event loop) before reading the snapshot so no event
+    # falls in between; the query itself must not block the loop
+    subscription = progress_broker.subscribe(pdf_id)
+    try:
+        snapshot = await run_in_threadpool(PDFService(db).get_progress, pdf_id)
+    except Exception as e:
+        subscription.close()
+        raise HTTPException(status_code=500, detail=f"Failed to read progress: {str(e)}")
+
+    if not snapshot:
+        subscription.close()
+        raise HTTPException(status_code=404, detail="PDF not found")
+
+    return StreamingResponse(
+        progress_events(subscription, snapshot, request.is_disconnected),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+@router.post("/{pdf_id}/reprocess", response_model=PDFResponse, status_code=202)
+def reprocess_pdf(
+    pdf_id: int,
+    engine: Optional[str] = Query(
+        None, description="Text extraction engine: pdfplumber, pypdf or auto"
+    ),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Re-parse a document from its stored original file."""
+    try:
+        pdf_service = PDFService(db)
+        pdf = pdf_service.reprocess_pdf(pdf_id, engine)
+
+        if not pdf:
+            raise HTTPException(status_code=404, detail="PDF not found")
+
+        return PDFResponse.model_validate(pdf)
+    except HTTPException:
+        raise
+    except AdmissionRejected as e:
+        raise _admission_error(e)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to reprocess PDF: {str(e)}"
+        )
+
+
 @router.get("/{pdf_id}/chunks", response_model=PDFChunkListResponse)
 def get_pdf_chunks(
     pdf_id: int,
     skip: int = Query(0, ge=0, description="Number of chunks to skip"),
     limit: int = Query(20, ge=1, le=50, description="Number of chunks to return"),
+    cursor: Optional[str] = Query(
+        None, description="Keyset cursor from next_cursor; pass it empty to start. Overrides skip"
+    ),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
@@ -96,59 +316,193 @@ def get_pdf_chunks(
         if not pdf_service.pdf_repo.exists(pdf_id):
             raise HTTPException(status_code=404, detail="PDF not found")
 
-        chunks = pdf_service.get_pdf_chunks(pdf_id, skip=skip, limit=limit)
+        next_cursor = None
+        if cursor is not None:
+            chunks, next_cursor = pdf_service.get_pdf_chunks_after(pdf_id, cursor, limit=limit)
+        else:
+            chunks = pdf_service.get_pdf_chunks(pdf_id, skip=skip, limit=limit)
         total = pdf_service.chunk_repo.count_by_pdf(pdf_id)
 
         return PDFChunkListResponse(
             items=[PDFChunkResponse.model_validate(chunk) for chunk in chunks],
             total=total,
-            page=skip // limit + 1,
+            page=None if cursor is not None else skip // limit + 1,
             size=limit,
             pages=(total + limit - 1) // limit,
             pdf_id=pdf_id,
+            next_cursor=next_cursor,
         )
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to retrieve chunks: {str(e)}"
         )
 
 
+@router.get("/{pdf_id}/chunks/{chunk_id}", response_model=PDFChunkResponse)
+def get_pdf_chunk(
+    pdf_id: int,
+    chunk_id: int,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """One chunk with its full text, e.g. to expand a search snippet."""
+    try:
+        chunk = PDFService(db).get_pdf_chunk(pdf_id, chunk_id)
+        if not chunk:
+            raise HTTPException(status_code=404, detail="Chunk not found")
+        return PDFChunkResponse.model_validate(chunk)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve chunk: {str(e)}")
+
+
+def _search(
+    pdf_service: PDFService,
+    q: str,
+    pdf_id: Optional[int],
+    skip: int,
+    limit: int,
+    max_count: Optional[int],
+    cursor: Optional[str],
+):
+    """Run a search for the content and snippet endpoints: the chunks and the page fields."""
+    if pdf_id and not pdf_service.pdf_repo.exists(pdf_id):
+        raise HTTPException(status_code=404, detail="PDF not found")
+
+    next_cursor = None
+    total, total_is_exact = None, True
+    if cursor is not None:
+        chunks, next_cursor = pdf_service.search_after(q, pdf_id, cursor, limit=limit)
+        if not cursor:
+            # Counting costs a scan of every match; only the first cursor page pays it
+            total, total_is_exact = pdf_service.count_search_results_upto(q, pdf_id, max_count)
+        page = None
+    else:
+        # Results and their count come back from one query
+        chunks, total, total_is_exact = pdf_service.search_with_total(
+            q, pdf_id, skip=skip, limit=limit, max_count=max_count
+        )
+        page = skip // limit + 1
+
+    # Calculate pagination
+    pages = None if total is None else (total + limit - 1) // limit
+
+    return chunks, dict(
+        total=total,
+        page=page,
+        size=limit,
+        pages=pages,
+        query=q,
+        pdf_id=pdf_id,
+        total_is_exact=total_is_exact,
+        next_cursor=next_cursor,
+    )
+
+
 @router.get("/search/content", response_model=PDFChunkSearchResponse)
 def search_pdf_content(
     q: str = Query(..., min_length=1, description="Search query"),
     pdf_id: Optional[int] = Query(None, description="Search within specific PDF"),
     skip: int = Query(0, ge=0, description="Number of results to skip"),
     limit: int = Query(20, ge=1, le=50, description="Number of results to return"),
+    max_count: Optional[int] = Query(
+        None, ge=1, description="Stop counting matches past this many; total is then a lower bound"
+    ),
+    cursor: Optional[str] = Query(
+        None, description="Keyset cursor from next_cursor; pass it empty to start. Overrides skip"
+    ),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
+    try:
+        chunks, fields = _search(PDFService(db), q, pdf_id, skip, limit, max_count, cursor)
+        return PDFChunkSearchResponse(
+            items=[PDFChunkResponse.model_validate(chunk) for chunk in chunks], **fields
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+
+@router.get("/search/snippets", response_model=PDFChunkSnippetSearchResponse)
+def search_pdf_snippets(
+    q: str = Query(..., min_length=1, description="Search query"),
+    pdf_id: Optional[int] = Query(None, description="Search within specific PDF"),
+    skip: int = Query(0, ge=0, description="Number of results to skip"),
+    limit: int = Query(20, ge=1, le=50, description="Number of results to return"),
+    max_count: Optional[int] = Query(
+        None, ge=1, description="Stop counting matches past this many; total is then a lower bound"
+    ),
+    cursor: Optional[str] = Query(
+        None, description="Keyset cursor from next_cursor; pass it empty to start. Overrides skip"
+    ),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    Search like /search/content, but return a short match-centred snippet
+    with highlight offsets per hit instead of the whole chunk.
+    """
+    try:
+        chunks, fields = _search(PDFService(db), q, pdf_id, skip, limit, max_count, cursor)
+        items = []
+        for chunk in chunks:
+            snippet = make_snippet(chunk.content, q)
+            items.append(
+                PDFChunkSnippet(
+                    id=chunk.id,
+                    pdf_id=chunk.pdf_id,
+                    chunk_number=chunk.chunk_number,
+                    page_number=chunk.page_number,
+                    snippet=snippet.text,
+                    highlights=snippet.highlights,
+                )
+            )
+        return PDFChunkSnippetSearchResponse(items=items, **fields)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+
+@router.get("/search/semantic", response_model=SemanticSearchResponse)
+def search_pdf_semantic(
+    q: str = Query(..., min_length=1, description="Search query"),
+    pdf_id: Optional[int] = Query(None, description="Search within specific PDF"),
+    limit: int = Query(10, ge=1, le=50, description="Number of results to return"),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Chunks ranked by vector similarity to the query rather than by keyword match."""
     try:
         pdf_service = PDFService(db)
 
         if pdf_id and not pdf_service.pdf_repo.exists(pdf_id):
             raise HTTPException(status_code=404, detail="PDF not found")
 
-        # Get search results and count
-        chunks = pdf_service.search_pdf_content(q, pdf_id, skip=skip, limit=limit)
-        total = pdf_service.count_search_results(q, pdf_id)
-
-        # Calculate pagination
-        page = skip // limit + 1
-        pages = (total + limit - 1) // limit if total > 0 else 0
-
-        return PDFChunkSearchResponse(
-            items=[PDFChunkResponse.model_validate(chunk) for chunk in chunks],
-            total=total,
-            page=page,
-            size=limit,
-            pages=pages,
+        hits = pdf_service.semantic_search(q, pdf_id, limit=limit)
+        return SemanticSearchResponse(
+            items=[
+                SemanticSearchHit(chunk=PDFChunkResponse.model_validate(chunk), score=score)
+                for chunk, score in hits
+            ],
             query=q,
             pdf_id=pdf_id,
         )
     except HTTPException:
         raise
+    except SemanticSearchDisabled as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
@@ -0,0 +1,131 @@
+"""
+Byte-range file responses (RFC 7233, single range).
+
+When the ASGI server advertises the `http.response.zerocopysend` extension the
+kernel copies the file straight to the socket (sendfile); otherwise the range
+is streamed in fixed-size blocks so memory use stays flat for large files.
+"""
+
+import os
+from typing import Optional, Tuple
+from urllib.parse import quote
+import aiofiles
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range_header(header: Optional[str], file_size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a `Range` header into an inclusive (start, end) byte range.
+    Returns None when the whole file should be served: no header, another
+    unit, or a multi-range request (which servers may ignore).
+    """
+    if not header:
+        return None
+
+    unit, _, ranges = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+
+    first, _, last = ranges.strip().partition("-")
+    try:
+        if first == "":
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiable()
+            start, end = max(file_size - length, 0), file_size - 1
+        else:
+            start = int(first)
+            end = int(last) if last else file_size - 1
+    except ValueError:
+        return None
+
+    if start >= file_size or start > end or start < 0:
+        raise RangeNotSatisfiable()
+
+    return start, min(end, file_size - 1)
+
+
+class RangeFileResponse(Response):
+    chunk_size = 64 * 1024
+
+    def __init__(
+        self,
+        path: str,
+        range_header: Optional[str] = None,
+        filename: Optional[str] = None,
+        media_type: str = "application/pdf",
+    ):
+        self.path = path
+        file_size = os.path.getsize(path)
+        byte_range = parse_range_header(range_header, file_size)
+
+        if byte_range is None:
+            self.start, self.end = 0, file_size - 1
+            status_code = 200
+        else:
+            self.start, self.end = byte_range
+            status_code = 206
+
+        headers = {
+            "accept-ranges": "bytes",
+            "content-length": str(self.end - self.start + 1),
+        }
+        if status_code == 206:
+            headers["content-range"] = f"bytes {self.start}-{self.end}/{file_size}"
+        if filename:
+            headers["content-disposition"] = f"inline; filename*=utf-8''{quote(filename)}"
+
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+
+        count = self.end - self.start + 1
+        if scope.get("method") == "HEAD" or count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as file:
+                await send(
+                    {
+                        "type": "http.response.zerocopysend",
+                        "file": file,
+                        "offset": self.start,
+                        "count": count,
+                        "more_body": False,
+                    }
+                )
+            return
+
+        async with aiofiles.open(self.path, "rb") as file:
+            await file.seek(self.start)
+            remaining = count
+            while remaining > 0:
+                block = await file.read(min(self.chunk_size, remaining))
+                if not block:
+                    break
+                remaining -= len(block)
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": block,
+                        "more_body": remaining > 0,
+                    }
+                )
+
+        if remaining > 0:
+            # File shrank underneath us; close the body
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -1,4 +1,4 @@
-from typing import Optional, List
+from typing import Optional, List, Dict
 from pydantic import BaseModel, Field
 from app.schemas.base import BaseSchema, TimestampMixin
 from app.schemas.pdf_chunk import PDFChunkResponse
@@ -31,9 +31,12 @@ class PDFResponse(BaseSchema, TimestampMixin):
     filename: str
     content_type: str
     file_size: int
+    content_hash: Optional[str] = None
     total_pages: int
     processing_status: str
     processing_error: Optional[str] = None
+    last_completed_page: int = 0
+    extraction_engine: Optional[str] = None
     author: Optional[str] = None
     subject: Optional[str] = None
     keywords: Optional[str] = None
@@ -46,10 +49,40 @@ class PDFResponse(BaseSchema, TimestampMixin):
 class PDFListResponse(BaseModel):
     items: List[PDFResponse]
     total: int
-    page: int
+    page: Optional[int]  # None when paging by cursor
     size: int
     pages: int
+    next_cursor: Optional[str] = None  # set on cursor pages that have a successor
 
 
 class PDFDetailResponse(PDFResponse):
     chunks: List[PDFChunkResponse] = []
+
+
+class BatchUploadItem(BaseModel):
+    filename: Optional[str] = None
+    status: str = Field(..., description="queued, duplicate or rejected")
+    pdf_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BatchUploadResponse(BaseModel):
+    batch_id: str
+    total: int
+    accepted: int
+    items: List[BatchUploadItem]
+
+
+class BatchStatusItem(BaseModel):
+    pdf_id: int
+    filename: str
+    job_status: str
+    processing_status: str
+    error: Optional[str] = None
+
+
+class BatchStatusResponse(BaseModel):
+    batch_id: str
+    total: int
+    counts: Dict[str, int]
+    items: List[BatchStatusItem]
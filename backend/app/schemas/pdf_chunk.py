@@ -1,4 +1,4 @@
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from pydantic import BaseModel, Field
 from app.schemas.base import BaseSchema, TimestampMixin
 
@@ -35,18 +35,48 @@ class PDFChunkResponse(BaseSchema, TimestampMixin):
 
 class PDFChunkListResponse(BaseModel):
     items: List[PDFChunkResponse]
-    total: int
-    page: int
+    total: Optional[int]  # None on cursor pages after the first
+    page: Optional[int]  # None when paging by cursor
     size: int
-    pages: int
+    pages: Optional[int]
     pdf_id: int
+    next_cursor: Optional[str] = None  # set on cursor pages that have a successor
 
 
 class PDFChunkSearchResponse(BaseModel):
     items: List[PDFChunkResponse]
-    total: int
-    page: int
+    total: Optional[int]  # None on cursor pages after the first
+    page: Optional[int]  # None when paging by cursor
     size: int
-    pages: int
+    pages: Optional[int]
+    query: str
+    pdf_id: Optional[int] = None
+    # False when the count was capped by max_count; total is then a lower bound
+    total_is_exact: bool = True
+    next_cursor: Optional[str] = None  # set on cursor pages that have a successor
+
+
+class PDFChunkSnippet(BaseModel):
+    id: int
+    pdf_id: int
+    chunk_number: int
+    page_number: int
+    snippet: str
+    # [start, end) character offsets of the matches within snippet
+    highlights: List[Tuple[int, int]]
+
+
+class PDFChunkSnippetSearchResponse(PDFChunkSearchResponse):
+    # Full chunk text is at GET /api/pdfs/{pdf_id}/chunks/{chunk_id}
+    items: List[PDFChunkSnippet]
+
+
+class SemanticSearchHit(BaseModel):
+    chunk: PDFChunkResponse
+    score: float  # similarity to the query, higher is closer
+
+
+class SemanticSearchResponse(BaseModel):
+    items: List[SemanticSearchHit]
     query: str
     pdf_id: Optional[int] = None
@@ -0,0 +1,139 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+
+UPLOAD_MAX_CONCURRENT = int(os.getenv("UPLOAD_MAX_CONCURRENT", "4"))
+UPLOAD_MAX_WAITING = int(os.getenv("UPLOAD_MAX_WAITING", "16"))
+UPLOAD_ADMISSION_TIMEOUT = float(os.getenv("UPLOAD_ADMISSION_TIMEOUT", "30"))
+INGEST_MAX_QUEUED = int(os.getenv("INGEST_MAX_QUEUED", "200"))
+
+
+class AdmissionRejected(Exception):
+    """
+    Work was refused because the service is saturated. `status_code` is 429
+    when the caller should slow down and 503 when capacity is exhausted;
+    `retry_after` is a hint in whole seconds.
+    """
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = max(1, int(retry_after))
+
+
+class WaitStats:
+    """Thread-safe running count, mean and maximum of wait times in seconds."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "avg_wait_seconds": round(self.mean, 3),
+            "max_wait_seconds": round(self.max, 3),
+        }
+
+
+class AdmissionGate:
+    """
+    Concurrency limit with a bounded wait queue for request handlers.
+
+    At most `limit` callers hold a slot; up to `max_waiting` more wait for
+    one in FIFO order. Callers beyond that are rejected immediately with 429,
+    and waiters that do not get a slot within `timeout` seconds get 503, so
+    a burst of uploads cannot pile up unbounded sessions and spool files.
+    """
+
+    def __init__(
+        self,
+        limit: int = UPLOAD_MAX_CONCURRENT,
+        max_waiting: int = UPLOAD_MAX_WAITING,
+        timeout: float = UPLOAD_ADMISSION_TIMEOUT,
+    ):
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_stats = WaitStats()
+        self._semaphore = None
+        self._loop = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # A semaphore is bound to the loop it was first used on; test clients
+        # start a new loop per app instance
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.limit)
+            self.active = self.waiting = 0
+        return self._semaphore
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        semaphore = self._get_semaphore()
+
+        if semaphore.locked() and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise AdmissionRejected(
+                "Too many uploads in progress, retry later", 429, self._retry_after()
+            )
+
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise AdmissionRejected(
+                "Upload capacity exhausted, retry later", 503, self._retry_after()
+            )
+        finally:
+            self.waiting -= 1
+
+        self.wait_stats.record(time.monotonic() - start)
+        self.admitted += 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            semaphore.release()
+
+    def _retry_after(self) -> int:
+        # Expect the queue ahead to drain at the observed admission pace
+        per_slot = max(self.wait_stats.mean, 1.0)
+        return math.ceil(per_slot * (self.waiting + 1) / max(self.limit, 1))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "limit": self.limit,
+            "max_waiting": self.max_waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            **self.wait_stats.snapshot(),
+        }
+
+
+upload_gate = AdmissionGate()
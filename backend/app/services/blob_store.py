@@ -0,0 +1,78 @@
+"""
+Content-addressed storage for original PDF files.
+
+Blobs are keyed by their SHA-256 and laid out as `<root>/ab/cd/<sha256>.pdf`
+so no single directory grows unbounded. Writers stage into `<root>/tmp` on
+the same filesystem and publish with an atomic rename, so readers never see
+a partially written blob.
+"""
+
+import os
+import uuid
+from abc import ABC, abstractmethod
+from typing import Optional
+
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", os.getenv("UPLOAD_DIR", "./uploads"))
+
+
+class BlobStore(ABC):
+    @abstractmethod
+    def staging_path(self) -> str:
+        """Return a fresh path to write an incoming file to before `put`."""
+
+    @abstractmethod
+    def put(self, staged_path: str, digest: str) -> str:
+        """Publish a staged file under its digest and return its location."""
+
+    @abstractmethod
+    def path(self, digest: str) -> Optional[str]:
+        """Return the local path of a stored blob, or None if missing."""
+
+    @abstractmethod
+    def delete(self, digest: str) -> bool:
+        """Remove a blob; returns False if it did not exist."""
+
+    def exists(self, digest: str) -> bool:
+        return self.path(digest) is not None
+
+
+class LocalBlobStore(BlobStore):
+    def __init__(self, root: str = BLOB_STORE_DIR):
+        self.root = root
+
+    def staging_path(self) -> str:
+        staging_dir = os.path.join(self.root, "tmp")
+        os.makedirs(staging_dir, exist_ok=True)
+        return os.path.join(staging_dir, f"{uuid.uuid4().hex}.part")
+
+    def put(self, staged_path: str, digest: str) -> str:
+        final_path = self._blob_path(digest)
+
+        if os.path.exists(final_path):
+            # Identical content is already stored
+            os.unlink(staged_path)
+            return final_path
+
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(staged_path, final_path)
+        return final_path
+
+    def path(self, digest: str) -> Optional[str]:
+        final_path = self._blob_path(digest)
+        return final_path if os.path.exists(final_path) else None
+
+    def delete(self, digest: str) -> bool:
+        final_path = self._blob_path(digest)
+        try:
+            os.unlink(final_path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _blob_path(self, digest: str) -> str:
+        if len(digest) < 4 or not all(c in "0123456789abcdef" for c in digest):
+            raise ValueError(f"Invalid blob digest: {digest!r}")
+        return os.path.join(self.root, digest[:2], digest[2:4], f"{digest}.pdf")
+
+
+blob_store = LocalBlobStore()
@@ -0,0 +1,83 @@
+"""
+Streaming text chunker.
+
+Chunks are cut at the last sentence end, newline or whitespace inside the
+size window, in that order of preference, and hard-cut when none exists, so
+no chunk exceeds `max_size`. Every cut lies in the second half of its
+window, so each step advances by at least `max_size / 2 - overlap`
+characters and the whole pass is linear in the text length.
+"""
+
+import os
+from typing import Iterator, NamedTuple
+
+CHUNK_MAX_SIZE = int(os.getenv("CHUNK_MAX_SIZE", "1000"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "0"))
+
+_SENTENCE_ENDS = (". ", "! ", "? ", ".\n", "!\n", "?\n")
+_WHITESPACE = (" ", "\t")
+
+
+class TextChunk(NamedTuple):
+    text: str
+    start: int  # offset of the first character in the page text
+    end: int  # offset one past the last character
+
+
+def iter_chunks(
+    text: str, max_size: int = CHUNK_MAX_SIZE, overlap: int = CHUNK_OVERLAP
+) -> Iterator[TextChunk]:
+    """Lazily yield whitespace-trimmed chunks of `text` with their offsets."""
+    if max_size <= 0:
+        raise ValueError("max_size must be positive")
+    if not 0 <= overlap < max_size // 2 or (overlap and max_size < 4):
+        raise ValueError("overlap must be smaller than half of max_size")
+
+    length = len(text)
+    start = _skip_space(text, 0, length)
+
+    while start < length:
+        window_end = start + max_size
+        cut = length if window_end >= length else _find_cut(text, start, window_end)
+
+        end = cut
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if end > start:
+            yield TextChunk(text[start:end], start, end)
+
+        if cut >= length:
+            break
+
+        next_start = cut
+        if overlap:
+            # Repeat the tail of this chunk, starting on a word boundary
+            next_start = max(cut - overlap, start + 1)
+            while next_start < cut and not text[next_start - 1].isspace():
+                next_start += 1
+        start = _skip_space(text, next_start, length)
+
+
+def _find_cut(text: str, start: int, window_end: int) -> int:
+    """Return the exclusive end of the chunk starting at `start`."""
+    lowest = start + (window_end - start) // 2
+
+    sentence_end = max(text.rfind(mark, lowest, window_end + 1) for mark in _SENTENCE_ENDS)
+    if sentence_end >= 0:
+        return sentence_end + 1
+
+    newline = text.rfind("\n", lowest, window_end)
+    if newline >= 0:
+        return newline
+
+    space = max(text.rfind(mark, lowest, window_end) for mark in _WHITESPACE)
+    if space >= 0:
+        return space
+
+    return window_end
+
+
+def _skip_space(text: str, index: int, length: int) -> int:
+    while index < length and text[index].isspace():
+        index += 1
+    return index
@@ -0,0 +1,227 @@
+"""
+Pluggable text-extraction engines.
+
+`pdfplumber` runs full layout analysis and is the accurate reference engine;
+`pypdf` reads the text layer directly and is several times cheaper on
+born-digital documents. In `auto` mode a few sample pages are extracted with
+both and the faster engine is chosen when their output is equivalent.
+"""
+
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+import pdfplumber
+import pypdf
+
+PDF_EXTRACTION_ENGINE = os.getenv("PDF_EXTRACTION_ENGINE", "pdfplumber")
+PDF_EXTRACTION_SAMPLE_PAGES = int(os.getenv("PDF_EXTRACTION_SAMPLE_PAGES", "3"))
+PDF_EXTRACTION_MIN_SIMILARITY = float(os.getenv("PDF_EXTRACTION_MIN_SIMILARITY", "0.95"))
+
+AUTO_ENGINE = "auto"
+REFERENCE_ENGINE = "pdfplumber"
+
+
+class ExtractedPage(NamedTuple):
+    page_number: int
+    text: Optional[str]
+    width: float
+    height: float
+
+
+class ExtractorDocument(ABC):
+    """An open PDF. Use through `TextExtractor.open`."""
+
+    metadata: Dict[str, Any]
+
+    @property
+    def page_count(self) -> int:
+        return self.metadata["total_pages"]
+
+    @abstractmethod
+    def iter_pages(
+        self, first_page: int = 1, last_page: Optional[int] = None
+    ) -> Iterator[ExtractedPage]:
+        """Yield 1-based pages first_page..last_page in order."""
+
+
+class TextExtractor(ABC):
+    name: str
+
+    @abstractmethod
+    def open(self, file_path: str) -> ContextManager[ExtractorDocument]:
+        """Open `file_path` once for metadata and page extraction."""
+
+
+class _PdfplumberDocument(ExtractorDocument):
+    def __init__(self, pdf: pdfplumber.PDF):
+        self._pdf = pdf
+        metadata = pdf.metadata or {}
+        self.metadata = {
+            "total_pages": len(pdf.pages),
+            "author": metadata.get("Author"),
+            "subject": metadata.get("Subject"),
+            "keywords": metadata.get("Keywords"),
+            "title": metadata.get("Title"),
+            "creator": metadata.get("Creator"),
+            "producer": metadata.get("Producer"),
+        }
+
+    def iter_pages(
+        self, first_page: int = 1, last_page: Optional[int] = None
+    ) -> Iterator[ExtractedPage]:
+        pages = self._pdf.pages[first_page - 1 : last_page]
+        for page_num, page in enumerate(pages, first_page):
+            try:
+                yield ExtractedPage(
+                    page_num, page.extract_text(), page.width, page.height
+                )
+            finally:
+                # Drop the parsed layout so memory stays flat across pages
+                page.close()
+
+
+class PdfplumberExtractor(TextExtractor):
+    name = "pdfplumber"
+
+    @contextmanager
+    def open(self, file_path: str) -> Iterator[ExtractorDocument]:
+        with pdfplumber.open(file_path) as pdf:
+            yield _PdfplumberDocument(pdf)
+
+
+class _PypdfDocument(ExtractorDocument):
+    def __init__(self, reader: pypdf.PdfReader):
+        self._reader = reader
+        metadata = reader.metadata or {}
+        self.metadata = {
+            "total_pages": len(reader.pages),
+            "author": metadata.get("/Author"),
+            "subject": metadata.get("/Subject"),
+            "keywords": metadata.get("/Keywords"),
+            "title": metadata.get("/Title"),
+            "creator": metadata.get("/Creator"),
+            "producer": metadata.get("/Producer"),
+        }
+
+    def iter_pages(
+        self, first_page: int = 1, last_page: Optional[int] = None
+    ) -> Iterator[ExtractedPage]:
+        last_page = last_page or self.page_count
+        for page_num in range(first_page, last_page + 1):
+            page = self._reader.pages[page_num - 1]
+            box = page.mediabox
+            yield ExtractedPage(
+                page_num, page.extract_text(), float(box.width), float(box.height)
+            )
+
+
+class PypdfExtractor(TextExtractor):
+    name = "pypdf"
+
+    @contextmanager
+    def open(self, file_path: str) -> Iterator[ExtractorDocument]:
+        with open(file_path, "rb") as stream:
+            yield _PypdfDocument(pypdf.PdfReader(stream))
+
+
+EXTRACTORS: Dict[str, TextExtractor] = {
+    extractor.name: extractor for extractor in (PdfplumberExtractor(), PypdfExtractor())
+}
+ENGINE_CHOICES = [*EXTRACTORS, AUTO_ENGINE]
+
+
+def get_extractor(name: Optional[str] = None) -> TextExtractor:
+    name = name or PDF_EXTRACTION_ENGINE
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown extraction engine: {name}")
+    return EXTRACTORS[name]
+
+
+def resolve_engine(
+    file_path: str,
+    requested: Optional[str] = None,
+    select: Optional[Callable[[str], str]] = None,
+) -> str:
+    """
+    Return a concrete engine name, sampling the document for `auto` with
+    `select` (select_engine by default; the sandbox passes its own).
+    """
+    requested = requested or PDF_EXTRACTION_ENGINE
+    if requested != AUTO_ENGINE:
+        return get_extractor(requested).name
+    return (select or select_engine)(file_path)
+
+
+def select_engine(
+    file_path: str,
+    sample_pages: int = PDF_EXTRACTION_SAMPLE_PAGES,
+    min_similarity: float = PDF_EXTRACTION_MIN_SIMILARITY,
+    extractors: Optional[Dict[str, TextExtractor]] = None,
+) -> str:
+    """
+    Extract evenly spaced sample pages with every engine and pick the fastest
+    one whose text matches the pdfplumber reference closely enough.
+    """
+    extractors = extractors or EXTRACTORS
+    reference = extractors[REFERENCE_ENGINE]
+    reference_text, reference_time, pages = _sample(reference, file_path, sample_pages)
+
+    best, best_time = reference.name, reference_time
+    for extractor in extractors.values():
+        if extractor is reference:
+            continue
+        try:
+            text, elapsed, _ = _sample(extractor, file_path, sample_pages, pages)
+        except Exception:
+            continue
+        if elapsed < best_time and text_similarity(reference_text, text) >= min_similarity:
+            best, best_time = extractor.name, elapsed
+
+    return best
+
+
+def text_similarity(expected: str, actual: str) -> float:
+    """Word-multiset overlap in [0, 1]; insensitive to whitespace and order."""
+    expected_words = Counter(expected.split())
+    actual_words = Counter(actual.split())
+    total = max(sum(expected_words.values()), sum(actual_words.values()))
+    if total == 0:
+        return 1.0
+    return sum((expected_words & actual_words).values()) / total
+
+
+def _sample(
+    extractor: TextExtractor,
+    file_path: str,
+    sample_pages: int,
+    pages: Optional[List[int]] = None,
+) -> Tuple[str, float, List[int]]:
+    start = time.perf_counter()
+    texts = []
+    with extractor.open(file_path) as document:
+        if pages is None:
+            pages = _sample_page_numbers(document.page_count, sample_pages)
+        for page_number in pages:
+            for page in document.iter_pages(page_number, page_number):
+                texts.append(page.text or "")
+    return "\n".join(texts), time.perf_counter() - start, pages
+
+
+def _sample_page_numbers(page_count: int, sample_pages: int) -> List[int]:
+    if page_count <= sample_pages:
+        return list(range(1, page_count + 1))
+    step = page_count / sample_pages
+    return sorted({int(step * index + step / 2) + 1 for index in range(sample_pages)})
@@ -0,0 +1,218 @@
+import logging
+import math
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.repositories.ingestion_job import IngestionJobRepository
+from app.repositories.pdf import PDFRepository
+from app.services.admission import INGEST_MAX_QUEUED, AdmissionRejected, WaitStats
+
+logger = logging.getLogger(__name__)
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_POLL_INTERVAL = float(os.getenv("INGEST_POLL_INTERVAL", "5"))
+# A running job whose owner has not renewed it for this long is presumed dead
+INGEST_LEASE_SECONDS = float(os.getenv("INGEST_LEASE_SECONDS", "60"))
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+
+
+class IngestionQueue:
+    """
+    Bounded pool of worker threads draining the persisted ingestion_jobs table.
+
+    The job table is the source of truth: workers claim queued rows from the
+    database, so jobs survive restarts and no job is lost when every worker
+    is busy. `notify()` only wakes idle workers early.
+
+    The backlog is bounded by `max_queued`: producers call
+    `ensure_capacity()` before enqueuing and are told when to retry once
+    the workers have fallen that far behind.
+
+    Claimed jobs are leased to this queue's `owner` and the lease is renewed
+    every third of `lease_seconds` while the queue runs. Only jobs whose
+    lease has expired are recovered, so several processes can share the
+    table; a job interrupted `max_attempts` times is failed instead of
+    being retried forever.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        workers: int = INGEST_WORKERS,
+        poll_interval: float = INGEST_POLL_INTERVAL,
+        max_queued: int = INGEST_MAX_QUEUED,
+        lease_seconds: float = INGEST_LEASE_SECONDS,
+        max_attempts: int = INGEST_MAX_ATTEMPTS,
+    ):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.max_queued = max_queued
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.wait_stats = WaitStats()
+        self.run_stats = WaitStats()
+        self._wakeup = threading.Condition()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def is_running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self) -> None:
+        if self.is_running:
+            return
+
+        self._stopping.clear()
+        self.recover()
+
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._worker_loop, name=f"ingest-worker-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._lease_loop, name="ingest-lease", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self) -> None:
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def ensure_capacity(self, job_repo: IngestionJobRepository, incoming: int = 1) -> None:
+        """Raise AdmissionRejected (503) if `incoming` jobs would overflow the backlog."""
+        queued = job_repo.count_by_status("queued")
+        if queued + incoming > self.max_queued:
+            raise AdmissionRejected(
+                f"Ingestion queue is full ({queued} jobs waiting), retry later",
+                503,
+                self.estimate_drain_seconds(queued),
+            )
+
+    def estimate_drain_seconds(self, queued: int) -> int:
+        per_job = max(self.run_stats.mean, 1.0)
+        return math.ceil(queued * per_job / max(self.workers, 1))
+
+    def stats(self, job_repo: IngestionJobRepository) -> Dict[str, Any]:
+        queued = job_repo.count_by_status("queued")
+        return {
+            "queued": queued,
+            "running": job_repo.count_by_status("running"),
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "completed_jobs": self.run_stats.count,
+            "avg_run_seconds": round(self.run_stats.mean, 3),
+            "estimated_drain_seconds": self.estimate_drain_seconds(queued),
+            **self.wait_stats.snapshot(),
+        }
+
+    def run_pending(self) -> int:
+        """Process queued jobs on the calling thread until none remain."""
+        processed = 0
+        while self._process_next():
+            processed += 1
+        return processed
+
+    def recover(self) -> None:
+        """
+        Requeue work interrupted by a crash. Documents still `processing`
+        resume from their page checkpoint when the job runs again.
+        """
+        db = self.session_factory()
+        try:
+            job_repo = IngestionJobRepository(db)
+            requeued = self._requeue_expired(db)
+
+            for pdf in PDFRepository(db).get_by_status("processing"):
+                if not job_repo.has_pending_job(pdf.id):
+                    job_repo.enqueue(pdf.id)
+                    requeued += 1
+
+            if requeued:
+                logger.info("Requeued %d interrupted ingestion jobs", requeued)
+        finally:
+            db.close()
+
+    def _requeue_expired(self, db: Session) -> int:
+        requeued, failed = IngestionJobRepository(db).requeue_expired(
+            self.lease_seconds, self.max_attempts
+        )
+        pdf_repo = PDFRepository(db)
+        for pdf_id in failed:
+            logger.warning("Giving up on PDF %d after %d attempts", pdf_id, self.max_attempts)
+            pdf_repo.update_processing_status(
+                pdf_id, "failed", f"Processing was interrupted {self.max_attempts} times"
+            )
+        return requeued
+
+    def _lease_loop(self) -> None:
+        """Renew this process's leases and recover jobs whose lease ran out elsewhere."""
+        while not self._stopping.wait(self.lease_seconds / 3):
+            db = self.session_factory()
+            try:
+                IngestionJobRepository(db).heartbeat(self.owner)
+                if self._requeue_expired(db):
+                    self.notify()
+            except Exception:
+                logger.exception("Failed to renew ingestion job leases")
+            finally:
+                db.close()
+
+    def _worker_loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                if self._process_next():
+                    continue
+            except Exception:
+                logger.exception("Ingestion worker failed to claim a job")
+
+            with self._wakeup:
+                self._wakeup.wait(self.poll_interval)
+
+    def _process_next(self) -> bool:
+        from app.services.pdf_service import PDFService
+
+        db = self.session_factory()
+        try:
+            job_repo = IngestionJobRepository(db)
+            job = job_repo.claim_next(self.owner)
+            if not job:
+                return False
+
+            if job.started_at and job.created_at:
+                self.wait_stats.record(
+                    max(0.0, (job.started_at - job.created_at).total_seconds())
+                )
+
+            start = time.monotonic()
+            try:
+                PDFService(db).process_pdf(job.pdf_id)
+                job_repo.mark_finished(job.id, "completed")
+            except Exception as e:
+                logger.warning("Ingestion job %d failed: %s", job.id, e)
+                db.rollback()
+                job_repo.mark_finished(job.id, "failed", str(e))
+            finally:
+                self.run_stats.record(time.monotonic() - start)
+            return True
+        finally:
+            db.close()
+
+
+ingestion_queue = IngestionQueue()
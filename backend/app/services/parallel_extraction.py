@@ -0,0 +1,97 @@
+"""
+Process-pool page extraction for large PDFs.
+
+Page ranges are fanned out to worker processes, each of which opens the file
+itself, so only file paths and extracted text cross process boundaries.
+`executor.map` yields results in submission order, which keeps page order
+(and therefore chunk numbering) deterministic.
+"""
+
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+from app.services.extraction import ExtractedPage, get_extractor
+
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", "1"))
+PDF_PARSE_MIN_PAGES_PER_TASK = int(os.getenv("PDF_PARSE_MIN_PAGES_PER_TASK", "25"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def should_parallelize(
+    total_pages: int,
+    workers: int = PDF_PARSE_WORKERS,
+    min_pages_per_task: int = PDF_PARSE_MIN_PAGES_PER_TASK,
+) -> bool:
+    """Only documents big enough for at least two tasks are worth the IPC."""
+    return workers > 1 and total_pages >= 2 * max(min_pages_per_task, 1)
+
+
+def split_page_ranges(
+    total_pages: int, workers: int, min_pages_per_task: int, first_page: int = 1
+) -> List[Tuple[int, int]]:
+    """
+    Split 1-based pages first_page..total_pages into inclusive ranges.
+    Aim for two tasks per worker so a slow range does not idle the others.
+    """
+    page_count = total_pages - first_page + 1
+    if page_count <= 0:
+        return []
+
+    task_size = max(min_pages_per_task, math.ceil(page_count / (workers * 2)), 1)
+    return [
+        (start, min(start + task_size - 1, total_pages))
+        for start in range(first_page, total_pages + 1, task_size)
+    ]
+
+
+def extract_page_range(
+    file_path: str, start: int, end: int, engine: Optional[str] = None
+) -> List[ExtractedPage]:
+    """Worker entry point: open the file and extract pages start..end."""
+    with get_extractor(engine).open(file_path) as document:
+        return list(document.iter_pages(start, end))
+
+
+def extract_pages_parallel(
+    file_path: str,
+    total_pages: int,
+    first_page: int = 1,
+    engine: Optional[str] = None,
+    workers: int = PDF_PARSE_WORKERS,
+    min_pages_per_task: int = PDF_PARSE_MIN_PAGES_PER_TASK,
+) -> Iterator[ExtractedPage]:
+    ranges = split_page_ranges(total_pages, workers, min_pages_per_task, first_page)
+    starts = [start for start, _ in ranges]
+    ends = [end for _, end in ranges]
+    engines = [engine] * len(ranges)
+
+    pool = get_process_pool(workers)
+    for pages in pool.map(extract_page_range, [file_path] * len(ranges), starts, ends, engines):
+        yield from pages
+
+
+def get_process_pool(workers: int = PDF_PARSE_WORKERS) -> ProcessPoolExecutor:
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that runs worker threads can deadlock
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_process_pool() -> None:
+    global _pool
+
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
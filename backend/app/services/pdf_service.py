@@ -1,13 +1,98 @@
+import hashlib
+import json
 import os
 import tempfile
-from typing import List, Optional, Dict, Any
+import uuid
+import zipfile
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import aiofiles
 from fastapi import UploadFile
-import pdfplumber
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.models.pdf import PDF
 from app.models.pdf_chunk import PDFChunk
 from app.repositories.pdf import PDFRepository
 from app.repositories.pdf_chunk import PDFChunkRepository
+from app.repositories.chunk_search import SearchPage
+from app.repositories.cursor import KeysetPage
+from app.repositories.search_cache import search_cache
+from app.repositories.semantic_search import get_semantic_search
+from app.repositories.ingestion_job import IngestionJobRepository
+from app.services.admission import AdmissionRejected
+from app.services.blob_store import blob_store
+from app.services.chunker import CHUNK_MAX_SIZE, iter_chunks
+from app.services.ingestion_queue import ingestion_queue
+from app.services.progress import progress_broker
+from app.services.extraction import (
+    ExtractedPage,
+    ExtractorDocument,
+    ENGINE_CHOICES,
+    get_extractor,
+    resolve_engine,
+)
+from app.services.parallel_extraction import extract_pages_parallel, should_parallelize
+from app.services.sandbox import (
+    PDF_SANDBOX,
+    SandboxedDocument,
+    SandboxedExtractor,
+    describe_skipped_pages,
+    select_engine_sandboxed,
+)
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(500 * 1024 * 1024)))
+INGEST_CHECKPOINT_PAGES = int(os.getenv("INGEST_CHECKPOINT_PAGES", "50"))
+MAX_ARCHIVE_SIZE = int(os.getenv("MAX_ARCHIVE_SIZE", str(5 * 1024 * 1024 * 1024)))
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "5000"))
+PDF_MAGIC = b"%PDF-"
+ZIP_MAGIC = b"PK\x03\x04"
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+class SemanticSearchDisabled(RuntimeError):
+    pass
+
+
+class SpooledUpload(NamedTuple):
+    path: str
+    size: int
+    sha256: str
+
+
+class BatchItem(NamedTuple):
+    filename: Optional[str]
+    status: str  # queued, duplicate, rejected
+    pdf_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class _ThreadedReader:
+    """Give a blocking stream the async `read` that _spool_upload expects."""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    async def read(self, size: int) -> bytes:
+        return await run_in_threadpool(self._stream.read, size)
+
+
+def _is_zip(file: UploadFile) -> bool:
+    return file.content_type in ("application/zip", "application/x-zip-compressed") or (
+        file.filename or ""
+    ).lower().endswith(".zip")
+
+
+class OpenedDocument(NamedTuple):
+    metadata: Dict[str, Any]
+    pages: Iterator[ExtractedPage]
+    # (page_number, reason) for pages the sandbox gave up on, filled while iterating
+    skipped_pages: List[Tuple[int, str]]
 
 
 class PDFService:
@@ -15,145 +100,585 @@ class PDFService:
         self.db = db
         self.pdf_repo = PDFRepository(db)
         self.chunk_repo = PDFChunkRepository(db)
+        self.job_repo = IngestionJobRepository(db)
 
     async def upload_and_parse_pdf(
-        self, file: UploadFile, title: Optional[str] = None
+        self,
+        file: UploadFile,
+        title: Optional[str] = None,
+        force: bool = False,
+        engine: Optional[str] = None,
     ) -> PDF:
+        """
+        Persist the upload and queue it for background parsing.
+        The returned PDF is `pending`; ingestion workers complete it.
+
+        Uploads are deduplicated by SHA-256: re-uploading known content returns
+        the existing document, or re-queues it for parsing when `force` is set.
+        """
         if file.content_type != "application/pdf":
             raise ValueError("Only PDF files are allowed")
+        if engine and engine not in ENGINE_CHOICES:
+            raise ValueError(f"Unknown extraction engine: {engine}")
+
+        # Refuse before spooling anything when the workers are too far behind
+        ingestion_queue.ensure_capacity(self.job_repo)
+
+        upload = await self._spool_upload(file, blob_store.staging_path())
+        pdf, _ = self._register_upload(upload, file.filename, title, force, engine)
+        return pdf
+
+    async def upload_batch(
+        self,
+        files: List[UploadFile],
+        force: bool = False,
+        engine: Optional[str] = None,
+    ) -> Tuple[str, List[BatchItem]]:
+        """
+        Register many PDFs, or the PDF members of a single ZIP archive, under
+        one batch id. Every file is streamed to the blob store and queued for
+        the ingestion workers; invalid files are rejected individually.
+
+        A batch of files is admitted whole: it must fit the ingestion backlog
+        even when empty (413 otherwise) and fit it now (503, retryable). The
+        members of an archive take backlog slots one by one, and those that
+        find it full are rejected individually.
+        """
+        if engine and engine not in ENGINE_CHOICES:
+            raise ValueError(f"Unknown extraction engine: {engine}")
+
+        is_archive = len(files) == 1 and _is_zip(files[0])
+        if is_archive:
+            # Refuse before spooling the archive when nothing could be queued
+            ingestion_queue.ensure_capacity(self.job_repo)
+        else:
+            if len(files) > MAX_BATCH_FILES:
+                raise ValueError(f"A batch may contain at most {MAX_BATCH_FILES} files")
+            if len(files) > ingestion_queue.max_queued:
+                raise UploadTooLargeError(
+                    f"A batch may queue at most {ingestion_queue.max_queued} files; "
+                    "split it or upload a ZIP archive"
+                )
+            ingestion_queue.ensure_capacity(self.job_repo, len(files))
+        batch_id = uuid.uuid4().hex
+
+        if is_archive:
+            items = await self._upload_zip_members(files[0], batch_id, force, engine)
+        else:
+            items = [
+                await self._upload_batch_member(file, file.filename, batch_id, force, engine)
+                for file in files
+            ]
+
+        return batch_id, items
+
+    async def _upload_zip_members(
+        self, archive: UploadFile, batch_id: str, force: bool, engine: Optional[str]
+    ) -> List[BatchItem]:
+        spooled = await self._spool_upload(
+            archive,
+            blob_store.staging_path(),
+            magic=ZIP_MAGIC,
+            file_kind="ZIP archive",
+            max_size=MAX_ARCHIVE_SIZE,
+        )
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
+        items = []
+        try:
+            with zipfile.ZipFile(spooled.path) as zip_file:
+                members = [
+                    info
+                    for info in zip_file.infolist()
+                    if not info.is_dir()
+                    and info.filename.lower().endswith(".pdf")
+                    and not info.filename.startswith("__MACOSX/")
+                ]
+                if len(members) > MAX_BATCH_FILES:
+                    raise ValueError(f"A batch may contain at most {MAX_BATCH_FILES} files")
+
+                for info in members:
+                    filename = os.path.basename(info.filename)
+                    try:
+                        ingestion_queue.ensure_capacity(self.job_repo)
+                    except AdmissionRejected as e:
+                        items.append(BatchItem(filename, "rejected", error=str(e)))
+                        continue
+                    try:
+                        # Members are decompressed block by block, never whole
+                        with zip_file.open(info) as member:
+                            items.append(
+                                await self._upload_batch_member(
+                                    _ThreadedReader(member), filename, batch_id, force, engine
+                                )
+                            )
+                    except (RuntimeError, zipfile.BadZipFile) as e:
+                        items.append(BatchItem(filename, "rejected", error=str(e)))
+        except zipfile.BadZipFile:
+            raise ValueError("File is not a valid ZIP archive")
+        finally:
+            os.unlink(spooled.path)
 
+        return items
+
+    async def _upload_batch_member(
+        self,
+        source: Any,
+        filename: Optional[str],
+        batch_id: str,
+        force: bool,
+        engine: Optional[str],
+    ) -> BatchItem:
         try:
-            # Extract metadata and create PDF record
-            metadata = self._extract_pdf_metadata(temp_file_path)
+            upload = await self._spool_upload(source, blob_store.staging_path())
+        except ValueError as e:
+            return BatchItem(filename, "rejected", error=str(e))
 
+        pdf, status = self._register_upload(upload, filename, None, force, engine, batch_id)
+        return BatchItem(filename, status, pdf.id)
+
+    def _register_upload(
+        self,
+        upload: SpooledUpload,
+        filename: Optional[str],
+        title: Optional[str],
+        force: bool,
+        engine: Optional[str],
+        batch_id: Optional[str] = None,
+    ) -> Tuple[PDF, str]:
+        """
+        Publish a spooled upload and queue it, deduplicating by SHA-256.
+        Returns the document and "queued" or "duplicate".
+        """
+        # Identical content maps to the same blob, so publishing is idempotent
+        file_path = blob_store.put(upload.path, upload.sha256)
+
+        existing = self.pdf_repo.get_by_content_hash(upload.sha256)
+        if existing:
+            return self._handle_duplicate_upload(existing, file_path, force, engine, batch_id)
+
+        try:
             pdf_data = {
-                "title": title or file.filename or "Untitled PDF",
-                "filename": file.filename,
-                "file_path": temp_file_path,
-                "content_type": file.content_type,
-                "file_size": len(content),
-                "total_pages": metadata["total_pages"],
-                "author": metadata.get("author"),
-                "subject": metadata.get("subject"),
-                "keywords": metadata.get("keywords"),
-                "processing_status": "processing",
+                "title": title or filename or "Untitled PDF",
+                "filename": filename or "untitled.pdf",
+                "file_path": file_path,
+                "content_type": "application/pdf",
+                "file_size": upload.size,
+                "content_hash": upload.sha256,
+                "requested_engine": engine,
+                "total_pages": 0,
+                "processing_status": "pending",
             }
 
             pdf = self.pdf_repo.create(pdf_data)
+            self.job_repo.enqueue(pdf.id, batch_id)
+        except IntegrityError:
+            # A concurrent upload of the same content won the unique index
+            self.db.rollback()
+            existing = self.pdf_repo.get_by_content_hash(upload.sha256)
+            if not existing:
+                raise
+            return self._handle_duplicate_upload(existing, file_path, force, engine, batch_id)
+        except Exception:
+            blob_store.delete(upload.sha256)
+            raise
+
+        ingestion_queue.notify()
+        return pdf, "queued"
+
+    def _handle_duplicate_upload(
+        self,
+        existing: PDF,
+        file_path: str,
+        force: bool,
+        engine: Optional[str] = None,
+        batch_id: Optional[str] = None,
+    ) -> Tuple[PDF, str]:
+        # Documents stored before the blob store point at their old location
+        if existing.file_path != file_path:
+            existing = self.pdf_repo.update(existing.id, {"file_path": file_path})
+
+        if force and existing.processing_status not in ("pending", "processing"):
+            return self.reprocess_pdf(existing.id, engine, batch_id), "queued"
+
+        if batch_id:
+            # Keep the batch listing complete without queuing any work
+            self.job_repo.create(
+                {"pdf_id": existing.id, "status": "duplicate", "batch_id": batch_id}
+            )
+        return existing, "duplicate"
+
+    def reprocess_pdf(
+        self, pdf_id: int, engine: Optional[str] = None, batch_id: Optional[str] = None
+    ) -> Optional[PDF]:
+        """
+        Queue a stored document for parsing again from its blob. The engine
+        is chosen afresh unless one is given.
+        """
+        if engine and engine not in ENGINE_CHOICES:
+            raise ValueError(f"Unknown extraction engine: {engine}")
+
+        pdf = self.pdf_repo.get(pdf_id)
+        if not pdf or pdf.processing_status in ("pending", "processing"):
+            return pdf
 
-            chunks = self._parse_pdf_to_chunks(temp_file_path, pdf.id)
+        if not pdf.file_path or not os.path.exists(pdf.file_path):
+            raise FileNotFoundError("Original file is no longer available")
+
+        if not batch_id:
+            # Batches reserve their share of the backlog up front
+            ingestion_queue.ensure_capacity(self.job_repo)
+        pdf = self.pdf_repo.update(
+            pdf_id,
+            {
+                "processing_status": "pending",
+                "processing_error": None,
+                "requested_engine": engine,
+                "extraction_engine": None,
+            },
+        )
+        self.job_repo.enqueue(pdf_id, batch_id)
+        ingestion_queue.notify()
+        self._publish_progress(pdf_id, "pending", 0, 0)
+        return pdf
+
+    async def _spool_upload(
+        self,
+        file: Any,
+        destination: str,
+        magic: bytes = PDF_MAGIC,
+        file_kind: str = "PDF",
+        max_size: Optional[int] = None,
+    ) -> SpooledUpload:
+        """
+        Stream the upload to disk in UPLOAD_CHUNK_SIZE blocks, computing size
+        and SHA-256 on the way so the full file is never held in memory.
+        `file` is anything with an async `read(size)`.
+        """
+        max_size = max_size or MAX_UPLOAD_SIZE
+        digest = hashlib.sha256()
+        size = 0
 
-            if chunks:
-                self.chunk_repo.bulk_create(chunks)
-                self.pdf_repo.update_processing_status(pdf.id, "completed")
+        try:
+            async with aiofiles.open(destination, "wb") as out:
+                while True:
+                    block = await file.read(UPLOAD_CHUNK_SIZE)
+                    if not block:
+                        break
+
+                    if size == 0 and not block.startswith(magic):
+                        raise ValueError(f"File is not a valid {file_kind}")
+
+                    size += len(block)
+                    if size > max_size:
+                        raise UploadTooLargeError(
+                            f"File exceeds the maximum upload size of {max_size} bytes"
+                        )
+
+                    digest.update(block)
+                    await out.write(block)
+
+            if size == 0:
+                raise ValueError(f"File is not a valid {file_kind}")
+        except Exception:
+            if os.path.exists(destination):
+                os.unlink(destination)
+            raise
+
+        return SpooledUpload(destination, size, digest.hexdigest())
+
+    def process_pdf(self, pdf_id: int) -> PDF:
+        """
+        Parse a stored PDF into chunks. Runs on an ingestion worker.
+
+        Chunks are committed every INGEST_CHECKPOINT_PAGES pages together with
+        `last_completed_page`, so a document found still `processing` (the
+        previous worker died) resumes after its checkpoint instead of
+        starting over.
+
+        With PDF_SANDBOX on, extraction runs in killable child processes;
+        pages they have to skip are listed in `processing_error`.
+        """
+        pdf = self.pdf_repo.get(pdf_id)
+        if not pdf:
+            raise ValueError(f"PDF {pdf_id} not found")
+
+        resume_after = pdf.last_completed_page if pdf.processing_status == "processing" else 0
+
+        if resume_after:
+            # Anything past the checkpoint belongs to an uncommitted batch
+            self.chunk_repo.delete_after_page(pdf_id, resume_after, commit=False)
+        else:
+            # Forced re-parses replace the previous chunk set
+            self.chunk_repo.delete_by_pdf(pdf_id, commit=False)
+            pdf.last_completed_page = 0
+        self.pdf_repo.update_processing_status(pdf_id, "processing")
+
+        try:
+            # A resumed document keeps the engine its first pages were parsed with
+            engine = pdf.extraction_engine if resume_after else None
+            if not engine:
+                engine = self._resolve_engine(pdf.file_path, pdf.requested_engine)
+                self.pdf_repo.update(pdf_id, {"extraction_engine": engine})
+
+            # Metadata and pages come from a single open of the file
+            with self._open_document(pdf.file_path, resume_after + 1, engine) as document:
+                metadata = document.metadata
+                self.pdf_repo.update(
+                    pdf_id,
+                    {
+                        "total_pages": metadata["total_pages"],
+                        "author": metadata.get("author"),
+                        "subject": metadata.get("subject"),
+                        "keywords": metadata.get("keywords"),
+                    },
+                )
+
+                next_chunk_number = self.chunk_repo.max_chunk_number(pdf_id) + 1
+                self._publish_progress(pdf_id, "processing", resume_after, next_chunk_number - 1)
+                pages = iter(document.pages)
+                while True:
+                    page_batch = list(islice(pages, INGEST_CHECKPOINT_PAGES))
+                    if not page_batch:
+                        break
+
+                    next_chunk_number += self.chunk_repo.bulk_create(
+                        self._iter_chunks(page_batch, pdf_id, next_chunk_number),
+                        commit=False,
+                    )
+                    self.pdf_repo.update_checkpoint(pdf_id, page_batch[-1].page_number)
+                    self._publish_progress(
+                        pdf_id, "processing", page_batch[-1].page_number, next_chunk_number - 1
+                    )
+
+            skipped = describe_skipped_pages(document.skipped_pages)
+            if next_chunk_number > 1:
+                # A document with unreadable pages is still searchable
+                self.pdf_repo.update_processing_status(pdf_id, "completed", skipped)
             else:
                 self.pdf_repo.update_processing_status(
-                    pdf.id, "failed", "No content extracted"
+                    pdf_id, "failed", "; ".join(filter(None, ["No content extracted", skipped]))
                 )
+            self._publish_progress(
+                pdf_id, pdf.processing_status, pdf.last_completed_page, next_chunk_number - 1
+            )
 
             return pdf
 
         except Exception as e:
-            if "pdf" in locals():
-                self.pdf_repo.update_processing_status(pdf.id, "failed", str(e))
+            self.db.rollback()
+            self.pdf_repo.update_processing_status(pdf_id, "failed", str(e))
+            self._publish_progress(pdf_id, "failed", pdf.last_completed_page)
             raise
-        finally:
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
+
+    def reindex_pdf(self, pdf_id: int, engine: Optional[str] = None) -> int:
+        """
+        Re-extract a stored document and replace its chunks in one short
+        transaction, so readers see either the old or the new chunk set.
+
+        New chunks are staged in a temporary file while the (slow) extraction
+        runs; only the delete and insert hold the write lock. The document
+        keeps its status throughout and the old chunks survive any failure.
+        Returns the number of chunks written.
+        """
+        pdf = self.pdf_repo.get(pdf_id)
+        if not pdf:
+            raise ValueError(f"PDF {pdf_id} not found")
+        if not pdf.file_path or not os.path.exists(pdf.file_path):
+            raise FileNotFoundError("Original file is no longer available")
+
+        engine = self._resolve_engine(pdf.file_path, engine or pdf.requested_engine)
+
+        with tempfile.TemporaryFile("w+", encoding="utf-8") as staging:
+            chunk_count = 0
+            with self._open_document(pdf.file_path, 1, engine) as document:
+                metadata = document.metadata
+                for chunk in self._iter_chunks(document.pages, pdf_id):
+                    staging.write(json.dumps(chunk, default=float) + "\n")
+                    chunk_count += 1
+                skipped = describe_skipped_pages(document.skipped_pages)
+
+            if not chunk_count:
+                raise ValueError("No content extracted")
+
+            staging.seek(0)
+            try:
+                self.chunk_repo.delete_by_pdf(pdf_id, commit=False)
+                self.chunk_repo.bulk_create(
+                    (json.loads(line) for line in staging), commit=False
+                )
+                self.pdf_repo.set_fields(
+                    pdf_id,
+                    {
+                        "processing_status": "completed",
+                        "processing_error": skipped,
+                        "total_pages": metadata["total_pages"],
+                        "last_completed_page": metadata["total_pages"],
+                        "extraction_engine": engine,
+                    },
+                    commit=False,
+                )
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
+
+        return chunk_count
+
+    def get_progress(self, pdf_id: int) -> Optional[Dict[str, Any]]:
+        """Current progress from the database, without loading chunks."""
+        pdf = self.pdf_repo.get(pdf_id)
+        if not pdf:
+            return None
+        return self._progress_event(
+            pdf, pdf.processing_status, pdf.last_completed_page,
+            self.chunk_repo.count({"pdf_id": pdf_id}),
+        )
+
+    def _publish_progress(
+        self, pdf_id: int, status: str, pages_parsed: int, chunks_written: Optional[int] = None
+    ) -> None:
+        if not progress_broker.subscriber_count(pdf_id):
+            return
+        pdf = self.pdf_repo.get(pdf_id)
+        if chunks_written is None:
+            chunks_written = self.chunk_repo.count({"pdf_id": pdf_id})
+        progress_broker.publish(
+            pdf_id, self._progress_event(pdf, status, pages_parsed, chunks_written)
+        )
+
+    @staticmethod
+    def _progress_event(
+        pdf: PDF, status: str, pages_parsed: int, chunks_written: int
+    ) -> Dict[str, Any]:
+        return {
+            "pdf_id": pdf.id,
+            "status": status,
+            "pages_parsed": pages_parsed or 0,
+            "total_pages": pdf.total_pages,
+            "chunks_written": chunks_written,
+            "error": pdf.processing_error,
+        }
+
+    @staticmethod
+    def _resolve_engine(file_path: str, requested: Optional[str]) -> str:
+        # Sampling parses pages, so it is sandboxed like extraction itself
+        return resolve_engine(file_path, requested, select_engine_sandboxed if PDF_SANDBOX else None)
+
+    @contextmanager
+    def _open_document(
+        self, file_path: str, first_page: int = 1, engine: Optional[str] = None
+    ) -> Iterator[OpenedDocument]:
+        """
+        Open the PDF once and expose its metadata and a lazy iterator over
+        pages from `first_page` on. Pages must be consumed before the context
+        exits.
+        """
+        extractor = get_extractor(engine)
+        if PDF_SANDBOX:
+            extractor = SandboxedExtractor(extractor)
+
+        with extractor.open(file_path) as document:
+            yield OpenedDocument(
+                document.metadata,
+                self._iter_pages(document, file_path, first_page, extractor.name),
+                getattr(document, "skipped_pages", []),
+            )
+
+    def _iter_pages(
+        self,
+        document: ExtractorDocument,
+        file_path: str,
+        first_page: int = 1,
+        engine: Optional[str] = None,
+    ) -> Iterator[ExtractedPage]:
+        """
+        Yield page text in page order. Large documents are split across the
+        extraction process pool when PDF_PARSE_WORKERS > 1.
+        """
+        total_pages = document.page_count
+        if should_parallelize(total_pages - first_page + 1):
+            if isinstance(document, SandboxedDocument):
+                yield from document.iter_pages_parallel(first_page)
+            else:
+                yield from extract_pages_parallel(file_path, total_pages, first_page, engine)
+            return
+
+        yield from document.iter_pages(first_page)
 
     def _extract_pdf_metadata(self, file_path: str) -> Dict[str, Any]:
         try:
-            with pdfplumber.open(file_path) as pdf:
-                metadata = pdf.metadata or {}
-                return {
-                    "total_pages": len(pdf.pages),
-                    "author": metadata.get("Author"),
-                    "subject": metadata.get("Subject"),
-                    "keywords": metadata.get("Keywords"),
-                    "title": metadata.get("Title"),
-                    "creator": metadata.get("Creator"),
-                    "producer": metadata.get("Producer"),
-                }
+            with self._open_document(file_path) as document:
+                return document.metadata
         except Exception as e:
             raise ValueError(f"Failed to extract PDF metadata: {str(e)}")
 
     def _parse_pdf_to_chunks(self, file_path: str, pdf_id: int) -> List[Dict[str, Any]]:
-        chunks = []
-        chunk_counter = 1
-
         try:
-            with pdfplumber.open(file_path) as pdf:
-                for page_num, page in enumerate(pdf.pages, 1):
-                    # Extract text from page
-                    text = page.extract_text()
-
-                    if text and text.strip():
-                        # Split page into smaller chunks if it's too long
-                        page_chunks = self._split_text_into_chunks(text, page_num)
-
-                        # Create chunk data for each chunk
-                        for chunk_idx, chunk_text in enumerate(page_chunks):
-                            chunk_data = {
-                                "pdf_id": pdf_id,
-                                "chunk_number": chunk_counter,
-                                "page_number": page_num,
-                                "content": chunk_text,
-                                "content_type": "text",
-                                "word_count": len(chunk_text.split()),
-                                "character_count": len(chunk_text),
-                                "chunk_metadata": {
-                                    "page_width": page.width,
-                                    "page_height": page.height,
-                                    "chunk_index_in_page": chunk_idx,
-                                },
-                            }
-
-                            chunks.append(chunk_data)
-                            chunk_counter += 1
-
+            with self._open_document(file_path) as document:
+                return self._pages_to_chunks(document.pages, pdf_id)
+        except ValueError:
+            raise
         except Exception as e:
             raise ValueError(f"Failed to parse PDF content: {str(e)}")
 
-        return chunks
+    def _pages_to_chunks(
+        self, pages: Iterable[ExtractedPage], pdf_id: int
+    ) -> List[Dict[str, Any]]:
+        return list(self._iter_chunks(pages, pdf_id))
 
-    def _split_text_into_chunks(
-        self, text: str, page_num: int, max_chunk_size: int = 1000
-    ) -> List[str]:
-        if len(text) <= max_chunk_size:
-            return [text]
-
-        chunks = []
-        sentences = text.split(". ")
-        current_chunk = []
-        current_size = 0
-
-        for sentence in sentences:
-            sentence_size = len(sentence) + 2  # +2 for '. '
+    def _iter_chunks(
+        self, pages: Iterable[ExtractedPage], pdf_id: int, first_chunk_number: int = 1
+    ) -> Iterator[Dict[str, Any]]:
+        chunk_counter = first_chunk_number
 
-            if current_size + sentence_size <= max_chunk_size:
-                current_chunk.append(sentence)
-                current_size += sentence_size
-            else:
-                if current_chunk:
-                    chunks.append(". ".join(current_chunk) + ".")
-                current_chunk = [sentence]
-                current_size = sentence_size
+        try:
+            for page in pages:
+                text = page.text
+
+                if text and text.strip():
+                    # Split page into chunks lazily, keeping offsets into the page text
+                    page_chunks = iter_chunks(text)
+
+                    # Create chunk data for each chunk
+                    for chunk_idx, chunk in enumerate(page_chunks):
+                        chunk_data = {
+                            "pdf_id": pdf_id,
+                            "chunk_number": chunk_counter,
+                            "page_number": page.page_number,
+                            "content": chunk.text,
+                            "content_type": "text",
+                            "word_count": len(chunk.text.split()),
+                            "character_count": len(chunk.text),
+                            "chunk_metadata": {
+                                "page_width": page.width,
+                                "page_height": page.height,
+                                "chunk_index_in_page": chunk_idx,
+                                "char_start": chunk.start,
+                                "char_end": chunk.end,
+                            },
+                        }
+
+                        yield chunk_data
+                        chunk_counter += 1
 
-        if current_chunk:
-            chunks.append(". ".join(current_chunk) + ".")
+        except Exception as e:
+            raise ValueError(f"Failed to parse PDF content: {str(e)}")
 
-        return chunks
+    def _split_text_into_chunks(
+        self, text: str, page_num: int, max_chunk_size: int = CHUNK_MAX_SIZE
+    ) -> List[str]:
+        return [chunk.text for chunk in iter_chunks(text, max_chunk_size)]
 
     def get_pdf_list(self, skip: int = 0, limit: int = 100) -> List[PDF]:
         return self.pdf_repo.get_multi(
             skip=skip, limit=limit, order_by="created_at", order_desc=True
         )
 
+    def get_pdf_list_after(self, cursor: Optional[str], limit: int = 100) -> KeysetPage:
+        return self.pdf_repo.get_multi_after(
+            cursor, limit=limit, order_by="created_at", order_desc=True
+        )
+
     def get_pdf_detail(self, pdf_id: int) -> Optional[PDF]:
         return self.pdf_repo.get_with_chunks(pdf_id)
 
@@ -162,6 +687,15 @@ class PDFService:
     ) -> List[PDFChunk]:
         return self.chunk_repo.get_by_pdf(pdf_id, skip=skip, limit=limit)
 
+    def get_pdf_chunk(self, pdf_id: int, chunk_id: int) -> Optional[PDFChunk]:
+        chunk = self.chunk_repo.get(chunk_id)
+        return chunk if chunk and chunk.pdf_id == pdf_id else None
+
+    def get_pdf_chunks_after(
+        self, pdf_id: int, cursor: Optional[str], limit: int = 20
+    ) -> KeysetPage:
+        return self.chunk_repo.get_by_pdf_after(pdf_id, cursor, limit=limit)
+
     def search_pdf_content(
         self,
         search_term: str,
@@ -171,31 +705,137 @@ class PDFService:
     ) -> List[PDFChunk]:
         """Search PDF content."""
         if pdf_id:
-            return self.chunk_repo.search_content(
-                pdf_id, search_term, skip=skip, limit=limit
+            return self._cached_search(
+                "items", search_term, pdf_id, (skip, limit),
+                lambda: self.chunk_repo.search_content(pdf_id, search_term, skip=skip, limit=limit),
             )
         else:
             # Search across all PDFs (without user filtering)
-            return self.chunk_repo.search_all_content(
-                search_term, skip=skip, limit=limit
+            return self._cached_search(
+                "items", search_term, None, (skip, limit),
+                lambda: self.chunk_repo.search_all_content(search_term, skip=skip, limit=limit),
             )
 
+    def search_with_total(
+        self,
+        search_term: str,
+        pdf_id: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 20,
+        max_count: Optional[int] = None,
+    ) -> SearchPage:
+        """A page of search results and the match count, capped at `max_count` if given."""
+        return self._cached_search(
+            "page", search_term, pdf_id, (skip, limit, max_count),
+            lambda: self.chunk_repo.search_page(
+                search_term, pdf_id, skip=skip, limit=limit, max_count=max_count
+            ),
+        )
+
+    def search_after(
+        self,
+        search_term: str,
+        pdf_id: Optional[int] = None,
+        cursor: Optional[str] = None,
+        limit: int = 20,
+    ) -> KeysetPage:
+        """The page of search results following `cursor`; an empty cursor starts at the top."""
+        return self._cached_search(
+            "after", search_term, pdf_id, (cursor, limit),
+            lambda: self.chunk_repo.search_after(search_term, pdf_id, cursor, limit=limit),
+        )
+
     def count_search_results(
         self, search_term: str, pdf_id: Optional[int] = None
     ) -> int:
         if pdf_id:
-            return self.chunk_repo.count_search_content(search_term, pdf_id)
+            return self._cached_search(
+                "count", search_term, pdf_id, None,
+                lambda: self.chunk_repo.count_search_content(search_term, pdf_id),
+            )
         else:
-            return self.chunk_repo.count_search_all_content(search_term)
+            return self._cached_search(
+                "count", search_term, None, None,
+                lambda: self.chunk_repo.count_search_all_content(search_term),
+            )
+
+    def count_search_results_upto(
+        self, search_term: str, pdf_id: Optional[int] = None, max_count: Optional[int] = None
+    ) -> Tuple[int, bool]:
+        return self._cached_search(
+            "count_upto", search_term, pdf_id, max_count,
+            lambda: self.chunk_repo.count_search_upto(search_term, pdf_id, max_count),
+        )
+
+    def semantic_search(
+        self, query: str, pdf_id: Optional[int] = None, limit: int = 10
+    ) -> List[Tuple[PDFChunk, float]]:
+        """Chunks closest in meaning to `query`, best first, with similarity scores."""
+        index = get_semantic_search(self.db)
+        if index is None:
+            raise SemanticSearchDisabled("Semantic search is disabled (set SEMANTIC_SEARCH=true)")
+        return index.search(self.db, query, pdf_id, limit)
+
+    def _cached_search(
+        self, kind: str, search_term: str, pdf_id: Optional[int], page: Any, run: Callable[[], Any]
+    ) -> Any:
+        """
+        Answer from the search cache, or `run` the search and cache it.
+        Cached chunks are detached copies: read them, never add them to a session.
+        """
+        if not search_cache.enabled:
+            return run()
+
+        backend = self.chunk_repo.search_backend
+        scope = pdf_id or None
+        key = (backend.name, kind, backend.cache_key(search_term), scope, page)
+        cached = search_cache.get(key)
+        if cached is not None:
+            return cached
+
+        generation = search_cache.generation
+        result = _detach_results(run())
+        search_cache.put(key, result, _results_size(result), scope, generation)
+        return result
+
+    def get_pdf_file(self, pdf_id: int) -> Optional[PDF]:
+        """Return the PDF if its original file is available for download."""
+        pdf = self.pdf_repo.get(pdf_id)
+        if not pdf or not pdf.file_path or not os.path.exists(pdf.file_path):
+            return None
+        return pdf
 
     def delete_pdf(self, pdf_id: int) -> bool:
         pdf = self.pdf_repo.get(pdf_id)
         if not pdf:
             return False
 
+        # Blobs are deduplicated, so no other document shares this file
         if pdf.file_path and os.path.exists(pdf.file_path):
             os.unlink(pdf.file_path)
 
-        # Delete from database (chunks will be deleted via cascade)
+        # Bulk-delete chunks first so the cascade has nothing to load
+        self.chunk_repo.delete_by_pdf(pdf_id, commit=False)
         self.pdf_repo.delete(pdf_id)
         return True
+
+
+def _detach_chunk(chunk: PDFChunk) -> PDFChunk:
+    return PDFChunk(
+        **{attr.key: getattr(chunk, attr.key) for attr in PDFChunk.__mapper__.column_attrs}
+    )
+
+
+def _detach_results(result: Any) -> Any:
+    """Copy ORM chunks out of the session so commits elsewhere cannot expire them."""
+    if isinstance(result, (SearchPage, KeysetPage)):
+        return result._replace(items=[_detach_chunk(c) for c in result.items])
+    if isinstance(result, list):
+        return [_detach_chunk(c) for c in result]
+    return result
+
+
+def _results_size(result: Any) -> int:
+    items = result if isinstance(result, list) else getattr(result, "items", [])
+    # Text dominates; the constant covers the other columns and object headers
+    return sum(len(chunk.content) + 400 for chunk in items if isinstance(chunk, PDFChunk))
@@ -0,0 +1,95 @@
+"""
+In-process pub/sub for ingestion progress.
+
+Ingestion workers run on plain threads while subscribers live on the
+event loop, so events are handed over with `loop.call_soon_threadsafe`.
+Events only reach subscribers in the same process; with several server
+processes a client must be routed to the one running its job or fall back
+to polling the document.
+"""
+import asyncio
+import logging
+import os
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_QUEUE_SIZE = int(os.getenv("PROGRESS_QUEUE_SIZE", "100"))
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class Subscription:
+    """A subscriber's bounded event queue. Slow readers lose the oldest events."""
+
+    def __init__(self, broker: "ProgressBroker", pdf_id: int, maxsize: int):
+        self.broker = broker
+        self.pdf_id = pdf_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+    def deliver(self, event: Dict[str, Any]) -> None:
+        # Runs on the subscriber's loop
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Next event, or None if none arrives within `timeout` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class ProgressBroker:
+    def __init__(self, queue_size: int = PROGRESS_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers: Dict[int, Set[Subscription]] = defaultdict(set)
+
+    def subscribe(self, pdf_id: int) -> Subscription:
+        """Register interest in a document. Must be called on the event loop."""
+        subscription = Subscription(self, pdf_id, self.queue_size)
+        with self._lock:
+            self._subscribers[pdf_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.pdf_id)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.pdf_id]
+
+    def subscriber_count(self, pdf_id: int) -> int:
+        with self._lock:
+            return len(self._subscribers.get(pdf_id, ()))
+
+    def publish(self, pdf_id: int, event: Dict[str, Any]) -> None:
+        """Send an event to every subscriber of `pdf_id`. Safe from any thread."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(pdf_id, ()))
+
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, dict(event))
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                logger.debug("Dropping progress subscriber for PDF %d", pdf_id)
+                self.unsubscribe(subscription)
+
+
+progress_broker = ProgressBroker()
@@ -0,0 +1,335 @@
+"""
+Sandboxed text extraction in killable child processes.
+
+Malformed PDFs can send a parser into very long loops or huge allocations.
+A sandboxed document runs the real extractor in a spawned child with an
+address-space limit (RLIMIT_AS) and streams pages back over a pipe. The
+parent enforces a per-page timeout and a wall-clock limit for the whole
+document:
+
+- a page that times out, exhausts memory, raises or crashes the child is
+  skipped and recorded; a fresh child resumes from the next page
+- a document that exceeds the wall-clock limit fails with ExtractionTimeout
+
+Either way the ingestion worker thread is released. Choosing an engine in
+`auto` mode parses sample pages too, so it runs in a child under the same
+limits (`select_engine_sandboxed`).
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from app.services.extraction import (
+    REFERENCE_ENGINE,
+    ExtractedPage,
+    ExtractorDocument,
+    TextExtractor,
+    select_engine,
+)
+from app.services.parallel_extraction import (
+    PDF_PARSE_MIN_PAGES_PER_TASK,
+    PDF_PARSE_WORKERS,
+    split_page_ranges,
+)
+
+PDF_SANDBOX = os.getenv("PDF_SANDBOX", "true").lower() in ("1", "true", "yes")
+PDF_PARSE_TIMEOUT = float(os.getenv("PDF_PARSE_TIMEOUT", "300"))
+PDF_PAGE_TIMEOUT = float(os.getenv("PDF_PAGE_TIMEOUT", "30"))
+PDF_PARSE_MEMORY_LIMIT_MB = int(os.getenv("PDF_PARSE_MEMORY_LIMIT_MB", "1024"))
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionTimeout(Exception):
+    pass
+
+
+class SandboxedExtractor(TextExtractor):
+    """Run `extractor` in child processes under time and memory limits."""
+
+    def __init__(
+        self,
+        extractor: TextExtractor,
+        timeout: float = PDF_PARSE_TIMEOUT,
+        page_timeout: float = PDF_PAGE_TIMEOUT,
+        memory_limit_mb: int = PDF_PARSE_MEMORY_LIMIT_MB,
+    ):
+        self.extractor = extractor
+        self.name = extractor.name
+        self.timeout = timeout
+        self.page_timeout = page_timeout
+        self.memory_limit_mb = memory_limit_mb
+
+    @contextmanager
+    def open(self, file_path: str) -> Iterator["SandboxedDocument"]:
+        document = SandboxedDocument(self, file_path)
+        try:
+            yield document
+        finally:
+            document.close()
+
+
+class SandboxedDocument(ExtractorDocument):
+    def __init__(self, sandbox: SandboxedExtractor, file_path: str):
+        self.sandbox = sandbox
+        self.file_path = file_path
+        self.skipped_pages: List[Tuple[int, str]] = []
+        self._deadline = time.monotonic() + sandbox.timeout
+        self._lock = threading.Lock()
+        self._children: List[_Child] = []
+
+        # The first child opens the file for metadata and is reused for pages
+        self._idle_child: Optional[_Child] = self._spawn()
+        self.metadata = self._idle_child.metadata
+
+    def iter_pages(
+        self, first_page: int = 1, last_page: Optional[int] = None
+    ) -> Iterator[ExtractedPage]:
+        last_page = min(last_page or self.page_count, self.page_count)
+        next_page = first_page
+
+        while next_page <= last_page:
+            with self._lock:
+                child, self._idle_child = self._idle_child, None
+            child = child or self._spawn()
+
+            try:
+                child.start_extraction(next_page, last_page)
+                while next_page <= last_page:
+                    try:
+                        kind, page_number, payload = child.receive(self._page_timeout())
+                    except TimeoutError:
+                        # Raises instead when the whole document ran out of time
+                        self._remaining()
+                        self._skip(next_page, f"timed out after {self.sandbox.page_timeout:g}s")
+                        next_page += 1
+                        break
+                    except EOFError:
+                        self._skip(next_page, child.exit_reason())
+                        next_page += 1
+                        break
+
+                    if kind == "done":
+                        return
+                    if kind == "page":
+                        yield payload
+                    else:
+                        self._skip(page_number, payload)
+                    next_page = page_number + 1
+                    if kind == "abort":
+                        break
+            finally:
+                self._discard(child)
+
+    def iter_pages_parallel(
+        self,
+        first_page: int = 1,
+        workers: int = PDF_PARSE_WORKERS,
+        min_pages_per_task: int = PDF_PARSE_MIN_PAGES_PER_TASK,
+    ) -> Iterator[ExtractedPage]:
+        """Extract page ranges in `workers` sandboxes at once, in page order."""
+        ranges = split_page_ranges(self.page_count, workers, min_pages_per_task, first_page)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for pages in executor.map(lambda r: list(self.iter_pages(*r)), ranges):
+                yield from pages
+
+    def close(self) -> None:
+        with self._lock:
+            children, self._children = self._children, []
+            self._idle_child = None
+        for child in children:
+            child.kill()
+
+    def _spawn(self) -> "_Child":
+        child = _Child(self.sandbox, self.file_path)
+        with self._lock:
+            self._children.append(child)
+        try:
+            child.wait_for_metadata(self._remaining())
+        except Exception:
+            self._discard(child)
+            raise
+        return child
+
+    def _discard(self, child: "_Child") -> None:
+        child.kill()
+        with self._lock:
+            if child in self._children:
+                self._children.remove(child)
+
+    def _skip(self, page_number: int, reason: str) -> None:
+        self.skipped_pages.append((page_number, reason))
+
+    def _remaining(self) -> float:
+        remaining = self._deadline - time.monotonic()
+        if remaining <= 0:
+            raise ExtractionTimeout(
+                f"Extraction exceeded {self.sandbox.timeout:g} seconds"
+            )
+        return remaining
+
+    def _page_timeout(self) -> float:
+        return min(self.sandbox.page_timeout, self._remaining())
+
+
+class _Child:
+    def __init__(self, sandbox: SandboxedExtractor, file_path: str):
+        context = multiprocessing.get_context("spawn")
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_sandbox_main,
+            args=(child_conn, sandbox.extractor, file_path, sandbox.memory_limit_mb),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.metadata: Dict[str, Any] = {}
+
+    def wait_for_metadata(self, timeout: float) -> None:
+        try:
+            kind, _, payload = self.receive(timeout)
+        except TimeoutError:
+            raise ExtractionTimeout(f"Opening the PDF took longer than {timeout:.0f} seconds")
+        except EOFError:
+            raise ValueError(f"Extraction {self.exit_reason()}")
+        if kind == "error":
+            raise ValueError(payload)
+        self.metadata = payload
+
+    def start_extraction(self, first_page: int, last_page: int) -> None:
+        self.conn.send((first_page, last_page))
+
+    def receive(self, timeout: float) -> Tuple[str, int, Any]:
+        if not self.conn.poll(timeout):
+            raise TimeoutError()
+        return self.conn.recv()
+
+    def exit_reason(self) -> str:
+        self.process.join(1)
+        code = self.process.exitcode
+        if code is not None and code < 0:
+            return f"worker killed by signal {-code}"
+        return f"worker exited unexpectedly (exit code {code})"
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+def _sandbox_main(conn, extractor: TextExtractor, file_path: str, memory_limit_mb: int) -> None:
+    """
+    Child entry point: report metadata, wait for a (first, last) page range
+    and send one message per page. Messages are (kind, page_number, payload)
+    with kind "metadata", "page", "skip", "abort" (skip and restart the
+    child), "error" or "done".
+    """
+    _limit_memory(memory_limit_mb)
+    try:
+        with extractor.open(file_path) as document:
+            conn.send(("metadata", 0, document.metadata))
+            first_page, last_page = conn.recv()
+
+            for page_number in range(first_page, last_page + 1):
+                try:
+                    for page in document.iter_pages(page_number, page_number):
+                        conn.send(("page", page_number, page))
+                except MemoryError:
+                    # The heap may be unusable now; a new child takes over
+                    conn.send(("abort", page_number, "memory limit exceeded"))
+                    return
+                except Exception as e:
+                    conn.send(("skip", page_number, f"{type(e).__name__}: {e}"))
+
+            conn.send(("done", last_page, None))
+    except EOFError:
+        # The parent went away or no longer needs pages
+        pass
+    except MemoryError:
+        conn.send(("error", 0, "Memory limit exceeded while opening the PDF"))
+    except Exception as e:
+        conn.send(("error", 0, str(e)))
+
+
+def select_engine_sandboxed(
+    file_path: str,
+    timeout: float = PDF_PAGE_TIMEOUT,
+    memory_limit_mb: int = PDF_PARSE_MEMORY_LIMIT_MB,
+    extractors: Optional[Dict[str, TextExtractor]] = None,
+) -> str:
+    """
+    `select_engine` in a child process under the sandbox limits. If sampling
+    times out, exhausts memory or crashes, the reference engine is used and
+    its sandboxed extraction deals with the document page by page.
+    """
+    context = multiprocessing.get_context("spawn")
+    conn, child_conn = context.Pipe()
+    process = context.Process(
+        target=_select_engine_main,
+        args=(child_conn, file_path, memory_limit_mb, extractors),
+        daemon=True,
+    )
+    process.start()
+    child_conn.close()
+    try:
+        if not conn.poll(timeout):
+            reason = f"timed out after {timeout:g}s"
+        else:
+            try:
+                kind, payload = conn.recv()
+            except EOFError:
+                kind, payload = "crash", None
+            if kind == "engine":
+                return payload
+            if kind == "error":
+                raise ValueError(payload)
+            reason = payload or "worker exited unexpectedly"
+        logger.warning("Engine sampling for %s %s; using %s", file_path, reason, REFERENCE_ENGINE)
+        return REFERENCE_ENGINE
+    finally:
+        if process.is_alive():
+            process.kill()
+        process.join()
+        conn.close()
+
+
+def _select_engine_main(
+    conn, file_path: str, memory_limit_mb: int, extractors: Optional[Dict[str, TextExtractor]]
+) -> None:
+    """Child entry point: send ("engine", name), ("error", message) or ("abort", reason)."""
+    _limit_memory(memory_limit_mb)
+    try:
+        conn.send(("engine", select_engine(file_path, extractors=extractors)))
+    except MemoryError:
+        conn.send(("abort", "exceeded the memory limit"))
+    except Exception as e:
+        conn.send(("error", str(e)))
+
+
+def _limit_memory(memory_limit_mb: int) -> None:
+    if memory_limit_mb <= 0:
+        return
+    try:
+        import resource
+
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        # Not supported on this platform; the wall-clock limits still apply
+        pass
+
+
+def describe_skipped_pages(skipped: List[Tuple[int, str]], limit: int = 20) -> Optional[str]:
+    """Summarise skipped pages for `processing_error`."""
+    if not skipped:
+        return None
+    parts = [f"{page} ({reason})" for page, reason in sorted(skipped)[:limit]]
+    if len(skipped) > limit:
+        parts.append(f"and {len(skipped) - limit} more")
+    return "Skipped pages: " + ", ".join(parts)
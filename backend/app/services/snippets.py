@@ -0,0 +1,132 @@
+"""
+Match-centred snippets of chunk text for search results.
+
+A snippet is the window of at most SNIPPET_LENGTH characters of a chunk
+holding the most query matches, cut at word boundaries, with the offsets of
+each match inside it so clients can highlight without re-running the
+query. The chunk text is scanned once: words are matched against the query
+terms as prefixes, the way the FTS5 backend matches them, and a query with
+no word matches (a substring hit from the LIKE backend, or punctuation) is
+located as a literal, case-insensitive substring instead.
+"""
+
+import os
+import re
+from functools import lru_cache
+from typing import List, NamedTuple, Tuple
+from app.repositories.inverted_index import fold, parse_query
+
+SNIPPET_LENGTH = int(os.getenv("SNIPPET_LENGTH", "160"))
+ELLIPSIS = "…"
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+Span = Tuple[int, int]  # [start, end) character offsets
+
+
+class Snippet(NamedTuple):
+    text: str
+    highlights: List[Span]  # offsets into `text`
+
+
+@lru_cache(maxsize=256)
+def query_terms(query: str) -> Tuple[str, ...]:
+    """The distinct folded words of `query`, without operators."""
+    terms = {term for clauses in parse_query(query) for clause in clauses for term in clause}
+    return tuple(sorted(terms))
+
+
+@lru_cache(maxsize=256)
+def _prefix_pattern(terms: Tuple[str, ...]) -> "re.Pattern[str]":
+    alternatives = "|".join(re.escape(term) for term in terms)
+    return re.compile(rf"(?:{alternatives})\w*")
+
+
+def _is_word(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def find_matches(text: str, query: str) -> List[Span]:
+    terms = query_terms(query)
+    if terms:
+        if text.isascii():
+            # Folding ASCII is just lowercasing. A pattern that starts with a
+            # literal lets the regex engine skip ahead between candidates;
+            # those starting mid-word are dropped here instead of by `\b`.
+            lowered = text.lower()
+            spans = [
+                match.span()
+                for match in _prefix_pattern(terms).finditer(lowered)
+                if not match.start() or not _is_word(lowered[match.start() - 1])
+            ]
+        else:
+            spans = [
+                match.span()
+                for match in _WORD.finditer(text)
+                if fold(match.group()).startswith(terms)
+            ]
+        if spans:
+            return spans
+
+    needle = query.strip().casefold()
+    haystack = text.casefold()
+    if not needle or len(haystack) != len(text):
+        # Casefolding changed the length (e.g. "ß"), so offsets would not line up
+        return []
+    spans = []
+    start = haystack.find(needle)
+    while start != -1:
+        spans.append((start, start + len(needle)))
+        start = haystack.find(needle, start + len(needle))
+    return spans
+
+
+def make_snippet(text: str, query: str, length: int = SNIPPET_LENGTH) -> Snippet:
+    spans = find_matches(text, query)
+    if len(text) <= length:
+        return Snippet(text, spans)
+
+    start, end = _densest_window(text, spans, length)
+    prefix = ELLIPSIS if start > 0 else ""
+    suffix = ELLIPSIS if end < len(text) else ""
+    shift = len(prefix) - start
+    highlights = [(s + shift, e + shift) for s, e in spans if s >= start and e <= end]
+    return Snippet(prefix + text[start:end] + suffix, highlights)
+
+
+def _densest_window(text: str, spans: List[Span], length: int) -> Span:
+    """The `length`-character window with the most whole matches, snapped to words."""
+    if not spans:
+        return 0, _snap_end(text, length, 0)
+
+    # Two pointers over the sorted spans: the run from `first` to `last` fits the window
+    best, best_count, last = 0, 0, 0
+    for first, (first_start, _) in enumerate(spans):
+        last = max(last, first + 1)
+        while last < len(spans) and spans[last][1] - first_start <= length:
+            last += 1
+        if last - first > best_count:
+            best, best_count = first, last - first
+
+    match_start, match_end = spans[best][0], spans[best + best_count - 1][1]
+    # Centre the matches, then slide back inside the text
+    start = max(0, match_start - (length - (match_end - match_start)) // 2)
+    end = min(len(text), start + length)
+    start = max(0, end - length)
+    return _snap_start(text, start, match_start), _snap_end(text, end, match_end)
+
+
+def _snap_start(text: str, start: int, limit: int) -> int:
+    """Move `start` past a partial word, but not beyond `limit`."""
+    if start == 0 or text[start - 1].isspace():
+        return start
+    space = text.find(" ", start, limit)
+    return space + 1 if space != -1 else start
+
+
+def _snap_end(text: str, end: int, limit: int) -> int:
+    """Move `end` back before a partial word, but not before `limit`."""
+    if end >= len(text) or text[end].isspace():
+        return end
+    space = text.rfind(" ", limit, end)
+    return space if space != -1 else end
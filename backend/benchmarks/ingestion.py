@@ -0,0 +1,326 @@
+"""
+End-to-end ingestion benchmark over a synthetic corpus.
+
+    python -m benchmarks.ingestion --pages 50 --words-per-page 400 \
+        --layout single --layout two_column --output results.json
+
+Each scenario writes its corpus to a scratch directory, ingests it through
+PDFService.process_pdf into a fresh SQLite database and reports pages/sec,
+chunks/sec, peak RSS and the time spent in the open, extract, chunk and
+insert stages as JSON. Scenarios run in separate processes so peak RSS
+belongs to one scenario only. Pass `--baseline` with an earlier result
+file to print throughput changes between commits.
+"""
+import argparse
+import json
+import os
+import platform
+import queue
+import resource
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from multiprocessing import get_context
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import upgrade_schema
+from app.models.base import Base
+from app.services.chunker import CHUNK_MAX_SIZE, CHUNK_OVERLAP
+from app.services.pdf_service import INGEST_CHECKPOINT_PAGES, OpenedDocument, PDFService
+from app.services.sandbox import PDF_SANDBOX
+from benchmarks.synthetic import LAYOUTS, build_synthetic_pdf
+
+STAGES = ("open", "extract", "chunk", "insert")
+
+
+class StageClock:
+    """
+    Accumulate exclusive wall time per stage. Stages nest: time spent in an
+    inner stage (chunking pulled by an insert) is not counted in the outer.
+    """
+
+    def __init__(self):
+        self.totals: Dict[str, float] = defaultdict(float)
+        self._inner: List[float] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        self._inner.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.totals[name] += elapsed - self._inner.pop()
+            if self._inner:
+                self._inner[-1] += elapsed
+
+    def iterate(self, name: str, iterable: Iterable) -> Iterator:
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+
+class InstrumentedPDFService(PDFService):
+    """PDFService that reports stage timings to a StageClock."""
+
+    def __init__(self, db, clock: StageClock):
+        super().__init__(db)
+        self.clock = clock
+        bulk_create = self.chunk_repo.bulk_create
+
+        def timed_bulk_create(*args, **kwargs):
+            with clock.stage("insert"):
+                return bulk_create(*args, **kwargs)
+
+        self.chunk_repo.bulk_create = timed_bulk_create
+
+    @contextmanager
+    def _open_document(self, file_path, first_page=1, engine=None):
+        with ExitStack() as stack:
+            with self.clock.stage("open"):
+                document = stack.enter_context(
+                    super()._open_document(file_path, first_page, engine)
+                )
+            yield OpenedDocument(
+                document.metadata,
+                self.clock.iterate("extract", document.pages),
+                document.skipped_pages,
+            )
+
+    def _iter_chunks(self, pages, pdf_id, first_chunk_number=1):
+        return self.clock.iterate(
+            "chunk", super()._iter_chunks(pages, pdf_id, first_chunk_number)
+        )
+
+
+def run_scenario(
+    documents: int,
+    pages: int,
+    words_per_page: int,
+    layout: str,
+    engine: Optional[str] = None,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Generate a corpus, ingest it into a scratch database and measure it."""
+    with tempfile.TemporaryDirectory(prefix="ingest-bench-") as workdir:
+        paths = []
+        for index in range(documents):
+            path = os.path.join(workdir, f"doc-{index}.pdf")
+            with open(path, "wb") as f:
+                f.write(build_synthetic_pdf(pages, words_per_page, layout, seed + index))
+            paths.append(path)
+
+        db_engine = create_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+        Base.metadata.create_all(bind=db_engine)
+        upgrade_schema(db_engine)
+        session = sessionmaker(bind=db_engine)()
+
+        clock = StageClock()
+        service = InstrumentedPDFService(session, clock)
+        total_pages = total_chunks = total_bytes = 0
+        try:
+            pdf_ids = [
+                service.pdf_repo.create(
+                    {
+                        "title": os.path.basename(path),
+                        "filename": os.path.basename(path),
+                        "file_path": path,
+                        "content_type": "application/pdf",
+                        "file_size": os.path.getsize(path),
+                        "requested_engine": engine,
+                        "total_pages": 0,
+                        "processing_status": "pending",
+                    }
+                ).id
+                for path in paths
+            ]
+
+            start = time.perf_counter()
+            for pdf_id in pdf_ids:
+                pdf = service.process_pdf(pdf_id)
+                total_pages += pdf.total_pages
+                total_bytes += pdf.file_size
+                total_chunks += service.chunk_repo.count({"pdf_id": pdf_id})
+            elapsed = time.perf_counter() - start
+        finally:
+            session.close()
+            db_engine.dispose()
+
+    stages = {name: round(clock.totals.get(name, 0.0), 6) for name in STAGES}
+    stages["other"] = round(max(0.0, elapsed - sum(stages.values())), 6)
+    return {
+        "documents": documents,
+        "pages": total_pages,
+        "chunks": total_chunks,
+        "bytes": total_bytes,
+        "seconds": round(elapsed, 6),
+        "pages_per_sec": round(total_pages / elapsed, 3) if elapsed else None,
+        "chunks_per_sec": round(total_chunks / elapsed, 3) if elapsed else None,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "stages": stages,
+    }
+
+
+def peak_rss_bytes() -> int:
+    # Sandboxed extraction runs in child processes; count the largest of them too
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_isolated(**scenario) -> Dict[str, Any]:
+    """
+    Run a scenario in a fresh process so peak RSS is its own. The process
+    is not daemonic (unlike a Pool worker): sandboxed extraction starts
+    children of its own.
+    """
+    context = get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_run_scenario_into, args=(scenario, results))
+    process.start()
+    try:
+        while True:
+            try:
+                ok, value = results.get(timeout=1)
+                break
+            except queue.Empty:
+                if not process.is_alive() and results.empty():
+                    raise RuntimeError(
+                        f"Benchmark process exited with code {process.exitcode}"
+                    ) from None
+    finally:
+        process.join()
+    if not ok:
+        raise RuntimeError(f"Benchmark scenario failed:\n{value}")
+    return value
+
+
+def _run_scenario_into(scenario: Dict[str, Any], results) -> None:
+    try:
+        results.put((True, run_scenario(**scenario)))
+    except BaseException:
+        results.put((False, traceback.format_exc()))
+
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Median of every timing across repeated runs; counts are identical."""
+    result = dict(runs[0])
+    for key in ("seconds", "pages_per_sec", "chunks_per_sec", "peak_rss_bytes"):
+        result[key] = statistics.median(run[key] for run in runs)
+    result["stages"] = {
+        name: statistics.median(run["stages"][name] for run in runs)
+        for name in runs[0]["stages"]
+    }
+    result["runs"] = len(runs)
+    return result
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "chunk_max_size": CHUNK_MAX_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "checkpoint_pages": INGEST_CHECKPOINT_PAGES,
+        "sandbox": PDF_SANDBOX,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Describe the throughput change of every scenario present in both files."""
+    previous = {scenario["name"]: scenario for scenario in baseline.get("scenarios", [])}
+    lines = []
+    for scenario in current["scenarios"]:
+        before = previous.get(scenario["name"])
+        if not before or not before.get("pages_per_sec"):
+            continue
+        change = (scenario["pages_per_sec"] / before["pages_per_sec"] - 1) * 100
+        lines.append(
+            f"{scenario['name']}: {before['pages_per_sec']:.1f} -> "
+            f"{scenario['pages_per_sec']:.1f} pages/sec ({change:+.1f}%)"
+        )
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--documents", type=int, default=3)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--words-per-page", type=int, default=400)
+    parser.add_argument(
+        "--layout", action="append", choices=LAYOUTS,
+        help="Repeat to benchmark several layouts (default: all)",
+    )
+    parser.add_argument("--engine", choices=("pdfplumber", "pypdf", "auto"))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--in-process", action="store_true",
+                        help="Skip per-scenario processes (peak RSS is then cumulative)")
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+    parser.add_argument("--baseline", help="Earlier result file to compare against")
+    args = parser.parse_args(argv)
+
+    run = run_scenario if args.in_process else run_isolated
+    scenarios = []
+    for layout in args.layout or LAYOUTS:
+        params = {
+            "documents": args.documents,
+            "pages": args.pages,
+            "words_per_page": args.words_per_page,
+            "layout": layout,
+            "engine": args.engine,
+            "seed": args.seed,
+        }
+        runs = [run(**params) for _ in range(args.repeat)]
+        name = f"{layout}-{args.documents}x{args.pages}p-{args.words_per_page}w-{args.engine or 'default'}"
+        scenarios.append({"name": name, "params": params, **summarize(runs)})
+
+    report = {"environment": environment(), "scenarios": scenarios}
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            for line in compare(report, json.load(f)):
+                print(line, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
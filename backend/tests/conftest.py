@@ -1,3 +1,17 @@
+import os
+import tempfile
+
+# Ingestion runs inline in tests; keep background workers off and uploads
+# out of the working tree. Must be set before the app modules are imported.
+os.environ.setdefault("INGEST_WORKERS", "0")
+# Sandboxed extraction has its own tests; elsewhere parse in-process
+os.environ.setdefault("PDF_SANDBOX", "false")
+# The search cache outlives test databases; its own tests use fresh instances
+os.environ.setdefault("SEARCH_CACHE_MAX_BYTES", "0")
+# Vector index files live per test under tmp_path; see test_semantic_search
+os.environ.setdefault("SEMANTIC_SEARCH", "false")
+os.environ.setdefault("UPLOAD_DIR", tempfile.mkdtemp(prefix="pdf-uploads-"))
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
@@ -6,6 +20,7 @@ from sqlalchemy.pool import StaticPool
 
 from app.main import app
 from app.database import Base, get_db
+from app.models.pdf import PDF
 
 # Create in-memory SQLite database for testing
 SQLALCHEMY_DATABASE_URL = "sqlite://"
@@ -63,4 +78,80 @@ def auth_headers(client, test_user):
         headers={"Content-Type": "application/x-www-form-urlencoded"}
     )
     token = response.json()["access_token"]
-    return {"Authorization": f"Bearer {token}"} 
\ No newline at end of file
+    return {"Authorization": f"Bearer {token}"}
+
+
+def build_pdf(pages):
+    """Build a minimal valid PDF with one line of Helvetica text per entry."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None]
+    kids = []
+    for text in pages:
+        escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        stream = f"BT /F1 12 Tf 72 720 Td ({escaped}) Tj ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 << /Type /Font /Subtype /Type1 "
+            b"/BaseFont /Helvetica >> >> >> /Contents %d 0 R >>" % content_ref
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    return bytes(out)
+
+
+def create_pdf(db, title="t", **fields):
+    """Commit a PDF record with placeholder file fields, for tests that only need its chunks."""
+    values = dict(title=title, filename=f"{title}.pdf", file_path="/x", file_size=1, total_pages=1)
+    values.update(fields)
+    pdf = PDF(**values)
+    db.add(pdf)
+    db.commit()
+    return pdf
+
+
+def build_chunk_rows(pdf_id, *contents, page=1):
+    """Rows for PDFChunkRepository.bulk_create, numbered from 1, all on `page`."""
+    return [
+        {"pdf_id": pdf_id, "chunk_number": n, "page_number": page, "content": content}
+        for n, content in enumerate(contents, 1)
+    ]
+
+
+@pytest.fixture
+def session_factory(test_db):
+    return TestingSessionLocal
+
+
+@pytest.fixture
+def pdf_builder():
+    return build_pdf
+
+
+@pytest.fixture
+def sample_pdf_bytes():
+    return build_pdf(["First page about apples.", "Second page about oranges."])
+
+
+@pytest.fixture
+def make_pdf():
+    return create_pdf
+
+
+@pytest.fixture
+def chunk_rows():
+    return build_chunk_rows
@@ -1,7 +1,9 @@
 import pytest
 from fastapi import status
 from unittest.mock import Mock, patch, mock_open
+import zipfile
 from io import BytesIO
+from sqlalchemy import text
 
 
 class TestPDFRouterIntegration:
@@ -72,6 +74,69 @@ class TestPDFRouterIntegration:
         data = response.json()
         assert data["size"] == 5
 
+    def test_chunks_and_search_by_cursor(self, client, auth_headers, test_db, make_pdf):
+        from app.repositories.pdf_chunk import PDFChunkRepository
+
+        pdf = make_pdf(test_db, total_pages=5)
+        PDFChunkRepository(test_db).bulk_create(
+            {"pdf_id": pdf.id, "chunk_number": n, "page_number": n, "content": f"cursor {n}"}
+            for n in range(1, 6)
+        )
+
+        for url in (f"/api/pdfs/{pdf.id}/chunks?limit=2", "/api/pdfs/search/content?q=cursor&limit=2"):
+            numbers, totals, cursor = [], [], ""
+            while cursor is not None:
+                data = client.get(url, params={"cursor": cursor}, headers=auth_headers).json()
+                assert data["page"] is None
+                totals.append(data["total"])
+                numbers += [item["chunk_number"] for item in data["items"]]
+                cursor = data["next_cursor"]
+            assert sorted(numbers) == [1, 2, 3, 4, 5]
+            if "search" in url:
+                # Search matches are counted on the first cursor page only
+                assert totals == [5, None, None]
+            else:
+                assert totals == [5, 5, 5]
+
+        response = client.get(f"/api/pdfs/{pdf.id}/chunks?cursor=bogus", headers=auth_headers)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_search_snippets_and_full_chunk(self, client, auth_headers, test_db, make_pdf, chunk_rows):
+        from app.repositories.pdf_chunk import PDFChunkRepository
+
+        pdf_id = make_pdf(test_db).id
+        content = "lorem ipsum " * 40 + "the invoice total " + "dolor sit " * 40
+        PDFChunkRepository(test_db).bulk_create(chunk_rows(pdf_id, content))
+
+        response = client.get("/api/pdfs/search/snippets?q=invoice", headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["total"] == 1
+        item = data["items"][0]
+        assert "content" not in item
+        assert len(item["snippet"]) < len(content) // 4
+        assert [item["snippet"][s:e] for s, e in item["highlights"]] == ["invoice"]
+
+        response = client.get(f"/api/pdfs/{pdf_id}/chunks/{item['id']}", headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["content"] == content.strip()
+
+        response = client.get(f"/api/pdfs/{pdf_id + 1}/chunks/{item['id']}", headers=auth_headers)
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_search_cache_stats(self, client, auth_headers):
+        response = client.get("/api/pdfs/search/cache/stats", headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert {"entries", "hits", "misses", "hit_rate"} <= response.json().keys()
+
+    def test_search_pdf_content_with_max_count(self, client, auth_headers):
+        response = client.get("/api/pdfs/search/content?q=test&max_count=10", headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["total_is_exact"] is True
+
+        response = client.get("/api/pdfs/search/content?q=test&max_count=0", headers=auth_headers)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
     @pytest.mark.parametrize(
         "endpoint,headers,expected_status,expected_detail",
         [
@@ -100,6 +165,231 @@ class TestPDFRouterIntegration:
         # This will likely fail due to invalid PDF, but we're testing the endpoint
         assert response.status_code in [status.HTTP_400_BAD_REQUEST, status.HTTP_500_INTERNAL_SERVER_ERROR]
 
+    def test_upload_valid_pdf_is_queued(self, client, auth_headers, sample_pdf_bytes):
+        files = {"file": ("real.pdf", BytesIO(sample_pdf_bytes), "application/pdf")}
+
+        response = client.post("/api/pdfs/upload", files=files, headers=auth_headers)
+        assert response.status_code == status.HTTP_202_ACCEPTED
+
+        data = response.json()
+        assert data["processing_status"] == "pending"
+        assert data["filename"] == "real.pdf"
+        assert data["file_size"] == len(sample_pdf_bytes)
+
+    def test_upload_duplicate_returns_existing(self, client, auth_headers, test_db, sample_pdf_bytes):
+        def upload(query=""):
+            files = {"file": ("real.pdf", BytesIO(sample_pdf_bytes), "application/pdf")}
+            return client.post(f"/api/pdfs/upload{query}", files=files, headers=auth_headers)
+
+        first = upload().json()
+        test_db.execute(
+            text("UPDATE pdfs SET processing_status = 'completed' WHERE id = :id"),
+            {"id": first["id"]},
+        )
+        test_db.commit()
+
+        duplicate = upload()
+        assert duplicate.json()["id"] == first["id"]
+        assert duplicate.json()["processing_status"] == "completed"
+        assert duplicate.json()["content_hash"] == first["content_hash"]
+
+        forced = upload("?force=true")
+        assert forced.json()["id"] == first["id"]
+        assert forced.json()["processing_status"] == "pending"
+
+        assert client.get("/api/pdfs/", headers=auth_headers).json()["total"] == 1
+
+    def test_upload_batch_of_files(self, client, auth_headers, pdf_builder, sample_pdf_bytes):
+        files = [
+            ("files", ("a.pdf", BytesIO(pdf_builder(["alpha"])), "application/pdf")),
+            ("files", ("b.pdf", BytesIO(pdf_builder(["beta"])), "application/pdf")),
+            ("files", ("again.pdf", BytesIO(pdf_builder(["alpha"])), "application/pdf")),
+            ("files", ("notes.txt", BytesIO(b"not a pdf"), "text/plain")),
+        ]
+        response = client.post("/api/pdfs/upload/batch", files=files, headers=auth_headers)
+
+        assert response.status_code == 202
+        data = response.json()
+        assert data["total"] == 4
+        assert data["accepted"] == 3
+        assert [item["status"] for item in data["items"]] == [
+            "queued", "queued", "duplicate", "rejected"
+        ]
+        assert data["items"][2]["pdf_id"] == data["items"][0]["pdf_id"]
+        assert data["items"][3]["error"] == "File is not a valid PDF"
+
+        batch = client.get(f"/api/pdfs/batches/{data['batch_id']}", headers=auth_headers)
+        assert batch.status_code == 200
+        assert batch.json()["total"] == 3
+        assert batch.json()["counts"] == {"queued": 2, "duplicate": 1}
+
+    def test_upload_batch_zip_archive(self, client, auth_headers, pdf_builder):
+        archive = BytesIO()
+        with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("docs/one.pdf", pdf_builder(["one"]))
+            zf.writestr("docs/two.PDF", pdf_builder(["two"]))
+            zf.writestr("docs/readme.txt", "skip me")
+            zf.writestr("__MACOSX/docs/._one.pdf", "resource fork")
+            zf.writestr("docs/broken.pdf", b"garbage")
+        archive.seek(0)
+
+        files = [("files", ("docs.zip", archive, "application/zip"))]
+        response = client.post("/api/pdfs/upload/batch", files=files, headers=auth_headers)
+
+        assert response.status_code == 202
+        items = {item["filename"]: item for item in response.json()["items"]}
+        assert set(items) == {"one.pdf", "two.PDF", "broken.pdf"}
+        assert items["one.pdf"]["status"] == "queued"
+        assert items["broken.pdf"]["status"] == "rejected"
+
+        pdfs = client.get("/api/pdfs/", headers=auth_headers).json()
+        assert pdfs["total"] == 2
+
+    def test_upload_batch_invalid_zip(self, client, auth_headers):
+        files = [("files", ("docs.zip", BytesIO(b"PK\x03\x04 truncated"), "application/zip"))]
+        response = client.post("/api/pdfs/upload/batch", files=files, headers=auth_headers)
+        assert response.status_code == 400
+        assert response.json()["detail"] == "File is not a valid ZIP archive"
+
+    def test_upload_rejected_when_ingestion_backlog_full(self, client, auth_headers, sample_pdf_bytes):
+        from app.services.ingestion_queue import ingestion_queue
+
+        files = {"file": ("real.pdf", BytesIO(sample_pdf_bytes), "application/pdf")}
+        with patch.object(ingestion_queue, "max_queued", 0):
+            response = client.post("/api/pdfs/upload", files=files, headers=auth_headers)
+
+        assert response.status_code == 503
+        assert int(response.headers["Retry-After"]) >= 1
+
+        stats = client.get("/api/pdfs/ingestion/stats", headers=auth_headers).json()
+        assert stats["jobs"]["queued"] == 0
+        assert stats["uploads"]["active"] == 0
+
+    def test_batch_larger_than_backlog_is_not_retryable(self, client, auth_headers, pdf_builder):
+        from app.services.ingestion_queue import ingestion_queue
+
+        files = [
+            ("files", (f"{n}.pdf", BytesIO(pdf_builder([str(n)])), "application/pdf"))
+            for n in range(3)
+        ]
+        with patch.object(ingestion_queue, "max_queued", 2):
+            response = client.post("/api/pdfs/upload/batch", files=files, headers=auth_headers)
+
+        assert response.status_code == 413
+        assert "Retry-After" not in response.headers
+        assert client.get("/api/pdfs/", headers=auth_headers).json()["total"] == 0
+
+    def test_zip_members_past_backlog_are_rejected(self, client, auth_headers, pdf_builder):
+        from app.services.ingestion_queue import ingestion_queue
+
+        archive = BytesIO()
+        with zipfile.ZipFile(archive, "w") as zf:
+            for n in range(3):
+                zf.writestr(f"{n}.pdf", pdf_builder([f"member {n}"]))
+        archive.seek(0)
+
+        files = [("files", ("docs.zip", archive, "application/zip"))]
+        with patch.object(ingestion_queue, "max_queued", 2):
+            response = client.post("/api/pdfs/upload/batch", files=files, headers=auth_headers)
+
+        assert response.status_code == 202
+        items = response.json()["items"]
+        assert [item["status"] for item in items] == ["queued", "queued", "rejected"]
+        assert items[2]["error"].startswith("Ingestion queue is full")
+        stats = client.get("/api/pdfs/ingestion/stats", headers=auth_headers).json()
+        assert stats["jobs"]["queued"] == 2
+
+    def test_progress_stream_for_finished_pdf(self, client, auth_headers, test_db, sample_pdf_bytes):
+        files = {"file": ("real.pdf", BytesIO(sample_pdf_bytes), "application/pdf")}
+        pdf_id = client.post("/api/pdfs/upload", files=files, headers=auth_headers).json()["id"]
+        test_db.execute(
+            text("UPDATE pdfs SET processing_status = 'completed', total_pages = 2 WHERE id = :id"),
+            {"id": pdf_id},
+        )
+        test_db.commit()
+
+        response = client.get(f"/api/pdfs/{pdf_id}/progress", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert response.text.startswith("event: progress\ndata: ")
+        assert '"status":"completed"' in response.text
+        assert '"total_pages":2' in response.text
+
+    def test_progress_stream_not_found(self, client, auth_headers):
+        response = client.get("/api/pdfs/999/progress", headers=auth_headers)
+        assert response.status_code == 404
+
+    def test_progress_snapshot_read_off_the_event_loop(self, client, auth_headers):
+        import asyncio
+        from app.services.pdf_service import PDFService
+
+        on_loop = []
+
+        def get_progress(service, pdf_id):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return {"status": "completed"}
+
+        with patch.object(PDFService, "get_progress", get_progress):
+            response = client.get("/api/pdfs/1/progress", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert on_loop == [False]
+
+    def test_get_batch_not_found(self, client, auth_headers):
+        response = client.get("/api/pdfs/batches/unknown", headers=auth_headers)
+        assert response.status_code == 404
+
+    def test_download_pdf_file_with_range(self, client, auth_headers, sample_pdf_bytes):
+        files = {"file": ("real.pdf", BytesIO(sample_pdf_bytes), "application/pdf")}
+        pdf_id = client.post("/api/pdfs/upload", files=files, headers=auth_headers).json()["id"]
+
+        full = client.get(f"/api/pdfs/{pdf_id}/file", headers=auth_headers)
+        assert full.status_code == status.HTTP_200_OK
+        assert full.content == sample_pdf_bytes
+        assert full.headers["accept-ranges"] == "bytes"
+
+        partial = client.get(
+            f"/api/pdfs/{pdf_id}/file", headers={**auth_headers, "Range": "bytes=0-7"}
+        )
+        assert partial.status_code == status.HTTP_206_PARTIAL_CONTENT
+        assert partial.content == sample_pdf_bytes[:8]
+        assert partial.headers["content-range"] == f"bytes 0-7/{len(sample_pdf_bytes)}"
+
+        invalid = client.get(
+            f"/api/pdfs/{pdf_id}/file",
+            headers={**auth_headers, "Range": f"bytes={len(sample_pdf_bytes)}-"},
+        )
+        assert invalid.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+
+        assert client.get("/api/pdfs/999/file", headers=auth_headers).status_code == 404
+
+    def test_reprocess_pdf_from_stored_file(self, client, auth_headers, test_db, sample_pdf_bytes):
+        files = {"file": ("real.pdf", BytesIO(sample_pdf_bytes), "application/pdf")}
+        pdf_id = client.post("/api/pdfs/upload", files=files, headers=auth_headers).json()["id"]
+        test_db.execute(
+            text("UPDATE pdfs SET processing_status = 'failed' WHERE id = :id"), {"id": pdf_id}
+        )
+        test_db.commit()
+
+        response = client.post(f"/api/pdfs/{pdf_id}/reprocess", headers=auth_headers)
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.json()["processing_status"] == "pending"
+
+        assert client.post("/api/pdfs/999/reprocess", headers=auth_headers).status_code == 404
+
+    def test_upload_pdf_too_large(self, client, auth_headers, sample_pdf_bytes):
+        files = {"file": ("big.pdf", BytesIO(sample_pdf_bytes), "application/pdf")}
+
+        with patch("app.services.pdf_service.MAX_UPLOAD_SIZE", 10):
+            response = client.post("/api/pdfs/upload", files=files, headers=auth_headers)
+
+        assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
     def test_upload_pdf_with_title(self, client, auth_headers):
         file_content = b"Mock PDF content"
         files = {
@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+from app.models.pdf import PDF
+from app.repositories.ingestion_job import IngestionJobRepository
+from app.services.admission import AdmissionGate, AdmissionRejected
+from app.services.ingestion_queue import IngestionQueue
+
+
+class TestAdmissionGate:
+    @pytest.mark.asyncio
+    async def test_limits_concurrency_and_records_waits(self):
+        gate = AdmissionGate(limit=1, max_waiting=5, timeout=5)
+        running = []
+
+        async def work(n):
+            async with gate.admit():
+                running.append(gate.active)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(work(n) for n in range(3)))
+
+        assert running == [1, 1, 1]
+        stats = gate.stats()
+        assert stats["admitted"] == 3
+        assert stats["active"] == 0 and stats["waiting"] == 0
+        assert stats["max_wait_seconds"] > 0
+
+    @pytest.mark.asyncio
+    async def test_rejects_with_429_when_wait_queue_full(self):
+        gate = AdmissionGate(limit=1, max_waiting=0, timeout=5)
+
+        async with gate.admit():
+            with pytest.raises(AdmissionRejected) as exc:
+                async with gate.admit():
+                    pass
+
+        assert exc.value.status_code == 429
+        assert exc.value.retry_after >= 1
+        assert gate.stats()["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_rejects_with_503_after_timeout(self):
+        gate = AdmissionGate(limit=1, max_waiting=1, timeout=0.01)
+
+        async with gate.admit():
+            with pytest.raises(AdmissionRejected) as exc:
+                async with gate.admit():
+                    pass
+
+        assert exc.value.status_code == 503
+        assert gate.waiting == 0
+
+
+class TestIngestionBacklog:
+    def test_ensure_capacity_rejects_full_backlog(self, test_db, session_factory):
+        pdf = PDF(title="t", filename="t.pdf", file_path="/tmp/t.pdf", file_size=1, total_pages=0)
+        test_db.add(pdf)
+        test_db.commit()
+        repo = IngestionJobRepository(test_db)
+        queue = IngestionQueue(session_factory, workers=2, max_queued=2)
+
+        repo.enqueue(pdf.id)
+        queue.ensure_capacity(repo)
+        repo.enqueue(pdf.id)
+
+        with pytest.raises(AdmissionRejected) as exc:
+            queue.ensure_capacity(repo)
+        assert exc.value.status_code == 503
+        assert exc.value.retry_after == 1
+
+        stats = queue.stats(repo)
+        assert stats["queued"] == 2
+        assert stats["max_queued"] == 2
@@ -0,0 +1,92 @@
+import asyncio
+import hashlib
+import pytest
+from app.routers.range_response import (
+    RangeFileResponse,
+    RangeNotSatisfiable,
+    parse_range_header,
+)
+from app.services.blob_store import LocalBlobStore
+
+
+class TestLocalBlobStore:
+    def test_put_uses_sharded_layout(self, tmp_path):
+        store = LocalBlobStore(str(tmp_path))
+        content = b"%PDF-1.4 blob"
+        digest = hashlib.sha256(content).hexdigest()
+
+        staged = store.staging_path()
+        with open(staged, "wb") as f:
+            f.write(content)
+        path = store.put(staged, digest)
+
+        assert path == str(tmp_path / digest[:2] / digest[2:4] / f"{digest}.pdf")
+        assert store.path(digest) == path
+        assert store.exists(digest)
+        assert not (tmp_path / "tmp" / staged).exists()
+
+    def test_put_existing_blob_discards_staged_copy(self, tmp_path):
+        store = LocalBlobStore(str(tmp_path))
+        digest = "ab" * 32
+
+        for _ in range(2):
+            staged = store.staging_path()
+            with open(staged, "wb") as f:
+                f.write(b"same")
+            store.put(staged, digest)
+
+        assert list((tmp_path / "tmp").iterdir()) == []
+
+    def test_delete(self, tmp_path):
+        store = LocalBlobStore(str(tmp_path))
+        digest = "cd" * 32
+        staged = store.staging_path()
+        open(staged, "wb").close()
+        store.put(staged, digest)
+
+        assert store.delete(digest) is True
+        assert store.delete(digest) is False
+        assert store.path(digest) is None
+
+    def test_rejects_invalid_digest(self, tmp_path):
+        with pytest.raises(ValueError):
+            LocalBlobStore(str(tmp_path)).path("../../etc/passwd")
+
+
+class TestRangeHeader:
+    @pytest.mark.parametrize(
+        "header,expected",
+        [
+            (None, None),
+            ("bytes=0-9", (0, 9)),
+            ("bytes=90-", (90, 99)),
+            ("bytes=-10", (90, 99)),
+            ("bytes=95-200", (95, 99)),
+            ("bytes=0-1,5-6", None),
+            ("items=0-1", None),
+            ("bytes=abc", None),
+        ],
+    )
+    def test_parse_range_header(self, header, expected):
+        assert parse_range_header(header, 100) == expected
+
+    @pytest.mark.parametrize("header", ["bytes=100-", "bytes=5-1", "bytes=-0"])
+    def test_unsatisfiable(self, header):
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range_header(header, 100)
+
+    def test_zero_copy_send_when_server_supports_it(self, tmp_path):
+        path = tmp_path / "file.pdf"
+        path.write_bytes(b"0123456789")
+        response = RangeFileResponse(str(path), range_header="bytes=2-5")
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {"method": "GET", "extensions": {"http.response.zerocopysend": {}}}
+        asyncio.run(response(scope, None, send))
+
+        assert messages[0]["status"] == 206
+        assert messages[1]["type"] == "http.response.zerocopysend"
+        assert (messages[1]["offset"], messages[1]["count"]) == (2, 4)
@@ -0,0 +1,296 @@
+import pytest
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from app.database import Base, upgrade_schema
+from app.models.pdf_chunk import PDFChunk
+from app.models.search_index import (
+    FTS_TABLE,
+    TRIGRAM_TABLE,
+    drop_search_index,
+    has_search_index,
+    has_trigram_index,
+)
+from app.repositories import chunk_search
+from app.repositories.chunk_search import (
+    ChunkSearch,
+    InvertedIndexSearch,
+    LikeSearch,
+    RankedSubstringSearch,
+    SQLChunkSearch,
+    SQLiteFTSSearch,
+    TrigramSearch,
+    get_chunk_search,
+    to_fts_query,
+    to_trigram_query,
+)
+from app.repositories.pdf_chunk import PDFChunkRepository
+
+
+@pytest.fixture
+def chunks(test_db, make_pdf, chunk_rows):
+    first = make_pdf(test_db, "first")
+    second = make_pdf(test_db, "second")
+    repo = PDFChunkRepository(test_db)
+    repo.bulk_create(chunk_rows(
+        first.id,
+        "Quarterly invoice totals for the northern region.",
+        "Invoice invoice invoice: the invoice appendix.",
+        "Nothing relevant here.",
+    ))
+    repo.bulk_create(chunk_rows(second.id, "A single invoice mention."))
+    return repo, first, second
+
+
+class TestFTSIndex:
+    def test_created_with_table_and_selected(self, test_db):
+        with test_db.get_bind().connect() as connection:
+            assert has_search_index(connection)
+        backend = get_chunk_search(test_db)
+        assert isinstance(backend, RankedSubstringSearch)
+        assert isinstance(backend.ranking, SQLiteFTSSearch)
+
+    def test_word_matching_on_request(self, test_db, monkeypatch):
+        monkeypatch.setattr(chunk_search, "SEARCH_BACKEND", "fts")
+        monkeypatch.setattr(chunk_search, "_backends", {})
+        backend = get_chunk_search(test_db)
+        assert isinstance(backend, SQLiteFTSSearch)
+        assert isinstance(backend.fallback, TrigramSearch)
+
+    def test_ranks_by_bm25_and_filters(self, chunks):
+        repo, first, second = chunks
+
+        results = repo.search_all_content("invoice")
+        assert [c.content for c in results][0] == "Invoice invoice invoice: the invoice appendix."
+        assert len(results) == 3
+        assert repo.count_search_all_content("invoice") == 3
+
+        scoped = repo.search_content(second.id, "INVOICE")
+        assert [c.pdf_id for c in scoped] == [second.id]
+        assert repo.count_search_content("invoice", first.id) == 2
+
+    def test_phrase_with_prefix(self, chunks):
+        repo, first, _ = chunks
+        assert [c.chunk_number for c in repo.search_content(first.id, "invoice tot")] == [1]
+        assert repo.search_all_content("totals invoice") == []
+
+    def test_triggers_follow_deletes_and_updates(self, test_db, chunks):
+        repo, first, second = chunks
+
+        repo.delete_by_pdf(first.id)
+        assert repo.count_search_all_content("invoice") == 1
+
+        chunk = repo.search_all_content("invoice")[0]
+        chunk.content = "Renamed receipt."
+        test_db.commit()
+        assert repo.count_search_all_content("invoice") == 0
+        assert repo.count_search_all_content("receipt") == 1
+
+    def test_query_uses_index_not_scan(self, test_db, chunks):
+        plan = test_db.execute(
+            text(
+                f"EXPLAIN QUERY PLAN SELECT pdf_chunks.id FROM pdf_chunks "
+                f"JOIN {FTS_TABLE} ON {FTS_TABLE}.rowid = pdf_chunks.id "
+                f"WHERE {FTS_TABLE} MATCH :q"
+            ),
+            {"q": '"invoice"*'},
+        ).fetchall()
+        details = " ".join(row[-1] for row in plan)
+        assert "VIRTUAL TABLE INDEX" in details
+        assert "SEARCH pdf_chunks" in details
+
+    def test_punctuation_only_falls_back_to_substring(self, test_db, chunks):
+        repo, first, _ = chunks
+        assert [c.chunk_number for c in repo.search_content(first.id, ":")] == [2]
+
+
+@contextmanager
+def count_statements(db):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+class TestSearchPage:
+    @pytest.mark.parametrize("backend", [SQLiteFTSSearch(LikeSearch()), LikeSearch()])
+    def test_page_and_total_in_one_query(self, chunks, backend):
+        repo, first, _ = chunks
+
+        with count_statements(repo.db) as statements:
+            page = backend.search_page(repo.db, "invoice", None, 0, 2)
+        assert len(statements) == 1
+        assert "OVER ()" in statements[0]
+        assert (len(page.items), page.total, page.total_is_exact) == (2, 3, True)
+        assert [c.id for c in page.items] == [c.id for c in backend.search(repo.db, "invoice")][:2]
+
+        scoped = backend.search_page(repo.db, "invoice", first.id, 1, 5)
+        assert (len(scoped.items), scoped.total) == (1, 2)
+
+    def test_page_past_the_end_still_counts(self, chunks):
+        repo, _, _ = chunks
+        assert repo.search_page("invoice", skip=10, limit=5) == ([], 3, True)
+        assert repo.search_page("absent", skip=0, limit=5) == ([], 0, True)
+
+    def test_capped_total(self, chunks):
+        repo, _, _ = chunks
+
+        capped = repo.search_page("invoice", limit=1, max_count=2)
+        assert (len(capped.items), capped.total, capped.total_is_exact) == (1, 2, False)
+
+        assert repo.search_page("invoice", limit=1, max_count=3)[1:] == (3, True)
+
+        # A short page is the end of the results: no count query at all
+        with count_statements(repo.db) as statements:
+            short = repo.search_page("invoice", limit=10, max_count=2)
+        assert len(statements) == 1
+        assert short[1:] == (3, True)
+
+
+class TestTrigramSearch:
+    CONTENTS = [
+        "Replace part AB-4711X before shipping.",
+        "Order ab-4711 and CD-0815, or ab_4711.",
+        "Invoices are due: net 30 days.",
+        'Quoted "ab-47" code, 100% certain.',
+    ]
+    TERMS = [
+        "4711", "B-471", "ab-4711x", "voices", "ab_4711", "ab%4711", "CD-08", "net 3",
+        '"ab-47"', "100%", "zz", "ab", "", "missing code",
+    ]
+
+    @pytest.fixture
+    def parts(self, test_db, make_pdf, chunk_rows):
+        pdf = make_pdf(test_db)
+        PDFChunkRepository(test_db).bulk_create(chunk_rows(pdf.id, *self.CONTENTS))
+        return pdf
+
+    def test_index_created_and_used_as_fallback(self, test_db):
+        with test_db.get_bind().connect() as connection:
+            assert has_trigram_index(connection)
+        assert isinstance(get_chunk_search(test_db).substring, TrigramSearch)
+
+    def test_matches_the_substring_scan(self, test_db, parts):
+        like, trigram = LikeSearch(), TrigramSearch()
+        for term in self.TERMS:
+            for pdf_id in (None, parts.id):
+                expected = [c.id for c in like.search(test_db, term, pdf_id)]
+                assert [c.id for c in trigram.search(test_db, term, pdf_id)] == expected, term
+                assert trigram.count(test_db, term, pdf_id) == len(expected), term
+
+        assert [c.chunk_number for c in trigram.search(test_db, "4711", parts.id)] == [1, 2]
+
+    def test_narrows_through_the_index(self, test_db, parts):
+        with count_statements(test_db) as statements:
+            TrigramSearch().search(test_db, "4711").all()
+        (statement,) = statements
+        assert f"{TRIGRAM_TABLE} MATCH" in statement
+
+        plan = test_db.execute(
+            text(
+                f"EXPLAIN QUERY PLAN SELECT id FROM pdf_chunks WHERE id IN "
+                f"(SELECT rowid FROM {TRIGRAM_TABLE} WHERE {TRIGRAM_TABLE} MATCH :q)"
+            ),
+            {"q": to_trigram_query("4711")},
+        ).fetchall()
+        details = " ".join(row[-1] for row in plan)
+        assert "VIRTUAL TABLE INDEX" in details
+        assert "SEARCH pdf_chunks" in details
+
+    def test_default_search_finds_codes_inside_words(self, test_db, parts):
+        repo = PDFChunkRepository(test_db)
+        with count_statements(test_db) as statements:
+            results = repo.search_all_content("4711")
+        assert [c.chunk_number for c in results] == [2, 1]
+        assert f"{TRIGRAM_TABLE} MATCH" in statements[-1]
+        assert repo.count_search_all_content("4711") == 2
+
+        # Word matches ("Order", "or") rank first, the other substring matches ("before") follow
+        assert [c.chunk_number for c in repo.search_all_content("or")] == [2, 1]
+        assert [c.chunk_number for c in repo.search_all_content("voices")] == [3]
+
+        numbers, cursor = [], ""
+        while cursor is not None:
+            page, cursor = repo.search_after("4711", None, cursor, limit=1)
+            numbers += [c.chunk_number for c in page]
+        assert numbers == [2, 1]
+
+    def test_triggers_follow_deletes_and_updates(self, test_db, parts):
+        repo = PDFChunkRepository(test_db)
+        trigram = TrigramSearch()
+        chunk = trigram.search(test_db, "AB-4711X").one()
+        chunk.content = "Renamed to ZX-9000."
+        test_db.commit()
+        assert trigram.count(test_db, "4711x") == 0
+        assert trigram.count(test_db, "x-900") == 1
+
+        repo.delete_by_pdf(parts.id)
+        assert trigram.count(test_db, "x-900") == 0
+
+
+class TestSearchIndexMigration:
+    def test_upgrade_backfills_existing_rows(self, tmp_path, make_pdf, chunk_rows):
+        engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as connection:
+            # Simulate a database created before the index existed
+            drop_search_index(connection)
+            for index in (FTS_TABLE, TRIGRAM_TABLE):
+                for trigger in ("ai", "ad", "au"):
+                    connection.execute(text(f"DROP TRIGGER IF EXISTS {index}_{trigger}"))
+        db = sessionmaker(bind=engine)()
+        pdf = make_pdf(db)
+        PDFChunkRepository(db).bulk_create(chunk_rows(pdf.id, "Legacy searchable text."))
+        db.close()
+
+        upgrade_schema(engine)
+
+        db = sessionmaker(bind=engine)()
+        repo = PDFChunkRepository(db)
+        assert isinstance(repo.search_backend, RankedSubstringSearch)
+        assert isinstance(repo.search_backend.substring, TrigramSearch)
+        assert [c.content for c in repo.search_all_content("legacy")] == ["Legacy searchable text."]
+        assert TrigramSearch().count(db, "gacy sea") == 1
+        db.close()
+        engine.dispose()
+
+
+class TestSearchHelpers:
+    def test_backends_implement_the_interface(self):
+        with pytest.raises(TypeError):
+            ChunkSearch()
+
+        class Unranked(SQLChunkSearch):
+            name = "unranked"
+
+            def _matches(self, db, search_term, pdf_id):
+                return db.query(PDFChunk)
+
+        with pytest.raises(TypeError):
+            Unranked()
+
+        # The index backend answers everything itself, with no SQL stubs to fall into
+        assert not issubclass(InvertedIndexSearch, SQLChunkSearch)
+        assert not hasattr(InvertedIndexSearch, "_ranked")
+
+    def test_to_trigram_query(self):
+        assert to_trigram_query("AB-47") == '"-47" AND "AB-" AND "B-4"'
+        assert to_trigram_query('a"bc%de_fgh') == '"""bc" AND "a""b" AND "fgh"'
+        assert to_trigram_query("ab%cd") is None
+
+    def test_to_fts_query(self):
+        assert to_fts_query('part "no" 12-b') == '"part no 12 b"*'
+        assert to_fts_query("?!") is None
+
+    def test_like_search_orders_like_before(self, chunks):
+        repo, first, _ = chunks
+        like = LikeSearch()
+        assert [c.chunk_number for c in like.search(repo.db, "invoice", first.id)] == [1, 2]
+        assert like.count(repo.db, "nvoic") == 3
@@ -0,0 +1,60 @@
+import pytest
+from app.services.chunker import iter_chunks
+
+
+def assert_offsets(text, chunks):
+    for chunk in chunks:
+        assert text[chunk.start : chunk.end] == chunk.text
+
+
+class TestChunker:
+    def test_short_text_is_single_chunk(self):
+        chunks = list(iter_chunks("  Short text \n", max_size=100))
+        assert [(c.text, c.start, c.end) for c in chunks] == [("Short text", 2, 12)]
+
+    def test_blank_text_yields_nothing(self):
+        assert list(iter_chunks(" \n\t ", max_size=10)) == []
+
+    def test_prefers_sentence_boundaries(self):
+        text = "First sentence here. Second sentence here. Third one."
+        chunks = list(iter_chunks(text, max_size=45))
+
+        assert chunks[0].text == "First sentence here. Second sentence here."
+        assert chunks[1].text == "Third one."
+        assert_offsets(text, chunks)
+
+    def test_falls_back_to_newlines_then_whitespace(self):
+        text = "line one words\nline two words\nline three"
+        chunks = list(iter_chunks(text, max_size=20))
+        assert [c.text for c in chunks] == ["line one words", "line two words", "line three"]
+
+        text = "alpha beta gamma delta epsilon zeta"
+        chunks = list(iter_chunks(text, max_size=12))
+        assert all(" " not in c.text or len(c.text) <= 12 for c in chunks)
+        assert " ".join(c.text for c in chunks) == text
+
+    def test_hard_caps_text_without_boundaries(self):
+        text = "x" * 2500
+        chunks = list(iter_chunks(text, max_size=1000))
+
+        assert [len(c.text) for c in chunks] == [1000, 1000, 500]
+        assert_offsets(text, chunks)
+
+    def test_overlap_repeats_whole_words(self):
+        text = " ".join(f"word{n}" for n in range(40))
+        chunks = list(iter_chunks(text, max_size=60, overlap=12))
+
+        assert all(len(c.text) <= 60 for c in chunks)
+        for previous, current in zip(chunks, chunks[1:]):
+            assert current.start < previous.end
+            assert current.text.split()[0] in previous.text.split()
+        assert_offsets(text, chunks)
+
+    def test_is_lazy(self):
+        chunks = iter_chunks("a. " * 1000, max_size=10)
+        assert next(chunks).text == "a. a. a."
+
+    @pytest.mark.parametrize("max_size,overlap", [(0, 0), (100, 50), (100, -1)])
+    def test_rejects_invalid_settings(self, max_size, overlap):
+        with pytest.raises(ValueError):
+            list(iter_chunks("text", max_size=max_size, overlap=overlap))
@@ -0,0 +1,110 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import sqlite
+from app.models.pdf_chunk import PDFChunk
+from app.repositories.chunk_search import InvertedIndexSearch, LikeSearch, SQLiteFTSSearch
+from app.repositories.cursor import after_key, decode_cursor, encode_cursor
+from app.repositories.pdf import PDFRepository
+from app.repositories.pdf_chunk import PDFChunkRepository
+from app.repositories.inverted_index import InvertedIndex
+
+
+def walk(fetch, limit):
+    """Collect every item by following next_cursor from an empty start."""
+    items, cursor, pages = [], "", 0
+    while cursor is not None:
+        page, cursor = fetch(cursor, limit)
+        items.extend(page)
+        pages += 1
+    return items, pages
+
+
+@pytest.fixture
+def chunks(test_db, make_pdf):
+    pdf = make_pdf(test_db)
+    repo = PDFChunkRepository(test_db)
+    repo.bulk_create(
+        {
+            "pdf_id": pdf.id,
+            "chunk_number": n,
+            "page_number": n,
+            "content": ("invoice " * (n % 4 + 1)) + f"line {n}",
+        }
+        for n in range(1, 24)
+    )
+    return repo, pdf
+
+
+class TestCursorTokens:
+    def test_round_trip(self):
+        key = (datetime(2024, 5, 1, 12, 30), 7, -1.25)
+        assert decode_cursor(encode_cursor(key, "sig"), "sig", 3) == key
+
+    @pytest.mark.parametrize("token", ["not base64!", "e30", encode_cursor((1,), "other")])
+    def test_rejects_bad_or_foreign_cursors(self, token):
+        with pytest.raises(ValueError, match="Invalid or expired cursor"):
+            decode_cursor(token, "sig", 1)
+
+    def test_after_key_uses_row_values_or_expands_mixed_directions(self):
+        same = after_key([(PDFChunk.chunk_number, False), (PDFChunk.id, False)], (3, 9))
+        mixed = after_key([(PDFChunk.created_at, True), (PDFChunk.id, False)], (1, 9))
+        dialect = sqlite.dialect()
+        assert "(pdf_chunks.chunk_number, pdf_chunks.id) > (" in str(same.compile(dialect=dialect))
+        assert " OR " in str(mixed.compile(dialect=dialect))
+
+
+class TestKeysetPagination:
+    def test_chunk_listing_matches_offset_order(self, chunks):
+        repo, pdf = chunks
+        items, pages = walk(lambda c, n: repo.get_by_pdf_after(pdf.id, c, n), 5)
+        assert [c.chunk_number for c in items] == list(range(1, 24))
+        assert pages == 5
+
+    def test_chunk_listing_seeks_the_index(self, test_db, chunks):
+        plan = test_db.execute(
+            text(
+                "EXPLAIN QUERY PLAN SELECT id FROM pdf_chunks WHERE pdf_id = 1 "
+                "AND (chunk_number, id) > (40000, 1) ORDER BY chunk_number, id LIMIT 20"
+            )
+        ).fetchall()
+        details = " ".join(row[-1] for row in plan)
+        assert "ix_pdf_chunks_pdf_id_chunk_number (pdf_id=? AND chunk_number>?)" in details
+        assert "TEMP B-TREE" not in details
+
+    @pytest.mark.parametrize("backend", [SQLiteFTSSearch(LikeSearch()), LikeSearch()])
+    @pytest.mark.parametrize("scoped", [True, False])
+    def test_search_walk_matches_ranked_order(self, chunks, backend, scoped):
+        repo, pdf = chunks
+        pdf_id = pdf.id if scoped else None
+        expected = [c.id for c in backend.search(repo.db, "invoice", pdf_id)]
+
+        items, _ = walk(lambda c, n: backend.search_after(repo.db, "invoice", pdf_id, c, n), 4)
+        assert [c.id for c in items] == expected
+
+    def test_inverted_index_walk(self, chunks, tmp_path):
+        repo, pdf = chunks
+        backend = InvertedIndexSearch.open(
+            repo.db.get_bind(), str(tmp_path / "walk.idx"), LikeSearch()
+        )
+        expected, total = backend.index.search("invoice", limit=100)
+        items, _ = walk(lambda c, n: backend.search_after(repo.db, "invoice", None, c, n), 6)
+        assert [c.id for c in items] == expected
+        assert len(items) == total == 23
+        backend.close()
+
+    def test_pdf_listing_newest_first(self, test_db, make_pdf):
+        repo = PDFRepository(test_db)
+        created = [make_pdf(test_db, f"doc{i}") for i in range(5)]
+        items, _ = walk(
+            lambda c, n: repo.get_multi_after(c, n, order_by="created_at", order_desc=True), 2
+        )
+        assert [p.id for p in items] == [
+            p.id for p in sorted(created, key=lambda p: (p.created_at, p.id), reverse=True)
+        ]
+
+    def test_cursor_from_another_listing_is_rejected(self, chunks):
+        repo, pdf = chunks
+        _, cursor = repo.get_by_pdf_after(pdf.id, "", 2)
+        with pytest.raises(ValueError):
+            repo.search_after("invoice", None, cursor, 2)
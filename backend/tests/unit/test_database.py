@@ -0,0 +1,29 @@
+from sqlalchemy import create_engine, inspect, text
+from app.database import upgrade_schema
+
+
+def test_upgrade_schema_adds_new_columns_and_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE pdfs (id INTEGER PRIMARY KEY, created_at DATETIME, "
+                "updated_at DATETIME, title VARCHAR(255), filename VARCHAR(255), "
+                "file_path VARCHAR(500), content_type VARCHAR(100), file_size INTEGER, "
+                "total_pages INTEGER, author VARCHAR(255), subject VARCHAR(500), "
+                "keywords TEXT, processing_status VARCHAR(50), processing_error TEXT)"
+            )
+        )
+        conn.execute(text("INSERT INTO pdfs (id, title) VALUES (1, 'old')"))
+
+    upgrade_schema(engine)
+
+    inspector = inspect(engine)
+    columns = {c["name"] for c in inspector.get_columns("pdfs")}
+    assert {"content_hash", "last_completed_page"} <= columns
+    assert "ix_pdfs_content_hash" in {i["name"] for i in inspector.get_indexes("pdfs")}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT last_completed_page FROM pdfs")).scalar() == 0
+
+    # Idempotent on an up-to-date schema
+    upgrade_schema(engine)
@@ -0,0 +1,105 @@
+import pytest
+from unittest.mock import patch
+from app.models.pdf import PDF
+from app.services import extraction
+from app.services.extraction import (
+    get_extractor,
+    resolve_engine,
+    select_engine,
+    text_similarity,
+)
+from app.services.pdf_service import PDFService
+
+
+@pytest.fixture
+def pdf_path(tmp_path, pdf_builder):
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(pdf_builder([f"Quarterly report page {n}." for n in range(1, 6)]))
+    return str(path)
+
+
+class TestExtractors:
+    @pytest.mark.parametrize("engine", ["pdfplumber", "pypdf"])
+    def test_engines_extract_same_pages(self, pdf_path, engine):
+        with get_extractor(engine).open(pdf_path) as document:
+            assert document.page_count == 5
+            pages = list(document.iter_pages(2, 3))
+
+        assert [page.page_number for page in pages] == [2, 3]
+        assert pages[0].text.strip() == "Quarterly report page 2."
+        assert (pages[0].width, pages[0].height) == (612, 792)
+
+    def test_unknown_engine(self):
+        with pytest.raises(ValueError, match="Unknown extraction engine"):
+            get_extractor("ocr")
+
+    @pytest.mark.parametrize(
+        "expected,actual,similarity",
+        [
+            ("a b c", "c b a", 1.0),
+            ("a b c d", "a b", 0.5),
+            ("", "", 1.0),
+        ],
+    )
+    def test_text_similarity(self, expected, actual, similarity):
+        assert text_similarity(expected, actual) == similarity
+
+
+class TestEngineSelection:
+    def test_explicit_engine_skips_sampling(self, pdf_path):
+        with patch.object(extraction, "select_engine") as select:
+            assert resolve_engine(pdf_path, "pypdf") == "pypdf"
+        select.assert_not_called()
+
+    def test_auto_picks_faster_equivalent_engine(self, pdf_path):
+        timings = {"pdfplumber": 1.0, "pypdf": 0.1}
+        sample = extraction._sample
+
+        def timed(extractor, *args):
+            text, _, pages = sample(extractor, *args)
+            return text, timings[extractor.name], pages
+
+        with patch.object(extraction, "_sample", side_effect=timed):
+            assert select_engine(pdf_path) == "pypdf"
+
+    def test_auto_keeps_reference_when_output_differs(self, pdf_path):
+        sample = extraction._sample
+
+        def degraded(extractor, *args):
+            text, _, pages = sample(extractor, *args)
+            if extractor.name == "pypdf":
+                return "garbled", 0.0, pages
+            return text, 1.0, pages
+
+        with patch.object(extraction, "_sample", side_effect=degraded):
+            assert select_engine(pdf_path) == "pdfplumber"
+
+    def test_sample_page_numbers_are_spread(self):
+        assert extraction._sample_page_numbers(2, 3) == [1, 2]
+        assert extraction._sample_page_numbers(90, 3) == [16, 46, 76]
+
+
+class TestProcessWithEngine:
+    def test_requested_engine_is_recorded(self, test_db, pdf_path):
+        pdf = PDF(
+            title="Engine",
+            filename="doc.pdf",
+            file_path=pdf_path,
+            file_size=1,
+            total_pages=0,
+            requested_engine="pypdf",
+        )
+        test_db.add(pdf)
+        test_db.commit()
+
+        with patch(
+            "app.services.extraction.PdfplumberExtractor.open",
+            side_effect=AssertionError("pdfplumber should not be used"),
+        ):
+            PDFService(test_db).process_pdf(pdf.id)
+
+        test_db.expire_all()
+        parsed = test_db.get(PDF, pdf.id)
+        assert parsed.extraction_engine == "pypdf"
+        assert parsed.processing_status == "completed"
+        assert len(parsed.chunks) == 5
@@ -98,9 +98,9 @@ class TestFinalCoverage:
         """Test PDF chunk repository search_content method."""
         repo = PDFChunkRepository(test_db)
         
-        with patch.object(repo.db, 'query') as mock_query:
+        with patch('app.repositories.pdf_chunk.get_chunk_search') as mock_backend:
             mock_chunks = [Mock()]
-            mock_query.return_value.filter.return_value.order_by.return_value.offset.return_value.limit.return_value.all.return_value = mock_chunks
+            mock_backend.return_value.page.return_value = mock_chunks
             
             result = repo.search_content(1, "test", skip=0, limit=10)
             assert result == mock_chunks
@@ -109,9 +109,9 @@ class TestFinalCoverage:
         """Test PDF chunk repository search_all_content method."""
         repo = PDFChunkRepository(test_db)
         
-        with patch.object(repo.db, 'query') as mock_query:
+        with patch('app.repositories.pdf_chunk.get_chunk_search') as mock_backend:
             mock_chunks = [Mock()]
-            mock_query.return_value.filter.return_value.order_by.return_value.offset.return_value.limit.return_value.all.return_value = mock_chunks
+            mock_backend.return_value.page.return_value = mock_chunks
             
             result = repo.search_all_content("test", skip=0, limit=10)
             assert result == mock_chunks
@@ -132,8 +132,8 @@ class TestFinalCoverage:
         """Test PDF chunk repository count_search_all_content method."""
         repo = PDFChunkRepository(test_db)
         
-        with patch.object(repo.db, 'query') as mock_query:
-            mock_query.return_value.filter.return_value.count.return_value = 5
+        with patch('app.repositories.pdf_chunk.get_chunk_search') as mock_backend:
+            mock_backend.return_value.count.return_value = 5
             
             result = repo.count_search_all_content("test")
             assert result == 5
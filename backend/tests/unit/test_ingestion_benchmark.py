@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+from app.services.extraction import get_extractor
+from benchmarks.ingestion import STAGES, StageClock, compare, run_isolated, run_scenario
+from benchmarks.synthetic import build_synthetic_pdf
+
+
+class TestSyntheticCorpus:
+    def test_generation_is_deterministic(self):
+        assert build_synthetic_pdf(3, 50, "single", seed=1) == build_synthetic_pdf(3, 50, "single", seed=1)
+        assert build_synthetic_pdf(3, 50, "single", seed=1) != build_synthetic_pdf(3, 50, "single", seed=2)
+
+    @pytest.mark.parametrize("layout", ["single", "two_column", "scattered"])
+    def test_layouts_are_extractable(self, tmp_path, layout):
+        path = tmp_path / "doc.pdf"
+        path.write_bytes(build_synthetic_pdf(2, 60, layout))
+
+        with get_extractor("pypdf").open(str(path)) as document:
+            pages = list(document.iter_pages())
+
+        assert document.page_count == 2
+        assert all(len(page.text.split()) >= 50 for page in pages)
+
+    def test_unknown_layout(self):
+        with pytest.raises(ValueError, match="Unknown layout"):
+            build_synthetic_pdf(1, layout="diagonal")
+
+
+class TestStageClock:
+    def test_nested_stages_are_exclusive(self):
+        clock = StageClock()
+        with clock.stage("insert"):
+            for _ in clock.iterate("chunk", range(3)):
+                time.sleep(0.01)
+            time.sleep(0.01)
+
+        assert clock.totals["chunk"] < 0.01
+        assert clock.totals["insert"] >= 0.04
+
+
+class TestIngestionBenchmark:
+    def test_run_scenario_reports_throughput_and_stages(self):
+        result = run_scenario(documents=1, pages=3, words_per_page=120, layout="single", engine="pypdf")
+
+        assert result["pages"] == 3
+        assert result["chunks"] > 0
+        assert result["pages_per_sec"] > 0
+        assert result["peak_rss_bytes"] > 0
+        assert set(result["stages"]) == set(STAGES) | {"other"}
+        assert result["stages"]["extract"] > 0
+
+    def test_isolated_run_with_the_sandbox(self, monkeypatch):
+        # The scenario process imports the app afresh and starts sandbox children
+        monkeypatch.setenv("PDF_SANDBOX", "true")
+        result = run_isolated(documents=1, pages=2, words_per_page=50, layout="single")
+
+        assert (result["pages"], result["chunks"]) == (2, 2)
+
+    def test_compare_reports_change(self):
+        baseline = {"scenarios": [{"name": "a", "pages_per_sec": 10.0}]}
+        current = {"scenarios": [{"name": "a", "pages_per_sec": 12.0}, {"name": "b", "pages_per_sec": 1.0}]}
+
+        assert compare(current, baseline) == ["a: 10.0 -> 12.0 pages/sec (+20.0%)"]
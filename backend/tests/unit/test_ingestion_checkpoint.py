@@ -0,0 +1,106 @@
+import pytest
+from unittest.mock import patch
+from app.models.pdf import PDF
+from app.models.pdf_chunk import PDFChunk
+from app.repositories.ingestion_job import IngestionJobRepository
+from app.services.ingestion_queue import IngestionQueue
+from app.services.pdf_service import PDFService
+
+
+@pytest.fixture
+def five_page_pdf(test_db, tmp_path, pdf_builder):
+    def _create(status="pending", last_completed_page=0):
+        path = tmp_path / "five.pdf"
+        path.write_bytes(pdf_builder([f"Page {n} body." for n in range(1, 6)]))
+        pdf = PDF(
+            title="Five",
+            filename="five.pdf",
+            file_path=str(path),
+            file_size=1,
+            total_pages=5,
+            processing_status=status,
+            last_completed_page=last_completed_page,
+        )
+        test_db.add(pdf)
+        test_db.commit()
+        return pdf
+
+    return _create
+
+
+def add_chunk(db, pdf_id, number, page, content):
+    db.add(
+        PDFChunk(
+            pdf_id=pdf_id,
+            chunk_number=number,
+            page_number=page,
+            content=content,
+            word_count=1,
+            character_count=len(content),
+        )
+    )
+    db.commit()
+
+
+class TestIngestionCheckpoint:
+    def test_checkpoint_advances_per_page_batch(self, test_db, five_page_pdf):
+        pdf = five_page_pdf()
+        service = PDFService(test_db)
+        checkpoints = []
+        update_checkpoint = service.pdf_repo.update_checkpoint
+
+        def record(pdf_id, page):
+            checkpoints.append(page)
+            update_checkpoint(pdf_id, page)
+
+        with patch("app.services.pdf_service.INGEST_CHECKPOINT_PAGES", 2), patch.object(
+            service.pdf_repo, "update_checkpoint", side_effect=record
+        ):
+            service.process_pdf(pdf.id)
+
+        assert checkpoints == [2, 4, 5]
+        test_db.expire_all()
+        assert test_db.get(PDF, pdf.id).last_completed_page == 5
+        assert service.chunk_repo.count_by_pdf(pdf.id) == 5
+
+    def test_resume_continues_after_checkpoint(self, test_db, five_page_pdf):
+        pdf = five_page_pdf(status="processing", last_completed_page=2)
+        add_chunk(test_db, pdf.id, 1, 1, "kept page one")
+        add_chunk(test_db, pdf.id, 2, 2, "kept page two")
+        add_chunk(test_db, pdf.id, 3, 3, "uncommitted leftover")
+
+        PDFService(test_db).process_pdf(pdf.id)
+
+        test_db.expire_all()
+        chunks = PDFService(test_db).get_pdf_chunks(pdf.id)
+        assert [(c.chunk_number, c.page_number) for c in chunks] == [
+            (1, 1),
+            (2, 2),
+            (3, 3),
+            (4, 4),
+            (5, 5),
+        ]
+        assert chunks[0].content == "kept page one"
+        assert chunks[2].content == "Page 3 body."
+        assert test_db.get(PDF, pdf.id).processing_status == "completed"
+
+    def test_completed_document_restarts_from_first_page(self, test_db, five_page_pdf):
+        pdf = five_page_pdf(status="completed", last_completed_page=5)
+        add_chunk(test_db, pdf.id, 1, 1, "stale")
+
+        PDFService(test_db).process_pdf(pdf.id)
+
+        chunks = PDFService(test_db).get_pdf_chunks(pdf.id)
+        assert len(chunks) == 5
+        assert chunks[0].content == "Page 1 body."
+
+    def test_recover_requeues_processing_documents(self, test_db, five_page_pdf, session_factory):
+        pdf = five_page_pdf(status="processing", last_completed_page=2)
+
+        IngestionQueue(session_factory=session_factory, workers=0).recover()
+
+        job_repo = IngestionJobRepository(test_db)
+        assert job_repo.has_pending_job(pdf.id)
+
+        IngestionQueue(session_factory=session_factory, workers=0).recover()
+        assert len(job_repo.get_by_pdf(pdf.id)) == 1
@@ -0,0 +1,197 @@
+import os
+from datetime import timedelta
+import pytest
+from unittest.mock import patch
+from app.models.base import utc_now
+from app.models.pdf import PDF
+from app.models.ingestion_job import IngestionJob
+from app.repositories.ingestion_job import IngestionJobRepository
+from app.services.ingestion_queue import IngestionQueue
+
+
+@pytest.fixture
+def stored_pdf(test_db, tmp_path, pdf_builder):
+    def _create(pages, status="pending"):
+        file_path = tmp_path / f"upload-{len(pages)}.pdf"
+        file_path.write_bytes(pdf_builder(pages))
+        pdf = PDF(
+            title="Queued",
+            filename="queued.pdf",
+            file_path=str(file_path),
+            file_size=os.path.getsize(file_path),
+            total_pages=0,
+            processing_status=status,
+        )
+        test_db.add(pdf)
+        test_db.commit()
+        return pdf
+
+    return _create
+
+
+class TestIngestionJobRepository:
+    def test_claim_next_marks_job_running(self, test_db, stored_pdf):
+        pdf = stored_pdf(["Hello"])
+        repo = IngestionJobRepository(test_db)
+        first = repo.enqueue(pdf.id)
+        second = repo.enqueue(pdf.id)
+
+        claimed = repo.claim_next()
+
+        assert claimed.id == first.id
+        assert claimed.status == "running"
+        assert claimed.attempts == 1
+        assert claimed.started_at is not None
+        assert repo.get(second.id).status == "queued"
+
+    def test_claim_next_empty_queue(self, test_db):
+        assert IngestionJobRepository(test_db).claim_next() is None
+
+    def test_requeue_expired_leaves_live_leases(self, test_db, stored_pdf):
+        pdf = stored_pdf(["Hello"])
+        repo = IngestionJobRepository(test_db)
+        job = repo.enqueue(pdf.id)
+        repo.claim_next("other-process")
+
+        assert repo.requeue_expired(lease_seconds=60, max_attempts=3) == (0, [])
+        assert repo.heartbeat("other-process") == 1
+
+        expire_lease(test_db, job.id)
+        assert repo.requeue_expired(lease_seconds=60, max_attempts=3) == (1, [])
+        requeued = repo.get(job.id)
+        assert (requeued.status, requeued.owner) == ("queued", None)
+
+    def test_requeue_expired_fails_after_max_attempts(self, test_db, stored_pdf):
+        pdf = stored_pdf(["Hello"])
+        repo = IngestionJobRepository(test_db)
+        job = repo.enqueue(pdf.id)
+        repo.claim_next("crashing-process")
+        expire_lease(test_db, job.id)
+        assert repo.requeue_expired(lease_seconds=60, max_attempts=2) == (1, [])
+
+        repo.claim_next("crashing-process")
+        expire_lease(test_db, job.id)
+        assert repo.requeue_expired(lease_seconds=60, max_attempts=2) == (0, [pdf.id])
+        assert repo.get(job.id).status == "failed"
+
+
+def expire_lease(db, job_id):
+    db.query(IngestionJob).filter(IngestionJob.id == job_id).update(
+        {"heartbeat_at": utc_now() - timedelta(hours=1)}
+    )
+    db.commit()
+
+
+class TestIngestionQueue:
+    def test_run_pending_parses_document(self, test_db, stored_pdf, session_factory):
+        pdf = stored_pdf(["Apples are red.", "Oranges are orange."])
+        job = IngestionJobRepository(test_db).enqueue(pdf.id)
+
+        queue = IngestionQueue(session_factory=session_factory, workers=0)
+        assert queue.run_pending() == 1
+
+        test_db.expire_all()
+        assert test_db.get(IngestionJob, job.id).status == "completed"
+        parsed = test_db.get(PDF, pdf.id)
+        assert parsed.processing_status == "completed"
+        assert parsed.total_pages == 2
+        assert [chunk.page_number for chunk in parsed.chunks] == [1, 2]
+
+    def test_document_opened_once_and_pages_released(self, test_db, stored_pdf, session_factory):
+        import pdfplumber
+        from pdfplumber.page import Page
+
+        pdf = stored_pdf(["Apples are red.", "Oranges are orange."])
+        IngestionJobRepository(test_db).enqueue(pdf.id)
+        queue = IngestionQueue(session_factory=session_factory, workers=0)
+
+        calls = []
+        extract_text, close = Page.extract_text, Page.close
+
+        def record_extract(page, *args, **kwargs):
+            calls.append(("extract", page.page_number))
+            return extract_text(page, *args, **kwargs)
+
+        def record_close(page):
+            calls.append(("close", page.page_number))
+            return close(page)
+
+        with patch("pdfplumber.open", wraps=pdfplumber.open) as opened, patch.object(
+            Page, "extract_text", record_extract
+        ), patch.object(Page, "close", record_close):
+            queue.run_pending()
+
+        assert opened.call_count == 1
+        assert calls[:4] == [
+            ("extract", 1),
+            ("close", 1),
+            ("extract", 2),
+            ("close", 2),
+        ]
+
+    def test_reparse_replaces_chunks(self, test_db, stored_pdf, session_factory):
+        pdf = stored_pdf(["Apples are red.", "Oranges are orange."])
+        repo = IngestionJobRepository(test_db)
+        queue = IngestionQueue(session_factory=session_factory, workers=0)
+
+        repo.enqueue(pdf.id)
+        queue.run_pending()
+        repo.enqueue(pdf.id)
+        queue.run_pending()
+
+        test_db.expire_all()
+        assert len(test_db.get(PDF, pdf.id).chunks) == 2
+
+    def test_run_pending_records_failure(self, test_db, stored_pdf, session_factory):
+        pdf = stored_pdf(["Broken"])
+        with open(pdf.file_path, "wb") as broken:
+            broken.write(b"%PDF-1.4 not really a pdf")
+        job = IngestionJobRepository(test_db).enqueue(pdf.id)
+
+        queue = IngestionQueue(session_factory=session_factory, workers=0)
+        queue.run_pending()
+
+        test_db.expire_all()
+        failed_job = test_db.get(IngestionJob, job.id)
+        assert failed_job.status == "failed"
+        assert failed_job.error
+        assert test_db.get(PDF, pdf.id).processing_status == "failed"
+
+    def test_recover_gives_up_on_a_document_that_keeps_crashing(
+        self, test_db, stored_pdf, session_factory
+    ):
+        pdf = stored_pdf(["Poison"], status="processing")
+        repo = IngestionJobRepository(test_db)
+        job = repo.enqueue(pdf.id)
+        repo.claim_next("dead-process")
+        expire_lease(test_db, job.id)
+
+        IngestionQueue(session_factory=session_factory, workers=0, max_attempts=1).recover()
+
+        test_db.expire_all()
+        assert test_db.get(IngestionJob, job.id).status == "failed"
+        assert test_db.get(PDF, pdf.id).processing_status == "failed"
+        assert not repo.has_pending_job(pdf.id)
+
+    def test_recover_skips_jobs_owned_by_a_live_process(self, test_db, stored_pdf, session_factory):
+        pdf = stored_pdf(["Busy"], status="processing")
+        repo = IngestionJobRepository(test_db)
+        job = repo.enqueue(pdf.id)
+        repo.claim_next("live-process")
+
+        IngestionQueue(session_factory=session_factory, workers=0).recover()
+
+        test_db.expire_all()
+        assert test_db.get(IngestionJob, job.id).status == "running"
+        assert repo.count_by_status("queued") == 0
+
+    def test_start_and_stop_workers(self, session_factory):
+        queue = IngestionQueue(
+            session_factory=session_factory, workers=1, poll_interval=0.01
+        )
+        with patch.object(queue, "_process_next", return_value=False):
+            queue.start()
+            assert queue.is_running
+            queue.notify()
+            queue.stop()
+        assert not queue.is_running
@@ -0,0 +1,244 @@
+import threading
+import pytest
+from app.repositories import chunk_search
+from app.repositories.chunk_search import InvertedIndexSearch, LikeSearch, get_chunk_search
+from app.repositories.pdf_chunk import PDFChunkRepository
+from app.repositories.inverted_index import (
+    IndexInUseError,
+    InvertedIndex,
+    parse_query,
+    tokenize,
+)
+
+DOCS = [
+    (1, 1, "Quarterly invoice totals for the northern region."),
+    (2, 1, "Invoice invoice: net total due. Café receipts attached."),
+    (3, 2, "Receipt for the net total."),
+    (4, 2, "Total net figures, unrelated."),
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = InvertedIndex(str(tmp_path / "chunks.idx"))
+    for chunk_id, pdf_id, text in DOCS:
+        index.add(chunk_id, pdf_id, text)
+    yield index
+    index.close()
+
+
+def ids(result):
+    return result[0]
+
+
+class TestQueries:
+    def test_parse_query(self):
+        assert parse_query('invoice "net total" OR e-mail') == [
+            [("invoice",), ("net", "total")],
+            [("e", "mail")],
+        ]
+        assert parse_query("?! OR") == []
+        assert tokenize("Café NET") == ["cafe", "net"]
+
+    @pytest.mark.parametrize("merged", [False, True])
+    def test_term_and_or_phrase(self, index, merged):
+        if merged:
+            index.merge()
+
+        assert ids(index.search("invoice")) == [2, 1]
+        assert set(ids(index.search("net total"))) == {2, 3, 4}
+        assert set(ids(index.search('"net total"'))) == {2, 3}
+        assert set(ids(index.search("invoice OR receipt"))) == {1, 2, 3}
+        assert ids(index.search("cafe receipts")) == [2]
+        assert index.count("total", pdf_id=2) == 2
+        assert ids(index.search("missing")) == []
+
+    def test_pagination_and_total(self, index):
+        page, total = index.search("total", skip=1, limit=2)
+        assert total == 3
+        assert page == ids(index.search("total"))[1:3]
+
+
+class TestPersistence:
+    def test_reopen_reads_mapped_file(self, index, tmp_path):
+        index.close()
+        reopened = InvertedIndex(index.path)
+        try:
+            assert reopened.pending_changes == 0
+            assert reopened.fingerprint() == (4, 4, 10)
+            assert set(ids(reopened.search('"net total"'))) == {2, 3}
+        finally:
+            reopened.close()
+
+    def test_postings_use_narrow_delta_arrays(self, tmp_path):
+        index = InvertedIndex(str(tmp_path / "wide.idx"))
+        index.rebuild([(1_000_000 + i, 1, "common") for i in range(0, 3000, 3)])
+        _, docs, positions, codes = index._base.terms["common"]
+        # Only the first id needs 32 bits, so its array does; tfs and positions fit in bytes
+        assert (docs, positions, codes) == (1000, 1000, "IBB")
+        assert index.count("common") == 1000
+        index.close()
+
+    def test_incremental_updates_and_merge(self, index):
+        index.merge()
+        index.add(5, 3, "fresh invoice")
+        index.remove([1])
+        index.add(2, 1, "rewritten without the word")
+
+        assert ids(index.search("invoice")) == [5]
+        assert index.doc_count == 4
+
+        index.remove_pdf(2)
+        assert index.count("total") == 0
+        index.merge()
+        assert index.fingerprint() == (2, 5, 7)
+        assert ids(index.search("invoice")) == [5]
+
+    def test_merges_automatically_at_threshold(self, tmp_path):
+        index = InvertedIndex(str(tmp_path / "auto.idx"), merge_threshold=3)
+        for chunk_id in range(1, 4):
+            index.add(chunk_id, 1, "word")
+        index.wait_for_merge()
+        assert index.pending_changes == 0
+        assert index._base.doc_count == 3
+        index.close()
+
+    def test_merge_runs_beside_queries_and_writes(self, tmp_path, monkeypatch):
+        writing, release = threading.Event(), threading.Event()
+        write = InvertedIndex._write
+
+        def slow_write(f, base, layers):
+            writing.set()
+            assert release.wait(5)
+            write(f, base, layers)
+
+        monkeypatch.setattr(InvertedIndex, "_write", staticmethod(slow_write))
+        index = InvertedIndex(str(tmp_path / "bg.idx"), merge_threshold=3)
+        index.add(1, 1, "old invoice")
+        index.add(2, 1, "invoice")
+        index.add(3, 1, "receipt")
+        assert writing.wait(5)
+
+        # The merge is writing its file: the index stays readable and writable
+        index.add(4, 2, "new invoice")
+        index.remove([1])
+        assert ids(index.search("invoice")) == [2, 4]
+        assert index.fingerprint() == (3, 4, 9)
+
+        release.set()
+        index.wait_for_merge()
+        assert (index._base.doc_count, index.pending_changes) == (3, 2)
+        assert ids(index.search("invoice")) == [2, 4]
+        assert ids(index.search("old")) == []
+        index.close()
+
+        reopened = InvertedIndex(index.path)
+        assert reopened.fingerprint() == (3, 4, 9)
+        reopened.close()
+
+    def test_failed_merge_keeps_changes(self, tmp_path, monkeypatch):
+        index = InvertedIndex(str(tmp_path / "retry.idx"))
+        index.add(1, 1, "kept")
+
+        def fail(f, base, layers):
+            raise OSError("disk full")
+
+        with monkeypatch.context() as patch:
+            patch.setattr(InvertedIndex, "_write", staticmethod(fail))
+            with pytest.raises(OSError):
+                index.merge()
+        assert ids(index.search("kept")) == [1]
+
+        index.add(2, 1, "kept")
+        index.merge()
+        assert (index._base.doc_count, index.pending_changes) == (2, 0)
+        index.close()
+
+    def test_single_writer_per_file(self, index):
+        with pytest.raises(IndexInUseError):
+            InvertedIndex(index.path)
+        index.close()
+        InvertedIndex(index.path).close()
+
+
+@pytest.fixture
+def indexed_repo(test_db, tmp_path, monkeypatch):
+    engine = test_db.get_bind()
+    backend = InvertedIndexSearch.open(engine, str(tmp_path / "repo.idx"), LikeSearch())
+    monkeypatch.setitem(chunk_search._backends, id(engine), backend)
+    yield PDFChunkRepository(test_db)
+    backend.close()
+
+
+class TestRepositoryIntegration:
+    def test_writes_apply_on_commit_only(self, test_db, indexed_repo, make_pdf, chunk_rows):
+        pdf = make_pdf(test_db)
+
+        indexed_repo.bulk_create(chunk_rows(pdf.id, "uncommitted invoice"), commit=False)
+        assert indexed_repo.count_search_all_content("invoice") == 0
+        test_db.rollback()
+        assert indexed_repo.count_search_all_content("invoice") == 0
+
+        indexed_repo.bulk_create(chunk_rows(pdf.id, "first invoice", "second invoice invoice"))
+        results = indexed_repo.search_content(pdf.id, "invoice")
+        assert [c.content for c in results] == ["second invoice invoice", "first invoice"]
+
+        indexed_repo.delete_by_pdf(pdf.id)
+        assert indexed_repo.search_all_content("invoice") == []
+
+    def test_delete_after_page_and_rebuild_on_open(
+        self, test_db, indexed_repo, tmp_path, make_pdf, chunk_rows
+    ):
+        pdf = make_pdf(test_db)
+        indexed_repo.bulk_create(chunk_rows(pdf.id, "kept page"))
+        indexed_repo.bulk_create(
+            [{"pdf_id": pdf.id, "chunk_number": 2, "page_number": 2, "content": "dropped page"}]
+        )
+        indexed_repo.delete_after_page(pdf.id, 1)
+        assert [c.content for c in indexed_repo.search_all_content("page")] == ["kept page"]
+
+        # A fresh index file is behind the database and gets rebuilt
+        engine = test_db.get_bind()
+        reopened = InvertedIndexSearch.open(engine, str(tmp_path / "other.idx"), LikeSearch())
+        assert reopened.count(test_db, "kept") == 1
+        assert reopened.count(test_db, "dropped") == 0
+        reopened.close()
+
+    def test_search_page_uses_index_hit_count(self, test_db, indexed_repo, make_pdf, chunk_rows):
+        pdf = make_pdf(test_db)
+        indexed_repo.bulk_create(chunk_rows(pdf.id, "one invoice", "two invoice", "three invoice"))
+
+        page = indexed_repo.search_page("invoice", limit=2)
+        assert (len(page.items), page.total, page.total_is_exact) == (2, 3, True)
+        assert indexed_repo.search_page("invoice", limit=2, max_count=2)[1:] == (2, False)
+
+    def test_concurrent_first_use_opens_one_index(self, test_db, tmp_path, monkeypatch):
+        monkeypatch.setattr(chunk_search, "SEARCH_BACKEND", "inverted")
+        monkeypatch.setattr(chunk_search, "INVERTED_INDEX_PATH", str(tmp_path / "shared.idx"))
+        monkeypatch.setattr(chunk_search, "_backends", {})
+        start = threading.Barrier(4)
+        backends, errors = [], []
+
+        def first_use():
+            start.wait()
+            try:
+                backends.append(get_chunk_search(test_db))
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=first_use) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        try:
+            assert errors == []
+            assert len(backends) == 4 and all(b is backends[0] for b in backends)
+        finally:
+            chunk_search.close_chunk_search()
+
+    def test_punctuation_falls_back_to_substring(self, test_db, indexed_repo, make_pdf, chunk_rows):
+        pdf = make_pdf(test_db)
+        indexed_repo.bulk_create(chunk_rows(pdf.id, "a: b"))
+        assert indexed_repo.count_search_content(":", pdf.id) == 1
+        assert len(indexed_repo.search_content(pdf.id, ":")) == 1
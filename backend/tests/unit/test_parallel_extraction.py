@@ -0,0 +1,70 @@
+import pytest
+from unittest.mock import patch
+from app.services.parallel_extraction import (
+    extract_page_range,
+    extract_pages_parallel,
+    shutdown_process_pool,
+    should_parallelize,
+    split_page_ranges,
+)
+from app.services.pdf_service import PDFService
+
+
+class TestPageRanges:
+    @pytest.mark.parametrize(
+        "total_pages,workers,min_pages,expected",
+        [
+            (0, 4, 10, []),
+            (5, 4, 10, [(1, 5)]),
+            (40, 2, 10, [(1, 10), (11, 20), (21, 30), (31, 40)]),
+            (45, 2, 20, [(1, 20), (21, 40), (41, 45)]),
+        ],
+    )
+    def test_split_page_ranges(self, total_pages, workers, min_pages, expected):
+        assert split_page_ranges(total_pages, workers, min_pages) == expected
+
+    @pytest.mark.parametrize(
+        "total_pages,workers,min_pages,expected",
+        [
+            (100, 1, 10, False),
+            (19, 4, 10, False),
+            (20, 4, 10, True),
+        ],
+    )
+    def test_should_parallelize(self, total_pages, workers, min_pages, expected):
+        assert should_parallelize(total_pages, workers, min_pages) is expected
+
+
+class TestParallelExtraction:
+    def test_extract_page_range(self, tmp_path, pdf_builder):
+        path = tmp_path / "doc.pdf"
+        path.write_bytes(pdf_builder(["one", "two", "three"]))
+
+        pages = extract_page_range(str(path), 2, 3)
+
+        assert [page.page_number for page in pages] == [2, 3]
+        assert pages[0].text == "two"
+
+    def test_parallel_matches_serial_order(self, test_db, tmp_path, pdf_builder):
+        texts = [f"Page number {n} text." for n in range(1, 7)]
+        path = tmp_path / "doc.pdf"
+        path.write_bytes(pdf_builder(texts))
+
+        try:
+            pages = list(extract_pages_parallel(str(path), 6, workers=2, min_pages_per_task=1))
+        finally:
+            shutdown_process_pool()
+
+        assert [page.page_number for page in pages] == list(range(1, 7))
+        assert [page.text for page in pages] == texts
+
+        service = PDFService(test_db)
+        with patch(
+            "app.services.pdf_service.should_parallelize", return_value=True
+        ), patch(
+            "app.services.pdf_service.extract_pages_parallel", return_value=iter(pages)
+        ):
+            chunks = service._parse_pdf_to_chunks(str(path), 1)
+
+        assert [chunk["chunk_number"] for chunk in chunks] == list(range(1, 7))
+        assert [chunk["page_number"] for chunk in chunks] == list(range(1, 7))
@@ -0,0 +1,61 @@
+import pytest
+from unittest.mock import patch
+from app.models.pdf_chunk import PDFChunk
+from app.repositories.pdf_chunk import PDFChunkRepository
+
+
+@pytest.fixture
+def pdf(test_db, make_pdf):
+    return make_pdf(test_db, "chunks")
+
+
+def streamed_rows(pdf_id, count):
+    for number in range(1, count + 1):
+        yield {
+            "pdf_id": pdf_id,
+            "chunk_number": number,
+            "page_number": 1,
+            "content": f"chunk {number}",
+            "content_type": "text",
+            "word_count": 2,
+            "character_count": len(f"chunk {number}"),
+            "chunk_metadata": {"chunk_index_in_page": number - 1},
+        }
+
+
+class TestBulkCreate:
+    def test_streams_generator_in_batches(self, test_db, pdf):
+        repo = PDFChunkRepository(test_db)
+
+        with patch.object(test_db, "execute", wraps=test_db.execute) as execute, patch.object(
+            test_db, "refresh"
+        ) as refresh:
+            inserted = repo.bulk_create(streamed_rows(pdf.id, 7), batch_size=3)
+
+        assert inserted == 7
+        batches = [call.args[1] for call in execute.call_args_list if len(call.args) > 1]
+        assert [len(batch) for batch in batches] == [3, 3, 1]
+        refresh.assert_not_called()
+
+        chunks = repo.get_by_pdf(pdf.id)
+        assert [chunk.chunk_number for chunk in chunks] == list(range(1, 8))
+        assert chunks[0].created_at is not None
+        assert chunks[0].chunk_metadata == {"chunk_index_in_page": 0}
+
+    def test_return_ids(self, test_db, pdf):
+        repo = PDFChunkRepository(test_db)
+
+        ids = repo.bulk_create(streamed_rows(pdf.id, 5), batch_size=2, return_ids=True)
+
+        assert len(ids) == 5
+        for chunk_number, chunk_id in enumerate(ids, 1):
+            assert test_db.get(PDFChunk, chunk_id).chunk_number == chunk_number
+
+    def test_without_commit_can_be_rolled_back(self, test_db, pdf):
+        repo = PDFChunkRepository(test_db)
+
+        repo.delete_by_pdf(pdf.id, commit=False)
+        repo.bulk_create(streamed_rows(pdf.id, 2), commit=False)
+        test_db.rollback()
+
+        assert repo.count_by_pdf(pdf.id) == 0
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import pytest
+from unittest.mock import patch
+from app.models.pdf import PDF
+from app.routers.event_stream import format_event, progress_events
+from app.services.pdf_service import PDFService
+from app.services.progress import ProgressBroker, progress_broker
+
+
+async def drain(subscription):
+    events = []
+    while True:
+        event = await subscription.get(timeout=0.05)
+        if event is None:
+            return events
+        events.append(event)
+
+
+class TestProgressBroker:
+    @pytest.mark.asyncio
+    async def test_publish_from_worker_thread(self):
+        broker = ProgressBroker()
+        with broker.subscribe(7) as subscription:
+            thread = threading.Thread(target=broker.publish, args=(7, {"status": "processing"}))
+            thread.start()
+            thread.join()
+            broker.publish(8, {"status": "ignored"})
+
+            assert await drain(subscription) == [{"status": "processing"}]
+
+        assert broker.subscriber_count(7) == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_subscriber_drops_oldest_events(self):
+        broker = ProgressBroker(queue_size=2)
+        with broker.subscribe(1) as subscription:
+            for page in range(4):
+                broker.publish(1, {"page": page})
+
+            assert await drain(subscription) == [{"page": 2}, {"page": 3}]
+
+
+class TestProgressEvents:
+    @pytest.mark.asyncio
+    async def test_terminal_snapshot_closes_stream(self):
+        broker = ProgressBroker()
+        subscription = broker.subscribe(1)
+
+        async def connected():
+            return False
+
+        events = [e async for e in progress_events(subscription, {"status": "completed"}, connected)]
+
+        assert events == [format_event({"status": "completed"})]
+        assert broker.subscriber_count(1) == 0
+
+    @pytest.mark.asyncio
+    async def test_relays_until_terminal_event_with_heartbeats(self):
+        broker = ProgressBroker()
+        subscription = broker.subscribe(1)
+
+        async def connected():
+            return False
+
+        stream = progress_events(subscription, {"status": "pending"}, connected, heartbeat=0.01)
+        assert await stream.__anext__() == format_event({"status": "pending"})
+        assert await stream.__anext__() == ": keep-alive\n\n"
+
+        broker.publish(1, {"status": "processing", "pages_parsed": 2})
+        broker.publish(1, {"status": "completed"})
+        rest = [e async for e in stream]
+
+        assert rest == [
+            format_event({"status": "processing", "pages_parsed": 2}),
+            format_event({"status": "completed"}),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_stops_when_client_disconnects(self):
+        broker = ProgressBroker()
+        subscription = broker.subscribe(1)
+
+        async def disconnected():
+            return True
+
+        events = [e async for e in progress_events(subscription, {"status": "processing"}, disconnected, heartbeat=0.01)]
+
+        assert len(events) == 1
+        assert broker.subscriber_count(1) == 0
+
+
+class TestIngestionProgress:
+    @pytest.mark.asyncio
+    async def test_process_pdf_publishes_pages_and_final_status(self, test_db, tmp_path, pdf_builder):
+        path = tmp_path / "three.pdf"
+        path.write_bytes(pdf_builder(["One.", "Two.", "Three."]))
+        pdf = PDF(title="t", filename="t.pdf", file_path=str(path), file_size=1, total_pages=0)
+        test_db.add(pdf)
+        test_db.commit()
+
+        with progress_broker.subscribe(pdf.id) as subscription:
+            with patch("app.services.pdf_service.INGEST_CHECKPOINT_PAGES", 2):
+                PDFService(test_db).process_pdf(pdf.id)
+            events = await drain(subscription)
+
+        assert [(e["status"], e["pages_parsed"], e["chunks_written"]) for e in events] == [
+            ("processing", 0, 0),
+            ("processing", 2, 2),
+            ("processing", 3, 3),
+            ("completed", 3, 3),
+        ]
+        assert events[-1]["total_pages"] == 3
+
+    def test_get_progress_snapshot(self, test_db):
+        pdf = PDF(title="t", filename="t.pdf", file_path="/x", file_size=1, total_pages=4,
+                  processing_status="processing", last_completed_page=2)
+        test_db.add(pdf)
+        test_db.commit()
+
+        snapshot = PDFService(test_db).get_progress(pdf.id)
+
+        assert snapshot["status"] == "processing"
+        assert snapshot["pages_parsed"] == 2
+        assert snapshot["chunks_written"] == 0
+        assert PDFService(test_db).get_progress(999) is None
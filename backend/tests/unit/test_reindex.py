@@ -0,0 +1,134 @@
+import io
+import json
+import time
+import pytest
+from unittest.mock import patch
+from app.models.pdf import PDF
+from app.models.pdf_chunk import PDFChunk
+from app.reindex import BulkReindexer, RateLimiter, ReindexState
+from app.services.pdf_service import PDFService
+
+
+@pytest.fixture
+def stored_pdf(test_db, tmp_path, pdf_builder):
+    def _create(pages, status="completed", old_chunks=("stale text",)):
+        path = tmp_path / f"doc-{len(pages)}-{status}.pdf"
+        path.write_bytes(pdf_builder(pages))
+        pdf = PDF(
+            title="Doc",
+            filename="doc.pdf",
+            file_path=str(path),
+            file_size=1,
+            total_pages=len(pages),
+            processing_status=status,
+        )
+        test_db.add(pdf)
+        test_db.commit()
+        for number, content in enumerate(old_chunks, 1):
+            test_db.add(PDFChunk(pdf_id=pdf.id, chunk_number=number, page_number=1,
+                                 content=content, word_count=2, character_count=len(content)))
+        test_db.commit()
+        return pdf
+
+    return _create
+
+
+def contents(db, pdf_id):
+    return [c.content for c in db.query(PDFChunk).filter_by(pdf_id=pdf_id).order_by(PDFChunk.chunk_number)]
+
+
+class TestReindexPdf:
+    def test_swaps_chunk_set(self, test_db, stored_pdf):
+        pdf = stored_pdf(["Fresh apples.", "Fresh pears."], status="failed")
+
+        count = PDFService(test_db).reindex_pdf(pdf.id, engine="pypdf")
+
+        test_db.refresh(pdf)
+        assert count == 2
+        assert contents(test_db, pdf.id) == ["Fresh apples.", "Fresh pears."]
+        assert pdf.processing_status == "completed"
+        assert pdf.extraction_engine == "pypdf"
+        assert pdf.last_completed_page == 2
+
+    def test_failure_keeps_old_chunks(self, test_db, stored_pdf):
+        pdf = stored_pdf(["Fresh apples."])
+        service = PDFService(test_db)
+
+        with patch.object(service.chunk_repo, "bulk_create", side_effect=RuntimeError("disk full")):
+            with pytest.raises(RuntimeError):
+                service.reindex_pdf(pdf.id)
+
+        assert contents(test_db, pdf.id) == ["stale text"]
+
+    def test_missing_file(self, test_db, stored_pdf):
+        pdf = stored_pdf(["x"])
+        pdf.file_path = "/nonexistent.pdf"
+        test_db.commit()
+
+        with pytest.raises(FileNotFoundError):
+            PDFService(test_db).reindex_pdf(pdf.id)
+
+
+class TestBulkReindexer:
+    def test_selects_by_status_and_id_range(self, test_db, session_factory, stored_pdf):
+        done = stored_pdf(["a"])
+        failed = stored_pdf(["b"], status="failed")
+        stored_pdf(["c"], status="pending")
+        reindexer = BulkReindexer(session_factory)
+
+        assert reindexer.select() == [done.id, failed.id]
+        assert reindexer.select(statuses=["failed"]) == [failed.id]
+        assert reindexer.select(min_id=failed.id, statuses=["pending", "completed", "failed"]) == [failed.id]
+
+    def test_run_is_resumable(self, test_db, session_factory, stored_pdf, tmp_path):
+        first = stored_pdf(["First document."])
+        second = stored_pdf(["Second.", "Document."])
+        state_file = str(tmp_path / "state.json")
+        output = io.StringIO()
+
+        reindexer = BulkReindexer(session_factory, workers=1, state=ReindexState(state_file), output=output)
+        summary = reindexer.run(reindexer.select())
+
+        assert summary["selected"] == 2
+        assert summary["succeeded"] == 2
+        assert json.load(open(state_file))["done"] == [first.id, second.id]
+        assert "[2/2]" in output.getvalue() and "ETA" in output.getvalue()
+        assert contents(test_db, second.id) == ["Second.", "Document."]
+
+        resumed = BulkReindexer(session_factory, state=ReindexState(state_file))
+        assert resumed.select() == []
+
+    def test_failures_are_recorded(self, test_db, session_factory, stored_pdf):
+        pdf = stored_pdf(["x"])
+        pdf.file_path = "/nonexistent.pdf"
+        test_db.commit()
+        state = ReindexState(None)
+
+        summary = BulkReindexer(session_factory, workers=1, state=state, output=io.StringIO()).run([pdf.id])
+
+        assert summary["failed"] == {pdf.id: "Original file is no longer available"}
+        assert contents(test_db, pdf.id) == ["stale text"]
+
+    def test_skips_documents_taken_by_ingestion(self, test_db, session_factory, stored_pdf):
+        pdf = stored_pdf(["x"], status="processing")
+        state = ReindexState(None)
+
+        BulkReindexer(session_factory, workers=1, state=state, output=io.StringIO()).run([pdf.id])
+
+        assert pdf.id not in state.done and pdf.id not in state.failed
+        assert contents(test_db, pdf.id) == ["stale text"]
+
+
+class TestRateLimiter:
+    def test_spaces_calls(self):
+        limiter = RateLimiter(rate=50)
+        start = time.monotonic()
+        for _ in range(4):
+            limiter.wait()
+        assert time.monotonic() - start >= 0.06
+
+    def test_unlimited(self):
+        limiter = RateLimiter(None)
+        start = time.monotonic()
+        limiter.wait()
+        assert time.monotonic() - start < 0.01
@@ -0,0 +1,156 @@
+import os
+import signal
+import time
+from contextlib import contextmanager
+import pytest
+from unittest.mock import patch
+from app.models.pdf import PDF
+from app.services.extraction import EXTRACTORS, REFERENCE_ENGINE, PypdfExtractor
+from app.services.pdf_service import PDFService
+from app.services.sandbox import (
+    ExtractionTimeout,
+    SandboxedExtractor,
+    describe_skipped_pages,
+    select_engine_sandboxed,
+)
+
+
+class PathologicalExtractor(PypdfExtractor):
+    """pypdf with scripted misbehaviour per page. Runs in the sandbox child."""
+
+    def __init__(self, behaviours):
+        self.behaviours = behaviours
+
+    @contextmanager
+    def open(self, file_path):
+        with super().open(file_path) as document:
+            yield PathologicalDocument(document, self.behaviours)
+
+
+class PathologicalDocument:
+    def __init__(self, document, behaviours):
+        self.document = document
+        self.behaviours = behaviours
+        self.metadata = document.metadata
+        self.page_count = document.page_count
+
+    def iter_pages(self, first_page=1, last_page=None):
+        for page in self.document.iter_pages(first_page, last_page):
+            behaviour = self.behaviours.get(page.page_number)
+            if behaviour == "hang":
+                time.sleep(60)
+            elif behaviour == "oom":
+                bytearray(8 * 1024 ** 3)
+            elif behaviour == "raise":
+                raise ValueError("broken content stream")
+            elif behaviour == "crash":
+                os.kill(os.getpid(), signal.SIGKILL)
+            yield page
+
+
+@pytest.fixture
+def five_pages(tmp_path, pdf_builder):
+    path = tmp_path / "five.pdf"
+    path.write_bytes(pdf_builder([f"Page {n} text." for n in range(1, 6)]))
+    return str(path)
+
+
+class TestSandboxedExtractor:
+    def test_extracts_like_the_wrapped_engine(self, five_pages):
+        sandbox = SandboxedExtractor(PypdfExtractor(), page_timeout=20)
+
+        with sandbox.open(five_pages) as document:
+            pages = list(document.iter_pages(2))
+
+        assert document.page_count == 5
+        assert [page.page_number for page in pages] == [2, 3, 4, 5]
+        assert "Page 2 text." in pages[0].text
+        assert document.skipped_pages == []
+
+    def test_bad_pages_are_skipped_not_fatal(self, five_pages):
+        extractor = PathologicalExtractor({2: "hang", 3: "oom", 4: "raise", 5: "crash"})
+        sandbox = SandboxedExtractor(extractor, page_timeout=3, memory_limit_mb=1024)
+
+        with sandbox.open(five_pages) as document:
+            pages = list(document.iter_pages())
+
+        assert [page.page_number for page in pages] == [1]
+        reasons = dict(document.skipped_pages)
+        assert reasons[2] == "timed out after 3s"
+        assert reasons[3] == "memory limit exceeded"
+        assert reasons[4] == "ValueError: broken content stream"
+        assert reasons[5] == "worker killed by signal 9"
+
+    def test_document_deadline_fails_extraction(self, five_pages):
+        sandbox = SandboxedExtractor(PathologicalExtractor({1: "hang"}), timeout=4, page_timeout=30)
+
+        with sandbox.open(five_pages) as document:
+            with pytest.raises(ExtractionTimeout, match="exceeded 4 seconds"):
+                list(document.iter_pages())
+
+    def test_open_errors_are_reported(self, tmp_path):
+        path = tmp_path / "bad.pdf"
+        path.write_bytes(b"%PDF-1.4 not really")
+
+        with pytest.raises(ValueError):
+            with SandboxedExtractor(PypdfExtractor()).open(str(path)):
+                pass
+
+
+class TestSkippedPagesInIngestion:
+    def test_describe_skipped_pages(self):
+        assert describe_skipped_pages([]) is None
+        assert describe_skipped_pages([(4, "x"), (2, "y")], limit=1) == "Skipped pages: 2 (y), and 1 more"
+
+    def test_process_pdf_records_skipped_pages(self, test_db, five_pages):
+        pdf = PDF(title="t", filename="t.pdf", file_path=five_pages, file_size=1, total_pages=0)
+        test_db.add(pdf)
+        test_db.commit()
+
+        extractor = PathologicalExtractor({3: "raise"})
+        with patch("app.services.pdf_service.PDF_SANDBOX", True), patch(
+            "app.services.pdf_service.get_extractor", return_value=extractor
+        ):
+            PDFService(test_db).process_pdf(pdf.id)
+
+        test_db.refresh(pdf)
+        assert pdf.processing_status == "completed"
+        assert pdf.processing_error == "Skipped pages: 3 (ValueError: broken content stream)"
+        assert sorted(c.page_number for c in pdf.chunks) == [1, 2, 4, 5]
+
+
+class TestSandboxedEngineSelection:
+    def test_picks_an_engine_in_the_child(self, five_pages):
+        assert select_engine_sandboxed(five_pages, timeout=20) in EXTRACTORS
+
+    @pytest.mark.parametrize("behaviour", ["hang", "oom", "crash"])
+    def test_pathological_sampling_falls_back_to_reference(self, five_pages, behaviour):
+        extractors = {REFERENCE_ENGINE: PathologicalExtractor({1: behaviour})}
+        start = time.monotonic()
+
+        engine = select_engine_sandboxed(
+            five_pages, timeout=3, memory_limit_mb=1024, extractors=extractors
+        )
+
+        assert engine == REFERENCE_ENGINE
+        assert time.monotonic() - start < 10
+
+    def test_unreadable_file_is_an_error(self, tmp_path):
+        path = tmp_path / "broken.pdf"
+        path.write_bytes(b"%PDF-1.4 not really a pdf")
+        with pytest.raises(ValueError):
+            select_engine_sandboxed(str(path), timeout=20)
+
+    def test_process_pdf_samples_in_the_sandbox(self, test_db, five_pages):
+        pdf = PDF(title="t", filename="t.pdf", file_path=five_pages, file_size=1,
+                  total_pages=0, requested_engine="auto")
+        test_db.add(pdf)
+        test_db.commit()
+
+        with patch("app.services.pdf_service.PDF_SANDBOX", True), patch(
+            "app.services.pdf_service.select_engine_sandboxed", return_value="pypdf"
+        ) as sandboxed:
+            PDFService(test_db).process_pdf(pdf.id)
+
+        sandboxed.assert_called_once_with(five_pages)
+        assert pdf.extraction_engine == "pypdf"
@@ -0,0 +1,189 @@
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+from app.repositories import chunk_search
+from app.repositories import search_cache as search_cache_module
+from app.repositories.chunk_search import LikeSearch, SQLiteFTSSearch
+from app.repositories.pdf_chunk import PDFChunkRepository
+from app.repositories.search_cache import ENTRY_OVERHEAD_BYTES, SearchCache
+from app.services import pdf_service as pdf_service_module
+from app.services.pdf_service import PDFService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def put(cache, key, size=0, pdf_id=None):
+    cache.put(key, f"value-{key}", size, pdf_id, cache.generation)
+
+
+class TestSearchCache:
+    def test_lru_eviction_by_bytes(self):
+        cache = SearchCache(max_bytes=3 * ENTRY_OVERHEAD_BYTES + 100)
+        for key in "abc":
+            put(cache, key)
+        assert cache.get("a") == "value-a"  # now most recently used
+
+        put(cache, "d", size=100)
+        assert cache.get("b") is None
+        assert [cache.get(k) for k in "acd"] == ["value-a", "value-c", "value-d"]
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        clock = FakeClock()
+        cache = SearchCache(max_bytes=10_000, ttl=60, clock=clock)
+        put(cache, "q")
+        clock.now = 59
+        assert cache.get("q") == "value-q"
+        clock.now = 60
+        assert cache.get("q") is None
+        assert cache.stats()["expirations"] == 1
+        assert cache.stats()["entries"] == 0
+
+    def test_invalidation_drops_scope_and_unscoped_entries(self):
+        cache = SearchCache(max_bytes=10_000)
+        put(cache, "doc1", pdf_id=1)
+        put(cache, "doc2", pdf_id=2)
+        put(cache, "all")
+
+        cache.invalidate([1])
+        assert cache.get("doc1") is None
+        assert cache.get("all") is None
+        assert cache.get("doc2") == "value-doc2"
+        assert cache.stats()["invalidations"] == 2
+
+    def test_put_after_invalidation_is_dropped(self):
+        cache = SearchCache(max_bytes=10_000)
+        generation = cache.generation
+        cache.invalidate([1])
+        cache.put("stale", "value", 0, 1, generation)
+        assert cache.get("stale") is None
+
+    def test_disabled_and_oversized(self):
+        disabled = SearchCache(max_bytes=0)
+        put(disabled, "q")
+        assert disabled.get("q") is None
+
+        small = SearchCache(max_bytes=ENTRY_OVERHEAD_BYTES)
+        put(small, "big", size=1)
+        assert small.stats()["entries"] == 0
+
+    def test_stats(self):
+        cache = SearchCache(max_bytes=10_000)
+        put(cache, "q", size=10)
+        cache.get("q")
+        cache.get("missing")
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+        assert stats["bytes"] == 10 + ENTRY_OVERHEAD_BYTES
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = SearchCache(max_bytes=1024 * 1024)
+    monkeypatch.setattr(pdf_service_module, "search_cache", cache)
+    monkeypatch.setattr(search_cache_module, "search_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def documents(test_db, make_pdf, chunk_rows):
+    pdfs = []
+    for title in ("first", "second"):
+        pdf = make_pdf(test_db, title)
+        PDFChunkRepository(test_db).bulk_create(chunk_rows(pdf.id, f"invoice {title}"))
+        pdfs.append(pdf)
+    return pdfs
+
+
+@contextmanager
+def count_statements(db):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+class TestServiceCaching:
+    def test_repeated_search_skips_the_database(self, test_db, cache, documents):
+        service = PDFService(test_db)
+        first = service.search_with_total("invoice", limit=10)
+        assert first.total == 2
+
+        with count_statements(test_db) as statements:
+            again = service.search_with_total("  invoice ", limit=10)
+        assert again is first
+        assert statements == []
+        assert cache.stats()["hits"] == 1
+
+        # Cached chunks are detached copies: commits cannot expire them
+        test_db.commit()
+        assert [c.content for c in again.items] == ["invoice first", "invoice second"]
+        assert again.items[0].preview == "invoice first"
+
+    @pytest.mark.parametrize("backend", [LikeSearch(), SQLiteFTSSearch(LikeSearch())])
+    def test_equivalent_terms_share_an_entry(self, test_db, cache, documents, monkeypatch, backend):
+        monkeypatch.setitem(chunk_search._backends, id(test_db.get_bind()), backend)
+        service = PDFService(test_db)
+        first = service.search_with_total("invoice  first", limit=10)
+        assert first.total == 1
+
+        with count_statements(test_db) as statements:
+            again = service.search_with_total(" INVOICE\tFirst ", limit=10)
+        assert again is first
+        assert statements == []
+
+    def test_like_keys_fold_ascii_case_only(self):
+        # SQLite's LIKE matches "É" and "é" apart, so they may not share results
+        like = LikeSearch()
+        assert like.cache_key(" Net\n TOTAL ") == "net total"
+        assert like.cache_key("Café") != like.cache_key("CAFÉ")
+
+    def test_fts_keys_fold_like_the_tokenizer(self, test_db, make_pdf, chunk_rows):
+        fts = SQLiteFTSSearch(LikeSearch())
+        assert fts.cache_key("Café") == fts.cache_key("CAFE") == '"cafe"*'
+        # unicode61 does not casefold "ß" to "ss", so the two match different chunks
+        assert fts.cache_key("Straße") != fts.cache_key("Strasse")
+
+        pdf = make_pdf(test_db)
+        PDFChunkRepository(test_db).bulk_create(chunk_rows(pdf.id, "Hauptstraße 1"))
+        assert fts.count(test_db, "HAUPTSTRAßE") == 1
+        assert fts.count(test_db, "Hauptstrasse") == 0
+
+    def test_chunk_writes_invalidate_on_commit(self, test_db, cache, documents):
+        first, second = documents
+        service = PDFService(test_db)
+        repo = PDFChunkRepository(test_db)
+
+        assert service.count_search_results("invoice", first.id) == 1
+        assert service.count_search_results("invoice", second.id) == 1
+        assert service.count_search_results("invoice") == 2
+
+        repo.bulk_create(
+            [{"pdf_id": first.id, "chunk_number": 2, "page_number": 1, "content": "invoice again"}],
+            commit=False,
+        )
+        test_db.rollback()
+        assert cache.stats()["invalidations"] == 0
+
+        repo.bulk_create(
+            [{"pdf_id": first.id, "chunk_number": 2, "page_number": 1, "content": "invoice again"}]
+        )
+        assert cache.stats()["entries"] == 1  # only the second document's count is left
+        assert service.count_search_results("invoice", first.id) == 2
+        assert service.count_search_results("invoice") == 3
+
+        service.delete_pdf(first.id)
+        assert service.count_search_results("invoice") == 1
@@ -0,0 +1,192 @@
+import threading
+import numpy as np
+import pytest
+from fastapi import status
+from app.repositories import semantic_search
+from app.repositories.pdf_chunk import PDFChunkRepository
+from app.repositories.inverted_index import IndexInUseError
+from app.repositories.semantic_search import SemanticSearch, get_semantic_search
+from app.repositories.vector_index import MIN_CAPACITY, HashingVectorizer, VectorIndex
+
+DOCS = [
+    (1, 1, "Invoices are due within thirty days of receipt."),
+    (2, 1, "The quarterly report covers revenue in the northern region."),
+    (3, 2, "Invoicing runs monthly; late invoices accrue interest."),
+    (4, 2, "Meeting notes: the team discussed the holiday schedule."),
+]
+
+vectorizer = HashingVectorizer()
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = VectorIndex(str(tmp_path / "vectors"), vectorizer.dim)
+    index.add(
+        [d[0] for d in DOCS], [d[1] for d in DOCS], vectorizer.transform([d[2] for d in DOCS])
+    )
+    yield index
+    index.close()
+
+
+def search(index, query, limit=10, pdf_id=None):
+    query = vectorizer.transform([query])[0]
+    return [chunk_id for chunk_id, _ in index.search(query, limit, pdf_id)]
+
+
+class TestHashingVectorizer:
+    def test_vectors_are_normalized_and_deterministic(self):
+        vectors = vectorizer.transform(["Net total due", "", "net TOTAL due"])
+        assert vectors.dtype == np.float32
+        assert np.isclose(np.linalg.norm(vectors[0]), 1.0)
+        assert not vectors[1].any()
+        np.testing.assert_array_equal(vectors[0], vectors[2])
+
+    def test_inflections_share_a_stem(self):
+        invoice, invoicing, meeting = vectorizer.transform(["invoices", "invoicing", "meeting"])
+        assert invoice @ invoicing == pytest.approx(0.5)
+        assert invoice @ meeting == 0
+
+
+class TestVectorIndex:
+    def test_ranks_related_chunks_first(self, index):
+        assert search(index, "invoice payment terms")[:2] in ([1, 3], [3, 1])
+        assert search(index, "regional revenue report")[0] == 2
+        assert search(index, "invoices", pdf_id=2) == [3]
+        assert search(index, "xylophone") == []
+
+    def test_limit_keeps_the_best_in_order(self, index):
+        scored = index.search(vectorizer.transform(["the invoices"])[0], limit=1)
+        assert len(scored) == 1
+        full = index.search(vectorizer.transform(["the invoices"])[0], limit=10)
+        assert scored[0] == full[0]
+        assert [s for _, s in full] == sorted((s for _, s in full), reverse=True)
+
+    def test_remove_and_replace(self, index):
+        index.remove([1])
+        index.remove_pdf(2)
+        assert search(index, "invoices") == []
+        assert len(index) == 1
+
+        index.add([2], [1], vectorizer.transform(["invoices paid"]))
+        assert search(index, "invoices") == [2]
+        assert index.fingerprint() == (1, 2, 2)
+
+    def test_persists_and_compacts(self, tmp_path):
+        path = str(tmp_path / "grow")
+        index = VectorIndex(path, vectorizer.dim)
+        total = MIN_CAPACITY + 10
+        ids = list(range(1, total + 1))
+        texts = ["chunk invoices" if n % 100 == 0 else "chunk" for n in ids]
+        for start in range(0, total, 500):
+            batch = slice(start, start + 500)
+            index.add(ids[batch], [1] * len(ids[batch]), vectorizer.transform(texts[batch]))
+        index.remove(range(1, 900))
+        index.close()
+
+        reopened = VectorIndex(path, vectorizer.dim)
+        assert reopened.fingerprint() == (total - 899, total, sum(ids[899:]))
+        assert sorted(search(reopened, "invoices")) == [900, 1000]
+
+        # Past the last slot, removed slots are reclaimed instead of growing the matrix
+        capacity = len(reopened._ids)
+        more = list(range(total + 1, total + capacity - total + 2))
+        reopened.add(more, [1] * len(more), vectorizer.transform(["chunk"] * len(more)))
+        assert len(reopened._ids) == capacity
+        assert sorted(search(reopened, "invoices")) == [900, 1000]
+        assert reopened.fingerprint()[0] == total - 899 + len(more)
+        reopened.close()
+
+    def test_dimension_change_starts_empty(self, index):
+        index.close()
+        other = VectorIndex(index.path, vectorizer.dim // 2)
+        assert other.fingerprint() == (0, 0, 0)
+        other.close()
+
+    def test_single_writer_per_file(self, index):
+        with pytest.raises(IndexInUseError):
+            VectorIndex(index.path, vectorizer.dim)
+        assert index.fingerprint() == (4, 4, 10)
+
+
+@pytest.fixture
+def semantic(test_db, tmp_path, monkeypatch):
+    engine = test_db.get_bind()
+    search = SemanticSearch.open(engine, str(tmp_path / "vectors"))
+    monkeypatch.setattr(semantic_search, "SEMANTIC_SEARCH", True)
+    monkeypatch.setitem(semantic_search._indexes, id(engine), search)
+    yield search
+    search.close()
+
+
+class TestSemanticSearch:
+    def test_ingested_chunks_are_indexed_on_commit(self, test_db, semantic, make_pdf, chunk_rows):
+        pdf = make_pdf(test_db)
+        repo = PDFChunkRepository(test_db)
+
+        repo.bulk_create(chunk_rows(pdf.id, "uncommitted invoices"), commit=False)
+        test_db.rollback()
+        assert semantic.search(test_db, "invoices") == []
+
+        repo.bulk_create(chunk_rows(pdf.id, *[d[2] for d in DOCS]))
+        hits = semantic.search(test_db, "invoicing", limit=2)
+        assert {chunk.content for chunk, _ in hits} == {DOCS[0][2], DOCS[2][2]}
+
+        repo.delete_after_page(pdf.id, 0)
+        assert semantic.search(test_db, "invoicing") == []
+
+    def test_open_rebuilds_from_database(self, test_db, tmp_path, make_pdf, chunk_rows):
+        pdf = make_pdf(test_db)
+        PDFChunkRepository(test_db).bulk_create(chunk_rows(pdf.id, "late invoices", "holiday notes"))
+
+        search = SemanticSearch.open(test_db.get_bind(), str(tmp_path / "rebuilt"))
+        assert [c.content for c, _ in search.search(test_db, "invoice")] == ["late invoices"]
+        search.close()
+
+    def test_concurrent_first_use_opens_one_index(self, test_db, tmp_path, monkeypatch):
+        monkeypatch.setattr(semantic_search, "SEMANTIC_SEARCH", True)
+        monkeypatch.setattr(semantic_search, "VECTOR_INDEX_PATH", str(tmp_path / "shared"))
+        monkeypatch.setattr(semantic_search, "_indexes", {})
+        start = threading.Barrier(4)
+        opened, errors = [], []
+
+        def first_use():
+            start.wait()
+            try:
+                opened.append(get_semantic_search(test_db))
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=first_use) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        try:
+            assert errors == []
+            assert len(opened) == 4 and all(s is opened[0] for s in opened)
+        finally:
+            semantic_search.close_semantic_search()
+
+    def test_endpoint(self, client, auth_headers, test_db, semantic, make_pdf, chunk_rows):
+        pdf = make_pdf(test_db)
+        pdf_id = pdf.id
+        PDFChunkRepository(test_db).bulk_create(chunk_rows(pdf_id, *[d[2] for d in DOCS]))
+
+        response = client.get(
+            "/api/pdfs/search/semantic", params={"q": "invoicing", "limit": 1}, headers=auth_headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+        (hit,) = response.json()["items"]
+        assert "invoic" in hit["chunk"]["content"].lower()
+        assert hit["score"] > 0
+
+        response = client.get(
+            "/api/pdfs/search/semantic",
+            params={"q": "x", "pdf_id": pdf_id + 1},
+            headers=auth_headers,
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_endpoint_when_disabled(self, client, auth_headers):
+        response = client.get("/api/pdfs/search/semantic?q=invoice", headers=auth_headers)
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
@@ -0,0 +1,54 @@
+import pytest
+from app.services.snippets import ELLIPSIS, find_matches, make_snippet, query_terms
+
+
+def highlighted(snippet):
+    return [snippet.text[start:end] for start, end in snippet.highlights]
+
+
+class TestMatches:
+    def test_query_terms_drop_operators_and_fold(self):
+        assert query_terms('Café OR "net total"') == ("cafe", "net", "total")
+
+    def test_words_match_as_prefixes_ignoring_case_and_accents(self):
+        text = "Invoices for the CAFÉ; invoiced twice."
+        assert [text[s:e] for s, e in find_matches(text, "invoice cafe")] == [
+            "Invoices",
+            "CAFÉ",
+            "invoiced",
+        ]
+
+    @pytest.mark.parametrize("query,expected", [("voice", ["voice"]), ("?!", ["?!", "?!"])])
+    def test_falls_back_to_substrings(self, query, expected):
+        text = "invoice?! really?!"
+        assert [text[s:e].lower() for s, e in find_matches(text, query)] == expected
+
+
+class TestSnippets:
+    def test_short_text_is_returned_whole(self):
+        snippet = make_snippet("net total due", "total")
+        assert snippet.text == "net total due"
+        assert highlighted(snippet) == ["total"]
+
+    def test_window_centres_on_the_densest_matches(self):
+        text = "invoice " + "filler " * 40 + "net total and total again " + "filler " * 40
+        snippet = make_snippet(text, "total", length=60)
+
+        assert snippet.text.startswith(ELLIPSIS) and snippet.text.endswith(ELLIPSIS)
+        assert len(snippet.text) <= 60 + 2 * len(ELLIPSIS)
+        assert highlighted(snippet) == ["total", "total"]
+        # Cut at word boundaries
+        assert snippet.text[1:].split()[0] in text.split()
+        assert snippet.text[:-1].split()[-1] in text.split()
+
+    def test_no_match_returns_the_start(self):
+        text = "word " * 100
+        snippet = make_snippet(text, "absent", length=40)
+        assert snippet.text.startswith("word") and snippet.text.endswith(ELLIPSIS)
+        assert snippet.highlights == []
+
+    def test_match_longer_than_the_window(self):
+        text = "a " * 50 + "x" * 80 + " b" * 50
+        snippet = make_snippet(text, "x" * 80, length=40)
+        assert highlighted(snippet) == []
+        assert "x" in snippet.text
@@ -0,0 +1,52 @@
+import hashlib
+import pytest
+from io import BytesIO
+from unittest.mock import patch
+from fastapi import UploadFile
+from app.services.pdf_service import PDFService, UploadTooLargeError
+
+
+def make_upload(content: bytes) -> UploadFile:
+    return UploadFile(file=BytesIO(content), filename="doc.pdf")
+
+
+class TestUploadSpooling:
+    @pytest.mark.asyncio
+    async def test_spool_streams_in_blocks(self, test_db, tmp_path, sample_pdf_bytes):
+        service = PDFService(test_db)
+        destination = tmp_path / "spooled.pdf"
+        upload = make_upload(sample_pdf_bytes)
+
+        with patch("app.services.pdf_service.UPLOAD_CHUNK_SIZE", 64), patch.object(
+            upload, "read", wraps=upload.read
+        ) as read:
+            result = await service._spool_upload(upload, str(destination))
+
+        assert all(call.args == (64,) for call in read.call_args_list)
+        assert result.size == len(sample_pdf_bytes)
+        assert result.sha256 == hashlib.sha256(sample_pdf_bytes).hexdigest()
+        assert destination.read_bytes() == sample_pdf_bytes
+
+    @pytest.mark.asyncio
+    async def test_spool_rejects_oversized_upload(self, test_db, tmp_path, sample_pdf_bytes):
+        service = PDFService(test_db)
+        destination = tmp_path / "spooled.pdf"
+
+        with patch("app.services.pdf_service.UPLOAD_CHUNK_SIZE", 16), patch(
+            "app.services.pdf_service.MAX_UPLOAD_SIZE", 32
+        ):
+            with pytest.raises(UploadTooLargeError):
+                await service._spool_upload(make_upload(sample_pdf_bytes), str(destination))
+
+        assert not destination.exists()
+
+    @pytest.mark.parametrize("content", [b"", b"not a pdf at all"])
+    @pytest.mark.asyncio
+    async def test_spool_rejects_non_pdf(self, test_db, tmp_path, content):
+        service = PDFService(test_db)
+        destination = tmp_path / "spooled.pdf"
+
+        with pytest.raises(ValueError, match="not a valid PDF"):
+            await service._spool_upload(make_upload(content), str(destination))
+
+        assert not destination.exists()